@@ -0,0 +1,116 @@
+import os
+import argparse
+import logging
+import time
+import faiss
+import numpy as np
+from stock.index_types import build_index, reconstruct_all, index_memory_bytes, INDEX_TYPES, FLAT_INDEX
+
+logger = logging.getLogger(__name__)
+
+# Configurations
+INDEX_DIR = "vector_dbs"
+SYMBOLS = ['AAPL', 'WMT', 'TSLA', 'MSFT', 'IBM', 'GME', 'NVDA']
+NUM_QUERIES = 200
+TOP_K = 4
+NOISE_SCALE = 0.05  # Jitter for synthetic copies and queries, relative to the mean vector norm
+
+
+def load_vectors(symbols):
+    """Read the stored embeddings of the existing per-symbol indexes (no API calls needed)."""
+    vectors = []
+    for symbol in symbols:
+        index_path = os.path.join(INDEX_DIR, f"{symbol}_faiss.index", "index.faiss")
+        if not os.path.exists(index_path):
+            logger.warning(f"No FAISS index for {symbol}, skipping it")
+            continue
+        vectors.append(np.asarray(reconstruct_all(faiss.read_index(index_path)), dtype=np.float32))
+    if not vectors:
+        raise FileNotFoundError(f"No FAISS indexes found in {INDEX_DIR}")
+    return np.vstack(vectors)
+
+
+def scale_corpus(vectors, target_size, rng):
+    """Grow the corpus to target_size with jittered copies, to simulate years of filings."""
+    if target_size <= len(vectors):
+        return vectors[:target_size]
+    noise = NOISE_SCALE * np.linalg.norm(vectors, axis=1).mean() / np.sqrt(vectors.shape[1])
+    picks = rng.integers(0, len(vectors), target_size - len(vectors))
+    extra = vectors[picks] + rng.normal(0, noise, (len(picks), vectors.shape[1])).astype(np.float32)
+    return np.vstack([vectors, extra])
+
+
+def make_queries(vectors, num_queries, rng):
+    """Queries are jittered corpus vectors, so they look like real questions about a chunk."""
+    noise = NOISE_SCALE * np.linalg.norm(vectors, axis=1).mean() / np.sqrt(vectors.shape[1])
+    picks = rng.integers(0, len(vectors), num_queries)
+    return vectors[picks] + rng.normal(0, noise, (num_queries, vectors.shape[1])).astype(np.float32)
+
+
+def recall_at_k(found, truth):
+    hits = sum(len(set(f) & set(t)) for f, t in zip(found, truth))
+    return hits / truth.size
+
+
+def benchmark(vectors, queries, index_types, k=TOP_K):
+    """Build each index type and measure build time, memory, latency and recall against exact search."""
+    exact = build_index(vectors, FLAT_INDEX)
+    _, truth = exact.search(queries, k)
+
+    results = []
+    for index_type in index_types:
+        start = time.perf_counter()
+        index = build_index(vectors, index_type)
+        build_seconds = time.perf_counter() - start
+
+        # Single-query latency, which is what a chat or highlights request pays
+        latencies = []
+        found = []
+        for query in queries:
+            start = time.perf_counter()
+            _, ids = index.search(query.reshape(1, -1), k)
+            latencies.append(time.perf_counter() - start)
+            found.append(ids[0])
+
+        latencies_ms = np.array(latencies) * 1000
+        results.append({
+            'index_type': index_type,
+            'actual_type': type(index).__name__,
+            'build_s': build_seconds,
+            'memory_mb': index_memory_bytes(index) / 1e6,
+            'p50_ms': float(np.percentile(latencies_ms, 50)),
+            'p95_ms': float(np.percentile(latencies_ms, 95)),
+            'recall': recall_at_k(np.array(found), truth)
+        })
+    return results
+
+
+def print_results(corpus_size, dimension, results, k=TOP_K):
+    print(f"\nCorpus: {corpus_size} vectors x {dimension}d, recall@{k} vs exact flat search")
+    print(f"{'type':<8}{'faiss index':<24}{'build s':>10}{'memory MB':>12}{'p50 ms':>10}{'p95 ms':>10}{'recall':>9}")
+    for r in results:
+        print(f"{r['index_type']:<8}{r['actual_type']:<24}{r['build_s']:>10.2f}{r['memory_mb']:>12.2f}"
+              f"{r['p50_ms']:>10.3f}{r['p95_ms']:>10.3f}{r['recall']:>9.3f}")
+
+
+if __name__ == "__main__":
+    logging.basicConfig(level=logging.INFO)
+    parser = argparse.ArgumentParser(description="Benchmark FAISS index types on the existing SEC filing embeddings.")
+    parser.add_argument("--symbols", default=",".join(SYMBOLS), help="Comma-separated symbols to load")
+    parser.add_argument("--index-types", default=",".join(INDEX_TYPES), help="Comma-separated index types to compare")
+    parser.add_argument("--sizes", default="",
+                        help="Comma-separated corpus sizes to simulate, e.g. 5000,50000 (default: real corpus only)")
+    parser.add_argument("--queries", type=int, default=NUM_QUERIES, help="Number of queries per run")
+    parser.add_argument("--k", type=int, default=TOP_K, help="Neighbours per query")
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    rng = np.random.default_rng(args.seed)
+    base_vectors = load_vectors([s.strip().upper() for s in args.symbols.split(",") if s.strip()])
+    index_types = [t.strip() for t in args.index_types.split(",") if t.strip()]
+    sizes = [int(s) for s in args.sizes.split(",") if s.strip()] or [len(base_vectors)]
+
+    for size in sizes:
+        corpus = scale_corpus(base_vectors, size, rng)
+        queries = make_queries(corpus, args.queries, rng)
+        print_results(len(corpus), corpus.shape[1], benchmark(corpus, queries, index_types, args.k), args.k)
@@ -1,13 +1,19 @@
 import os
+import argparse
 import faiss
 import dotenv
 import logging
 import glob
 from concurrent.futures import ThreadPoolExecutor
+from functools import partial
 from langchain_community.document_loaders import PyPDFLoader
-from langchain_openai import OpenAIEmbeddings
 from langchain_community.vectorstores import FAISS
 from langchain.text_splitter import RecursiveCharacterTextSplitter
+from stock.embeddings import get_embeddings, save_embedding_metadata, DEFAULT_EMBEDDING_BACKEND, EMBEDDING_BACKENDS, OPENAI_BACKEND
+from stock.lexical_index import BM25Index
+from stock.filing_store import FilingVectorStore, UNIFIED_INDEX_NAME, store_write_lock
+from stock.embeddings import load_embedding_metadata, get_index_embeddings
+from stock.index_types import apply_index_type, DEFAULT_INDEX_TYPE, FLAT_INDEX, INDEX_TYPES
 
 logger = logging.getLogger(__name__)
 
@@ -21,12 +27,6 @@ PDF_DIR = "./data"
 API_KEY = os.getenv("OPENAI_API_KEY")
 SYMBOLS = ['AAPL', 'WMT', 'TSLA', 'MSFT', 'IBM', 'GME', 'NVDA']
 
-if not API_KEY:
-    raise ValueError("OpenAI API Key not found! Make sure it exists in .env file.")
-
-# Initialize the embedding model once (avoids unnecessary API calls)
-embeddings = OpenAIEmbeddings(openai_api_key=API_KEY)
-
 def find_pdf_file(symbol):
     """Find the correct PDF file matching the stock symbol."""
     pdf_pattern = os.path.join(PDF_DIR, symbol, "sec_filing", f"{symbol}.pdf")
@@ -35,8 +35,13 @@ def find_pdf_file(symbol):
         return matching_files[0]
     raise FileNotFoundError(f"File not found for symbol: {symbol}. Make sure the file exists.")
 
-def create_faiss_index(symbol):
-    """Creates a FAISS index for a given stock symbol's financial filing PDF."""
+def create_faiss_index(symbol, embeddings, backend, index_type=DEFAULT_INDEX_TYPE):
+    """
+    Creates a FAISS index for a given stock symbol's financial filing PDF.
+
+    Returns the vector store with its exact (unquantized) index, for the unified
+    filing store, or None if the index could not be built.
+    """
     try:
         pdf_path = find_pdf_file(symbol)
         loader = PyPDFLoader(pdf_path)
@@ -45,26 +50,85 @@ def create_faiss_index(symbol):
         text_splitter = RecursiveCharacterTextSplitter(chunk_size=CHUNK_SIZE, chunk_overlap=OVERLAP_SIZE)
         chunks = text_splitter.split_documents(documents)
 
-        logger.info(f"Creating FAISS index for {symbol}...")
+        logger.info(f"Creating {index_type} FAISS index for {symbol} with {backend} embeddings...")
         vectorstore = FAISS.from_documents(chunks, embeddings)
 
-        os.makedirs(INDEX_DIR, exist_ok=True)
         index_file = os.path.join(INDEX_DIR, f"{symbol}_faiss.index")
+        os.makedirs(index_file, exist_ok=True)
+        save_embedding_metadata(index_file, backend, index_type=index_type)
+        BM25Index.from_vectorstore(vectorstore).save(index_file)
+        exact_index = vectorstore.index
+        apply_index_type(vectorstore, index_type)
         vectorstore.save_local(index_file)
+        vectorstore.index = exact_index
+        return vectorstore
 
     except Exception as e:
         logger.error(f"Error creating FAISS index for {symbol}: {e}")
+        return None
 
-def process_pdfs():
+def process_pdfs(backend=DEFAULT_EMBEDDING_BACKEND, index_type=DEFAULT_INDEX_TYPE):
     """Process PDFs concurrently and create FAISS indexes."""
     if not os.path.exists(PDF_DIR):
         logger.critical(f"No directory named '{PDF_DIR}' found. Please add your SEC filings.")
         return
 
+    if backend == OPENAI_BACKEND and not API_KEY:
+        raise ValueError("OpenAI API Key not found! Make sure it exists in .env file.")
+
+    # Initialize the embedding model once (avoids unnecessary API calls)
+    embeddings = get_embeddings(backend)
+
     with ThreadPoolExecutor(max_workers=min(len(SYMBOLS), 4)) as executor:
-        executor.map(create_faiss_index, SYMBOLS)
+        vectorstores = executor.map(
+            partial(create_faiss_index, embeddings=embeddings, backend=backend, index_type=index_type), SYMBOLS
+        )
+        vectorstores = {symbol: vectorstore for symbol, vectorstore in zip(SYMBOLS, vectorstores) if vectorstore}
 
     logger.info("FAISS indexes generated successfully.")
+    return vectorstores
+
+def build_unified_store(vectorstores=None):
+    """
+    Combine the per-symbol FAISS indexes into the cross-symbol filing store.
+
+    Symbols in vectorstores (as returned by process_pdfs) are added with their exact
+    vectors; the others are loaded from their saved index, whose vectors are only
+    approximate if it was saved with a quantized index type.
+    """
+    vectorstores = vectorstores or {}
+    unified_dir = os.path.join(INDEX_DIR, UNIFIED_INDEX_NAME)
+    with store_write_lock(unified_dir):
+        store = FilingVectorStore(unified_dir)
+        for symbol in SYMBOLS:
+            index_file = os.path.join(INDEX_DIR, f"{symbol}_faiss.index")
+            vectorstore = vectorstores.get(symbol)
+            if vectorstore is None:
+                if not os.path.exists(os.path.join(index_file, "index.faiss")):
+                    logger.warning(f"No FAISS index for {symbol}, skipping it in the unified store")
+                    continue
+                index_type = load_embedding_metadata(index_file).get('index_type', FLAT_INDEX)
+                if index_type != FLAT_INDEX:
+                    logger.warning(
+                        f"{symbol} index is {index_type}; the unified store gets its reconstructed, approximate "
+                        f"vectors. Rebuild the indexes to store exact ones."
+                    )
+                vectorstore = FAISS.load_local(index_file, get_index_embeddings(index_file), allow_dangerous_deserialization=True)
+            store.add_filing(symbol, vectorstore, load_embedding_metadata(index_file))
+        store.save()
+    logger.info(f"Unified filing store built for: {', '.join(store.symbols)}")
 
 if __name__ == "__main__":
-    process_pdfs()
+    parser = argparse.ArgumentParser(description="Create FAISS indexes for SEC filings.")
+    parser.add_argument("--backend", choices=EMBEDDING_BACKENDS, default=DEFAULT_EMBEDDING_BACKEND,
+                        help="Embedding backend to build the indexes with")
+    parser.add_argument("--index-type", choices=INDEX_TYPES, default=DEFAULT_INDEX_TYPE,
+                        help="FAISS index type: flat (exact), hnsw, ivfpq or sq8 (8-bit scalar quantized)")
+    parser.add_argument("--unified", action="store_true",
+                        help="Only (re)build the cross-symbol filing store from the existing indexes "
+                             "(exact only if they were built with --index-type flat)")
+    args = parser.parse_args()
+    if args.unified:
+        build_unified_store()
+    else:
+        build_unified_store(process_pdfs(args.backend, args.index_type))
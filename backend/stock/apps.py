@@ -4,6 +4,7 @@ import json
 import redis
 from pathlib import Path
 import logging
+import threading
 
 logger = logging.getLogger(__name__)
 
@@ -18,6 +19,15 @@ class StockConfig(AppConfig):
         # Skip this in manage.py check to avoid running twice
         if os.environ.get('RUN_MAIN') != 'true':
             self.preload_transcripts()
+            self.preload_token_encoding()
+
+    def preload_token_encoding(self):
+        """
+        Load the tokenizer used for prompt budgets in the background; it may have to be
+        downloaded, which should not delay startup.
+        """
+        from .prompt_context import preload_encoding
+        threading.Thread(target=preload_encoding, name="tiktoken-preload", daemon=True).start()
 
     def preload_transcripts(self):
         """
@@ -0,0 +1,285 @@
+import logging
+import os
+import threading
+import time
+from datetime import datetime
+from pathlib import Path
+import numpy as np
+from .finnhub_gateway import finnhub_gateway
+
+logger = logging.getLogger(__name__)
+
+CANDLE_DIR = os.path.join(Path(__file__).resolve().parent.parent, "candle_store")
+COLUMNS = ('t', 'o', 'h', 'l', 'c', 'v')
+
+# Seconds per bar for the Finnhub resolutions we use
+RESOLUTION_SECONDS = {
+    '1': 60,
+    '5': 60 * 5,
+    '15': 60 * 15,
+    '30': 60 * 30,
+    '60': 60 * 60,
+    'D': 60 * 60 * 24
+}
+# Coarser resolutions derived from finer stored bars over short ranges, instead of
+# fetching them separately; longer ranges are fetched at their own resolution
+RESAMPLE_SOURCES = {'60': '1', 'D': '1'}
+MAX_RESAMPLE_RANGE = 60 * 60 * 24 * 2
+
+# How often the newest end of a series is re-fetched
+TAIL_REFRESH = {'1': 60, 'D': 60 * 15}
+DEFAULT_TAIL_REFRESH = 60 * 5
+
+# How far back stored bars are kept per resolution, so files (rewritten on every tail
+# refresh) stay bounded; older ranges are still served, but fetched again when asked for
+RETENTION = {
+    '1': 60 * 60 * 24 * 7,
+    '5': 60 * 60 * 24 * 30,
+    '15': 60 * 60 * 24 * 60,
+    '30': 60 * 60 * 24 * 90,
+    '60': 60 * 60 * 24 * 365,
+    'D': 60 * 60 * 24 * 365 * 5
+}
+
+
+def format_hhmm(timestamps):
+    """
+    Format epoch timestamps as local 'HH:MM' strings in one vectorized pass.
+    Uses the server's UTC offset at the first timestamp, like datetime.fromtimestamp.
+    """
+    if not len(timestamps):
+        return []
+    offset = int(datetime.fromtimestamp(int(timestamps[0])).astimezone().utcoffset().total_seconds())
+    minutes = ((timestamps + offset) // 60) % (24 * 60)
+    hours = np.char.zfill((minutes // 60).astype(str), 2)
+    mins = np.char.zfill((minutes % 60).astype(str), 2)
+    return np.char.add(np.char.add(hours, ':'), mins).tolist()
+
+
+class Candles:
+    """Columnar OHLCV bars: parallel NumPy arrays sorted by timestamp."""
+
+    def __init__(self, t=None, o=None, h=None, l=None, c=None, v=None):
+        self.t = np.asarray(t if t is not None else [], dtype=np.int64)
+        self.o = np.asarray(o if o is not None else [], dtype=np.float64)
+        self.h = np.asarray(h if h is not None else [], dtype=np.float64)
+        self.l = np.asarray(l if l is not None else [], dtype=np.float64)
+        self.c = np.asarray(c if c is not None else [], dtype=np.float64)
+        self.v = np.asarray(v if v is not None else [], dtype=np.float64)
+
+    def __len__(self):
+        return len(self.t)
+
+    @classmethod
+    def from_finnhub(cls, data):
+        if data.get('s') != 'ok' or not data.get('t'):
+            return cls()
+        return cls(*(data[column] for column in COLUMNS))
+
+    def to_finnhub(self):
+        """Same shape as a Finnhub /stock/candle response."""
+        if not len(self):
+            return {'s': 'no_data'}
+        return {'s': 'ok', **{column: getattr(self, column).tolist() for column in COLUMNS}}
+
+    def to_rows(self, decimals=2):
+        """Row format: one dict per bar with 'time', rounded prices and volume."""
+        times = format_hhmm(self.t)
+        prices = np.round(np.column_stack([self.o, self.h, self.l, self.c]), decimals).tolist()
+        volumes = self.v.astype(np.int64).tolist()
+        return [
+            {'time': time_, 'open': o, 'high': h, 'low': l, 'close': c, 'volume': v}
+            for time_, (o, h, l, c), v in zip(times, prices, volumes)
+        ]
+
+    def to_columns(self, decimals=2):
+        """Compact columnar format: one list per field, aligned by index."""
+        return {
+            't': self.t.tolist(),
+            'time': format_hhmm(self.t),
+            'o': np.round(self.o, decimals).tolist(),
+            'h': np.round(self.h, decimals).tolist(),
+            'l': np.round(self.l, decimals).tolist(),
+            'c': np.round(self.c, decimals).tolist(),
+            'v': self.v.astype(np.int64).tolist()
+        }
+
+    def between(self, _from, to):
+        start = np.searchsorted(self.t, _from, side='left')
+        end = np.searchsorted(self.t, to, side='right')
+        return Candles(*(getattr(self, column)[start:end] for column in COLUMNS))
+
+    def merge(self, other):
+        """Union of two sets of bars; bars from other replace bars with the same timestamp."""
+        if not len(other):
+            return self
+        if not len(self):
+            return other
+        t = np.concatenate([other.t, self.t])
+        # np.unique keeps the first occurrence, i.e. the newer bar from other
+        t, first = np.unique(t, return_index=True)
+        return Candles(t, *(np.concatenate([getattr(other, column), getattr(self, column)])[first]
+                            for column in COLUMNS[1:]))
+
+    def resample(self, seconds):
+        """Aggregate bars into buckets of the given width, aligned to epoch multiples."""
+        if not len(self):
+            return Candles()
+        buckets = self.t - self.t % seconds
+        starts = np.flatnonzero(np.r_[True, buckets[1:] != buckets[:-1]])
+        ends = np.r_[starts[1:], len(self.t)] - 1
+        return Candles(
+            buckets[starts],
+            self.o[starts],
+            np.maximum.reduceat(self.h, starts),
+            np.minimum.reduceat(self.l, starts),
+            self.c[ends],
+            np.add.reduceat(self.v, starts)
+        )
+
+    def stats(self):
+        """Range and volume of the bars, or None if there are none."""
+        if not len(self):
+            return None
+        high = float(self.h.max())
+        low = float(self.l.min())
+        return {
+            'high': high,
+            'low': low,
+            'spread_percent': (high - low) / low * 100 if low else None,
+            'volume': float(self.v.sum())
+        }
+
+
+class CandleSeries:
+    """Stored bars of one symbol and resolution plus the time range they cover."""
+
+    def __init__(self, symbol, resolution, candles=None, covered_from=None, covered_to=None):
+        self.symbol = symbol
+        self.resolution = resolution
+        self.candles = candles or Candles()
+        self.covered_from = covered_from
+        self.covered_to = covered_to
+        self.lock = threading.Lock()
+
+    @property
+    def path(self):
+        return os.path.join(CANDLE_DIR, f"{self.symbol}_{self.resolution}.npz")
+
+    @classmethod
+    def load(cls, symbol, resolution):
+        series = cls(symbol, resolution)
+        if os.path.exists(series.path):
+            try:
+                with np.load(series.path) as stored:
+                    series.candles = Candles(*(stored[column] for column in COLUMNS))
+                    series.covered_from = int(stored['covered'][0])
+                    series.covered_to = int(stored['covered'][1])
+            except Exception as e:
+                logger.warning(f"Ignoring unreadable candle file {series.path}: {e}")
+        return series
+
+    def save(self):
+        os.makedirs(CANDLE_DIR, exist_ok=True)
+        tmp_path = self.path + ".tmp.npz"
+        np.savez(
+            tmp_path,
+            covered=np.array([self.covered_from, self.covered_to], dtype=np.int64),
+            **{column: getattr(self.candles, column) for column in COLUMNS}
+        )
+        os.replace(tmp_path, self.path)
+
+    def trim(self, now):
+        """Drop bars older than the resolution's retention window."""
+        cutoff = now - RETENTION[self.resolution]
+        if self.covered_from is None or self.covered_from >= cutoff:
+            return
+        if self.covered_to <= cutoff:
+            self.candles, self.covered_from, self.covered_to = Candles(), None, None
+            return
+        start = np.searchsorted(self.candles.t, cutoff, side='left')
+        self.candles = Candles(*(getattr(self.candles, column)[start:] for column in COLUMNS))
+        self.covered_from = cutoff
+
+    def missing_ranges(self, _from, to, now):
+        """Ranges to fetch so that [_from, to] is covered; the newest end is re-fetched when stale."""
+        if self.covered_from is None:
+            return [(_from, to)]
+        ranges = []
+        if _from < self.covered_from:
+            ranges.append((_from, self.covered_from))
+        refresh = TAIL_REFRESH.get(self.resolution, DEFAULT_TAIL_REFRESH)
+        if to > self.covered_to and now - self.covered_to >= refresh:
+            # Re-fetch the last stored bar too, it may have been incomplete
+            ranges.append((self.covered_to - RESOLUTION_SECONDS[self.resolution], to))
+        return ranges
+
+
+class CandleStore:
+    """
+    Per-symbol, per-resolution OHLCV store backed by NumPy arrays and persisted to disk.
+
+    Requests only fetch the parts of a range that are not stored yet (plus a periodic
+    refresh of the newest bars), and hourly or daily bars over short ranges are
+    resampled from stored one-minute bars instead of being fetched separately.
+    """
+
+    def __init__(self, client=finnhub_gateway):
+        self.client = client
+        self._series = {}
+        self._lock = threading.Lock()
+
+    def _get_series(self, symbol, resolution):
+        key = (symbol, resolution)
+        with self._lock:
+            if key not in self._series:
+                self._series[key] = CandleSeries.load(symbol, resolution)
+            return self._series[key]
+
+    def _fetch(self, symbol, resolution, _from, to):
+        data = self.client.stock_candles(symbol, resolution, int(_from), int(to))
+        return Candles.from_finnhub(data)
+
+    def get_candles(self, symbol, resolution, _from, to):
+        """
+        Return bars of a symbol between two epoch timestamps.
+
+        Raises:
+            FinnhubError: If a missing range could not be fetched
+        """
+        symbol = symbol.upper()
+        _from, to = int(_from), int(to)
+        source = RESAMPLE_SOURCES.get(resolution)
+        if source and to - _from <= MAX_RESAMPLE_RANGE:
+            return self.get_candles(symbol, source, _from, to).resample(RESOLUTION_SECONDS[resolution])
+
+        series = self._get_series(symbol, resolution)
+        with series.lock:
+            now = int(time.time())
+            if series.covered_to is not None and _from > series.covered_to:
+                # Stored bars are older than the whole request; start a new contiguous range
+                # rather than fetching the gap in between
+                series.candles, series.covered_from, series.covered_to = Candles(), None, None
+            ranges = series.missing_ranges(_from, to, now)
+            for fetch_from, fetch_to in ranges:
+                series.candles = series.candles.merge(self._fetch(symbol, resolution, fetch_from, fetch_to))
+            if not ranges:
+                return series.candles.between(_from, to)
+
+            series.covered_from = min(_from, series.covered_from if series.covered_from is not None else _from)
+            series.covered_to = max(min(to, now), series.covered_to or 0)
+            candles = series.candles.between(_from, to)
+            series.trim(now)
+            try:
+                if series.covered_from is not None:
+                    series.save()
+                elif os.path.exists(series.path):
+                    os.remove(series.path)
+            except OSError as e:
+                logger.warning(f"Could not persist candles for {symbol} ({resolution}): {e}")
+            logger.info(f"Fetched {len(ranges)} missing candle range(s) for {symbol} ({resolution})")
+            return candles
+
+
+# Shared store used by the market impact views and the chat service
+candle_store = CandleStore()
@@ -0,0 +1,90 @@
+import logging
+import re
+import time
+import uuid
+from django.core.cache import cache
+from .prompt_context import count_tokens
+
+logger = logging.getLogger(__name__)
+
+CHAT_SESSION_KEY_PREFIX = "chat_session_"
+CHAT_SESSION_TTL = 60 * 30  # Idle time after which a session is dropped
+CONTEXT_MAX_AGE = 60 * 10  # Assembled company context is rebuilt after this long
+RECENT_TURNS = 2  # Turns sent verbatim; older ones are folded into the summary
+SUMMARY_TOKEN_BUDGET = 300
+ANSWER_SUMMARY_CHARS = 240
+SESSION_ID_PATTERN = re.compile(r'^[0-9a-f]{32}$')
+
+
+def new_session_id():
+    return uuid.uuid4().hex
+
+
+def _key(session_id):
+    return f"{CHAT_SESSION_KEY_PREFIX}{session_id}"
+
+
+def load_session(session_id, symbol=None):
+    """
+    Return (session_id, session) for a chat request. Unknown, expired or malformed ids,
+    and sessions about another symbol, start a new session.
+    """
+    session = None
+    if session_id and SESSION_ID_PATTERN.match(session_id):
+        session = cache.get(_key(session_id))
+    if session is None or session['symbol'] != symbol:
+        session_id = new_session_id()
+        session = {'symbol': symbol, 'contexts': {}, 'turns': [], 'summary': []}
+    return session_id, session
+
+
+def save_session(session_id, session):
+    # Every save restarts the idle TTL (shared cache: Redis in production)
+    cache.set(_key(session_id), session, CHAT_SESSION_TTL)
+
+
+def get_context(session, intent):
+    """Company context already assembled for this intent in the session, if still fresh."""
+    entry = session['contexts'].get(intent)
+    if entry and time.time() - entry['built_at'] < CONTEXT_MAX_AGE:
+        return entry['text']
+    return None
+
+
+def set_context(session, intent, text):
+    session['contexts'][intent] = {'text': text, 'built_at': time.time()}
+
+
+def summarize_turn(question, answer):
+    """One summary line for a turn: the question and the start of the answer."""
+    answer = ' '.join(answer.split())
+    if len(answer) > ANSWER_SUMMARY_CHARS:
+        answer = answer[:ANSWER_SUMMARY_CHARS].rsplit(' ', 1)[0] + "..."
+    return f"- Q: {question} A: {answer}"
+
+
+def record_turn(session, question, answer):
+    """
+    Add a finished turn. Turns beyond the most recent ones are folded into a rolling
+    summary, whose oldest lines are dropped when it exceeds its token budget.
+    """
+    session['turns'].append({'question': question, 'answer': answer})
+    while len(session['turns']) > RECENT_TURNS:
+        turn = session['turns'].pop(0)
+        session['summary'].append(summarize_turn(turn['question'], turn['answer']))
+    while session['summary'] and count_tokens('\n'.join(session['summary'])) > SUMMARY_TOKEN_BUDGET:
+        session['summary'].pop(0)
+
+
+def history_messages(session):
+    """Chat messages carrying the conversation so far: the summary, then the recent turns."""
+    messages = []
+    if session['summary']:
+        messages.append({
+            "role": "system",
+            "content": "Summary of the earlier conversation:\n" + '\n'.join(session['summary'])
+        })
+    for turn in session['turns']:
+        messages.append({"role": "user", "content": turn['question']})
+        messages.append({"role": "assistant", "content": turn['answer']})
+    return messages
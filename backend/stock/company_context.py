@@ -0,0 +1,137 @@
+import logging
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timedelta
+from .candle_store import candle_store
+from .finnhub_gateway import finnhub_gateway
+from .swr_cache import get_or_refresh
+
+logger = logging.getLogger(__name__)
+
+COMPANY_CONTEXT_KEY_PREFIX = "company_context_"
+CONTEXT_WORKERS = 8
+NEWS_DAYS = 30
+NEWS_ITEMS = 5
+CANDLE_DAYS = 30
+MAX_PEERS = 5  # Limit to top 5 peers to avoid rate limits
+DEFAULT_COMPONENTS = ('profile', 'financials', 'news', 'candles')
+
+# Per-component cache policy as (soft TTL, hard TTL) in seconds. After the soft TTL a
+# component is refreshed in the background; stale data is served until the hard TTL.
+COMPONENT_TTLS = {
+    'profile': (60 * 60 * 24 * 3, 60 * 60 * 24 * 14),
+    'financials': (60 * 60 * 6, 60 * 60 * 24 * 3),
+    'peers': (60 * 60 * 24, 60 * 60 * 24 * 7),
+    'news': (60 * 10, 60 * 60 * 6),
+    'candles': (60 * 10, 60 * 60 * 24)
+}
+
+context_executor = ThreadPoolExecutor(max_workers=CONTEXT_WORKERS, thread_name_prefix="company-context")
+
+
+def _fetch_news(symbol):
+    end_date = datetime.now()
+    start_date = end_date - timedelta(days=NEWS_DAYS)
+    news = finnhub_gateway.company_news(
+        symbol,
+        _from=start_date.strftime('%Y-%m-%d'),
+        to=end_date.strftime('%Y-%m-%d')
+    )[:NEWS_ITEMS]
+    # Keep only the fields the chat prompt uses
+    return [
+        {
+            'datetime': datetime.fromtimestamp(item.get('datetime', 0)).strftime('%Y-%m-%d'),
+            'headline': item.get('headline', ''),
+            'summary': item.get('summary', ''),
+            'source': item.get('source', '')
+        }
+        for item in news
+    ]
+
+
+def _fetch_candles(symbol):
+    end_date = datetime.now()
+    start_date = end_date - timedelta(days=CANDLE_DAYS)
+    return candle_store.get_candles(symbol, 'D', start_date.timestamp(), end_date.timestamp()).to_finnhub()
+
+
+COMPONENT_FETCHERS = {
+    'profile': lambda symbol: finnhub_gateway.company_profile2(symbol=symbol),
+    'financials': lambda symbol: finnhub_gateway.company_basic_financials(symbol, 'all'),
+    'peers': lambda symbol: finnhub_gateway.company_peers(symbol),
+    'news': _fetch_news,
+    'candles': _fetch_candles
+}
+
+
+def get_component(component, symbol):
+    """Return one cached component of a company's context, fetching it only when missing."""
+    soft_ttl, hard_ttl = COMPONENT_TTLS[component]
+    fetch = COMPONENT_FETCHERS[component]
+    return get_or_refresh(
+        f"{COMPANY_CONTEXT_KEY_PREFIX}{component}_{symbol.upper()}",
+        lambda: fetch(symbol),
+        soft_ttl=soft_ttl,
+        hard_ttl=hard_ttl
+    )
+
+
+def get_components(symbol, components):
+    """
+    Fetch several components of one symbol in parallel. A failed component is
+    returned as None and does not affect the others.
+    """
+    futures = {component: context_executor.submit(get_component, component, symbol) for component in components}
+    results = {}
+    for component, future in futures.items():
+        try:
+            results[component] = future.result()
+        except Exception as e:
+            logger.warning(f"Failed to fetch {component} for {symbol}: {e}")
+            results[component] = None
+    return results
+
+
+def get_company_context(symbol, components=DEFAULT_COMPONENTS):
+    """
+    Company data bundle used by the chat service: profile, financials, recent news,
+    a month of daily candles and the main peers, limited to the requested components.
+
+    Each component is cached with its own TTL and refreshed independently, so a
+    follow-up question about the same company is answered without upstream calls.
+    Components that were not requested are returned empty.
+
+    Raises:
+        ValueError: If no company profile is available for the symbol
+    """
+    include_peers = 'peers' in components
+    data = get_components(symbol, {'profile', *components})
+    if not data['profile']:
+        raise ValueError(f"No company profile found for {symbol}")
+
+    result = {
+        'profile': data['profile'],
+        'financials': data.get('financials') or {},
+        'recent_news': data.get('news') or [],
+        'stock_data': data.get('candles') or {'s': 'no_data'}
+    }
+
+    if include_peers:
+        # Submitted flat from this thread so pool workers never wait on each other
+        peer_futures = {
+            peer: (context_executor.submit(get_component, 'profile', peer),
+                   context_executor.submit(get_component, 'financials', peer))
+            for peer in (data['peers'] or [])[:MAX_PEERS]
+        }
+        peer_data = {}
+        for peer, (profile, financials) in peer_futures.items():
+            try:
+                if profile.result() and financials.result():
+                    peer_data[peer] = {
+                        'profile': profile.result(),
+                        'financials': financials.result()
+                    }
+            except Exception as peer_error:
+                logger.warning(f"Error fetching data for peer {peer}: {str(peer_error)}")
+        result['peers'] = peer_data
+
+    return result
@@ -0,0 +1,129 @@
+import logging
+import time
+from concurrent.futures import ThreadPoolExecutor, wait
+from .finnhub_gateway import finnhub_gateway
+from .company_context import get_component
+from .market_snapshot import day_over_day, download_frame
+
+logger = logging.getLogger(__name__)
+
+# Quotes for all symbols come from one bulk download, and profiles and financials from the
+# long-lived company context cache, so a warm comparison makes no Finnhub calls at all.
+# Cold symbols cost two Finnhub calls each and may be answered as pending while the cache fills.
+MAX_COMPARISON_SYMBOLS = 25
+COMPARISON_WORKERS = 16
+COMPARISON_CALL_TIMEOUT = 5  # seconds per upstream call
+COMPARISON_DEADLINE = 10  # seconds for the whole comparison
+
+comparison_executor = ThreadPoolExecutor(max_workers=COMPARISON_WORKERS, thread_name_prefix="comparison")
+
+
+def parse_symbols(symbols):
+    """Split a comma-separated symbol list, dropping blanks and duplicates and applying the cap."""
+    symbol_list = []
+    for symbol in symbols.split(','):
+        symbol = symbol.strip().upper()
+        if symbol and symbol not in symbol_list:
+            symbol_list.append(symbol)
+    return symbol_list[:MAX_COMPARISON_SYMBOLS]
+
+
+def yahoo_symbol(symbol):
+    """Yahoo Finance spelling of a Finnhub symbol (share classes use '-', e.g. BRK-B)."""
+    return symbol.replace('.', '-')
+
+
+def fetch_quotes(symbol_list):
+    """
+    Latest price and day-over-day change of every symbol from one bulk daily-bar
+    download, in Finnhub quote form ('c', 'd', 'dp'). Symbols Yahoo has no bars for
+    fall back to one Finnhub quote each.
+    """
+    yahoo_symbols = {yahoo_symbol(symbol): symbol for symbol in symbol_list}
+    quotes = {}
+    try:
+        changes = day_over_day(download_frame(list(yahoo_symbols), period='5d', interval='1d'))
+        for yahoo, row in changes.iterrows():
+            if yahoo in yahoo_symbols:
+                quotes[yahoo_symbols[yahoo]] = {'c': row['price'], 'd': row['change'], 'dp': row['change_percent']}
+    except Exception as e:
+        logger.warning(f"Bulk quote download failed, using Finnhub quotes: {e}")
+
+    for symbol in symbol_list:
+        if symbol not in quotes:
+            try:
+                quotes[symbol] = finnhub_gateway.quote(symbol, timeout=COMPARISON_CALL_TIMEOUT)
+            except Exception as e:
+                logger.warning(f"No quote for {symbol}: {e}")
+    return quotes
+
+
+def format_comparison_row(symbol, profile, financials, quote):
+    metrics = financials.get('metric', {})
+    return {
+        'symbol': symbol,
+        'companyName': profile.get('name', symbol),
+        'price': quote.get('c', 0),  # Current price
+        'change': quote.get('d', 0),  # Price change
+        'changePercent': quote.get('dp', 0),  # Percent change
+        'marketCap': profile.get('marketCapitalization', 0),
+        'peRatio': metrics.get('peBasicExcl', 0),
+        'revenue': (metrics.get('revenuePerShareAnnual', 0) or 0) * (profile.get('shareOutstanding', 0) or 0),
+        'revenueGrowth': metrics.get('revenueGrowthTTM', 0),
+        'employees': profile.get('employeeTotal', 0),
+        'profitMargin': metrics.get('netMarginTTM', 0),
+        'dividendYield': metrics.get('dividendYieldIndicatedAnnual', 0)
+    }
+
+
+def compare_companies(symbol_list):
+    """
+    Build comparison rows for all symbols at once.
+
+    Quotes for all symbols come from one bulk download while the profile and
+    financials lookups run concurrently; those usually come from the cache, so the
+    response time barely depends on the number of symbols.
+
+    Symbols whose data is not back by the deadline get a pending row; their lookups keep
+    running and warm the cache, so the next request for the comparison can fill them in.
+
+    Returns:
+        tuple: (rows by symbol, list of symbols whose row is pending or failed)
+    """
+    deadline = time.monotonic() + COMPARISON_DEADLINE
+    quotes = comparison_executor.submit(fetch_quotes, symbol_list)
+    futures = {}
+    for symbol in symbol_list:
+        futures[symbol] = (
+            comparison_executor.submit(get_component, 'profile', symbol),
+            comparison_executor.submit(get_component, 'financials', symbol)
+        )
+    wait([quotes, *(f for group in futures.values() for f in group)], timeout=max(0, deadline - time.monotonic()))
+
+    comparison_data = {}
+    incomplete = []
+    for symbol, (profile, financials) in futures.items():
+        if not (quotes.done() and profile.done() and financials.done()):
+            logger.warning(f"Comparison data for {symbol} not ready within {COMPARISON_DEADLINE}s")
+            comparison_data[symbol] = {
+                'symbol': symbol,
+                'pending': True,
+                'error': f"Data for {symbol} is still loading"
+            }
+            incomplete.append(symbol)
+            continue
+        try:
+            quote = quotes.result().get(symbol)
+            if quote is None:
+                raise ValueError("no quote available")
+            comparison_data[symbol] = format_comparison_row(
+                symbol, profile.result() or {}, financials.result() or {}, quote
+            )
+        except Exception as e:
+            logger.error(f"Error fetching data for {symbol}: {str(e)}")
+            comparison_data[symbol] = {
+                'symbol': symbol,
+                'error': f"Failed to fetch data for {symbol}"
+            }
+            incomplete.append(symbol)
+    return comparison_data, incomplete
@@ -1,6 +1,5 @@
 import json
 from channels.generic.websocket import AsyncWebsocketConsumer
-import finnhub
 import os
 from dotenv import load_dotenv
 import asyncio
@@ -17,6 +16,7 @@ import numpy as np
 from vosk import Model, KaldiRecognizer
 import wave
 from pathlib import Path
+from .finnhub_gateway import finnhub_gateway
 
 # Set up logging
 logger = logging.getLogger(__name__)
@@ -27,11 +27,10 @@ load_dotenv()
 class StockConsumer(AsyncWebsocketConsumer):
     def __init__(self, *args, **kwargs):
         super().__init__(*args, **kwargs)
-        # Initialize Finnhub client
-        api_key = os.getenv('FINNHUB_API_KEY')
-        if not api_key:
+        # Shared Finnhub gateway: quotes are served ahead of slower background calls
+        if not os.getenv('FINNHUB_API_KEY'):
             raise ValueError("FINNHUB_API_KEY not found in environment variables")
-        self.finnhub_client = finnhub.Client(api_key=api_key)
+        self.finnhub_client = finnhub_gateway
         
         # Initialize Redis client with timeout
         try:
@@ -319,7 +318,7 @@ class StockConsumer(AsyncWebsocketConsumer):
                             try:
                                 if market_status['is_open']:
                                     # Market open - get fresh quote
-                                    quote = self.finnhub_client.quote(symbol)
+                                    quote = await self.finnhub_client.aquote(symbol)
                                     if quote and 'c' in quote:
                                         quote_data = {
                                             'type': 'price_update',
@@ -378,7 +377,7 @@ class StockConsumer(AsyncWebsocketConsumer):
             symbols_to_fetch = symbols if symbols else list(self.subscribed_symbols)
             for symbol in symbols_to_fetch:
                 try:
-                    quote = self.finnhub_client.quote(symbol)
+                    quote = await self.finnhub_client.aquote(symbol)
                     if quote and 'c' in quote:
                         quote_data = {
                             'type': 'price_update',
@@ -1,11 +1,9 @@
 import datetime
 import json
 import os
-import requests
-from requests.adapters import HTTPAdapter
-from requests.packages.urllib3.util.retry import Retry
 from dotenv import load_dotenv
 from django.http import JsonResponse
+from .finnhub_gateway import finnhub_gateway
 
 # Load environment variables from .env file
 load_dotenv()
@@ -17,11 +15,6 @@ FINNHUB_API_KEY = os.environ.get("FINNHUB_API_KEY", "")
 if not FINNHUB_API_KEY:
     raise ValueError("FINNHUB_API_KEY environment variable is not set. Please add it to your .env file.")
 
-# Create a session with retry logic
-session = requests.Session()
-retries = Retry(total=5, backoff_factor=1, status_forcelist=[502, 503, 504])
-session.mount('https://', HTTPAdapter(max_retries=retries))
-
 # Divide tickers into categories
 IN_PROGRESS_TICKERS = ["AAPL", "TSLA", "IBM", "NVDA", "MSFT"]
 PAST_TICKER = "WMT"
@@ -46,17 +39,9 @@ TIME_MAPPING = {
 }
 
 def fetch_earnings(from_date, to_date, symbol):
-    """Fetch earnings calendar from Finnhub API using HTTP requests"""
-    url = "https://finnhub.io/api/v1/calendar/earnings"
-    params = {
-        "from": from_date,
-        "to": to_date,
-        "symbol": symbol,
-        "token": FINNHUB_API_KEY
-    }
-    response = session.get(url, params=params, timeout=120)
-    response.raise_for_status()  # Raise an error for bad responses
-    return response.json().get("earningsCalendar", [])
+    """Fetch earnings calendar from Finnhub through the shared gateway"""
+    data = finnhub_gateway.earnings_calendar(_from=from_date, to=to_date, symbol=symbol)
+    return data.get("earningsCalendar", [])
 
 def format_eps(value):
     """Format EPS value as currency."""
@@ -0,0 +1,140 @@
+import json
+import logging
+import os
+import re
+import zlib
+import numpy as np
+from typing import List
+from dotenv import load_dotenv
+from langchain_core.embeddings import Embeddings
+
+logger = logging.getLogger(__name__)
+
+load_dotenv()
+
+# Available embedding backends
+OPENAI_BACKEND = "openai"
+HASHING_BACKEND = "hashing"
+SENTENCE_TRANSFORMER_BACKEND = "sentence-transformers"
+EMBEDDING_BACKENDS = [OPENAI_BACKEND, HASHING_BACKEND, SENTENCE_TRANSFORMER_BACKEND]
+
+# Backend used for new indexes unless one is passed explicitly
+DEFAULT_EMBEDDING_BACKEND = os.getenv('EMBEDDING_BACKEND', OPENAI_BACKEND)
+DEFAULT_SENTENCE_TRANSFORMER_MODEL = "sentence-transformers/all-MiniLM-L6-v2"
+HASHING_DIMENSION = 1024
+
+# Stored next to index.faiss/index.pkl so queries always use the embedder the index was built with
+EMBEDDING_METADATA_FILE = "embedding.json"
+
+TOKEN_PATTERN = re.compile(r"[a-z0-9][a-z0-9.$%]*")
+
+
+class HashingEmbeddings(Embeddings):
+    """
+    Local embedder based on the hashing trick: unigrams and bigrams are hashed into
+    a fixed number of buckets with a signed, sublinear term frequency. Needs no
+    network access or model download and embeds a query in well under a millisecond.
+    """
+
+    def __init__(self, dimension: int = HASHING_DIMENSION):
+        self.dimension = dimension
+
+    def _embed(self, text: str) -> List[float]:
+        vector = np.zeros(self.dimension, dtype=np.float32)
+        tokens = TOKEN_PATTERN.findall(text.lower())
+        features = tokens + [f"{a} {b}" for a, b in zip(tokens, tokens[1:])]
+        if not features:
+            return vector.tolist()
+
+        # crc32 is stable across processes, unlike the builtin hash()
+        hashes = np.fromiter((zlib.crc32(f.encode('utf-8')) for f in features), dtype=np.uint32, count=len(features))
+        buckets = hashes % self.dimension
+        signs = np.where(hashes & 0x80000000, -1.0, 1.0).astype(np.float32)
+        np.add.at(vector, buckets, signs)
+
+        # Sublinear term frequency, then L2 normalise so L2 distance ranks like cosine similarity
+        vector = np.sign(vector) * np.log1p(np.abs(vector))
+        norm = np.linalg.norm(vector)
+        if norm > 0:
+            vector /= norm
+        return vector.tolist()
+
+    def embed_documents(self, texts: List[str]) -> List[List[float]]:
+        return [self._embed(text) for text in texts]
+
+    def embed_query(self, text: str) -> List[float]:
+        return self._embed(text)
+
+
+def get_embeddings(backend: str = None, model: str = None) -> Embeddings:
+    """Create the embedding model for a backend."""
+    backend = backend or DEFAULT_EMBEDDING_BACKEND
+
+    if backend == OPENAI_BACKEND:
+        from .llm_gateway import llm_gateway
+        if model:
+            return llm_gateway.embeddings(model=model)
+        return llm_gateway.embeddings()
+
+    if backend == HASHING_BACKEND:
+        return HashingEmbeddings(dimension=int(model) if model else HASHING_DIMENSION)
+
+    if backend == SENTENCE_TRANSFORMER_BACKEND:
+        try:
+            from langchain_community.embeddings import HuggingFaceEmbeddings
+        except ImportError as e:
+            raise ValueError(
+                "The sentence-transformers backend requires the sentence-transformers package. "
+                "Install it with: pip install sentence-transformers"
+            ) from e
+        return HuggingFaceEmbeddings(
+            model_name=model or DEFAULT_SENTENCE_TRANSFORMER_MODEL,
+            model_kwargs={'device': 'cpu'},
+            encode_kwargs={'normalize_embeddings': True}
+        )
+
+    raise ValueError(f"Unknown embedding backend: {backend}. Choose one of: {', '.join(EMBEDDING_BACKENDS)}")
+
+
+def default_model(backend: str) -> str:
+    """Model name recorded in index metadata for a backend."""
+    if backend == HASHING_BACKEND:
+        return str(HASHING_DIMENSION)
+    if backend == SENTENCE_TRANSFORMER_BACKEND:
+        return DEFAULT_SENTENCE_TRANSFORMER_MODEL
+    return "text-embedding-ada-002"
+
+
+def save_embedding_metadata(index_dir: str, backend: str, model: str = None, index_type: str = None):
+    """Record which embedder (and FAISS index type) an index was built with."""
+    metadata = {
+        'backend': backend,
+        'model': model or default_model(backend)
+    }
+    if index_type:
+        metadata['index_type'] = index_type
+    with open(os.path.join(index_dir, EMBEDDING_METADATA_FILE), 'w') as f:
+        json.dump(metadata, f)
+    return metadata
+
+
+def load_embedding_metadata(index_dir: str) -> dict:
+    """
+    Read the embedder an index was built with.
+    Indexes created before metadata was recorded were all built with OpenAI embeddings.
+    """
+    metadata_path = os.path.join(index_dir, EMBEDDING_METADATA_FILE)
+    if not os.path.exists(metadata_path):
+        return {'backend': OPENAI_BACKEND, 'model': None}
+    try:
+        with open(metadata_path, 'r') as f:
+            return json.load(f)
+    except (json.JSONDecodeError, OSError) as e:
+        logger.error(f"Error reading embedding metadata from {metadata_path}: {e}")
+        return {'backend': OPENAI_BACKEND, 'model': None}
+
+
+def get_index_embeddings(index_dir: str) -> Embeddings:
+    """Create the embedder matching an existing index."""
+    metadata = load_embedding_metadata(index_dir)
+    return get_embeddings(metadata.get('backend'), metadata.get('model'))
@@ -0,0 +1,246 @@
+import fcntl
+import json
+import logging
+import os
+import threading
+from contextlib import contextmanager
+from pathlib import Path
+from typing import Dict, List, Optional
+import faiss
+import numpy as np
+from .embeddings import get_embeddings, load_embedding_metadata
+from .index_types import reconstruct_all
+
+logger = logging.getLogger(__name__)
+
+# Single FAISS index holding the chunks of every symbol's filings
+UNIFIED_INDEX_NAME = "unified_faiss.index"
+UNIFIED_INDEX_FILE = "index.faiss"
+UNIFIED_METADATA_FILE = "store.json"
+UNIFIED_LOCK_FILE = "store.lock"
+
+# Vector ids are partitioned by symbol: the high bits hold the symbol slot and the
+# low bits the chunk number, so a symbol's chunks form one contiguous id range
+PARTITION_BITS = 32
+DEFAULT_FILING = "sec_filing"
+
+
+def _partition_range(slot: int):
+    return slot << PARTITION_BITS, (slot + 1) << PARTITION_BITS
+
+
+class FilingVectorStore:
+    """
+    Multi-tenant vector store over the SEC filings of all symbols.
+
+    Each symbol owns an id-range partition of one IndexIDMap2, so a query restricted
+    to any set of symbols runs as a single filtered search, and adding or replacing a
+    filing only touches that filing's ids. Vectors are copied out of the per-symbol
+    FAISS indexes, so building the store never re-embeds anything.
+    """
+
+    def __init__(self, index_dir: str, index=None, metadata: Optional[dict] = None):
+        self.index_dir = index_dir
+        self.index = index
+        self.metadata = metadata or {
+            'backend': None,
+            'model': None,
+            'dimension': None,
+            'symbols': {},
+            'next_chunk': {},
+            'chunks': {}
+        }
+        self._embeddings = None
+        self._lock = threading.RLock()
+
+    @classmethod
+    def load(cls, index_dir: str):
+        """Load the store, or return an empty one if it has not been built yet."""
+        index_path = os.path.join(index_dir, UNIFIED_INDEX_FILE)
+        metadata_path = os.path.join(index_dir, UNIFIED_METADATA_FILE)
+        if not (os.path.exists(index_path) and os.path.exists(metadata_path)):
+            return cls(index_dir)
+        with open(metadata_path, 'r') as f:
+            metadata = json.load(f)
+        return cls(index_dir, faiss.read_index(index_path), metadata)
+
+    def save(self):
+        """Write the index and metadata, replacing the previous files atomically."""
+        with self._lock:
+            os.makedirs(self.index_dir, exist_ok=True)
+            index_path = os.path.join(self.index_dir, UNIFIED_INDEX_FILE)
+            metadata_path = os.path.join(self.index_dir, UNIFIED_METADATA_FILE)
+            faiss.write_index(self.index, index_path + ".tmp")
+            with open(metadata_path + ".tmp", 'w') as f:
+                json.dump(self.metadata, f, separators=(',', ':'))
+            os.replace(index_path + ".tmp", index_path)
+            os.replace(metadata_path + ".tmp", metadata_path)
+
+    @property
+    def symbols(self) -> List[str]:
+        return sorted(self.metadata['symbols'])
+
+    def _symbol_slot(self, symbol: str) -> int:
+        slots = self.metadata['symbols']
+        if symbol not in slots:
+            slots[symbol] = max(slots.values(), default=-1) + 1
+            self.metadata['next_chunk'][symbol] = 0
+        return slots[symbol]
+
+    def _filing_ids(self, symbol: str, filing: str) -> List[int]:
+        return [
+            int(chunk_id) for chunk_id, chunk in self.metadata['chunks'].items()
+            if chunk['symbol'] == symbol and chunk['filing'] == filing
+        ]
+
+    def add_filing(self, symbol: str, vectorstore, backend_metadata: dict, filing: str = DEFAULT_FILING):
+        """
+        Add or replace one filing of a symbol from its per-symbol LangChain FAISS index.
+        Other symbols and filings are left untouched.
+        """
+        symbol = symbol.upper()
+        source_index = vectorstore.index
+        vectors = np.asarray(reconstruct_all(source_index), dtype=np.float32)
+
+        with self._lock:
+            if self.index is None:
+                self.index = faiss.IndexIDMap2(faiss.IndexFlatL2(source_index.d))
+                self.metadata['backend'] = backend_metadata.get('backend')
+                self.metadata['model'] = backend_metadata.get('model')
+                self.metadata['dimension'] = source_index.d
+            elif (backend_metadata.get('backend'), source_index.d) != (self.metadata['backend'], self.metadata['dimension']):
+                raise ValueError(
+                    f"Index for {symbol} uses {backend_metadata.get('backend')} embeddings ({source_index.d}d), "
+                    f"but the unified store uses {self.metadata['backend']} ({self.metadata['dimension']}d)"
+                )
+
+            # Replace any previous version of this filing
+            old_ids = self._filing_ids(symbol, filing)
+            if old_ids:
+                self.index.remove_ids(np.array(old_ids, dtype=np.int64))
+                for chunk_id in old_ids:
+                    del self.metadata['chunks'][str(chunk_id)]
+
+            slot = self._symbol_slot(symbol)
+            start = self.metadata['next_chunk'][symbol]
+            if start + len(vectors) >= 1 << PARTITION_BITS:
+                raise ValueError(f"Partition for {symbol} is full")
+            ids = np.arange(start, start + len(vectors), dtype=np.int64) + (slot << PARTITION_BITS)
+            self.index.add_with_ids(vectors, ids)
+            self.metadata['next_chunk'][symbol] = start + len(vectors)
+
+            for position, chunk_id in enumerate(ids):
+                doc = vectorstore.docstore.search(vectorstore.index_to_docstore_id[position])
+                self.metadata['chunks'][str(int(chunk_id))] = {
+                    'symbol': symbol,
+                    'filing': filing,
+                    'page': doc.metadata.get('page'),
+                    'text': doc.page_content
+                }
+
+        logger.info(f"Added {len(ids)} chunks of {symbol} {filing} to the unified filing store")
+        return len(ids)
+
+    def _selector(self, symbols: Optional[List[str]], filings: Optional[List[str]]):
+        """Build an id selector for the requested symbols and filings, or None for everything."""
+        if filings:
+            wanted_symbols = set(symbols) if symbols else None
+            ids = [
+                int(chunk_id) for chunk_id, chunk in self.metadata['chunks'].items()
+                if chunk['filing'] in filings and (wanted_symbols is None or chunk['symbol'] in wanted_symbols)
+            ]
+            return faiss.IDSelectorBatch(np.array(ids, dtype=np.int64)) if ids else False
+
+        if not symbols:
+            return None
+
+        slots = [self.metadata['symbols'][s] for s in symbols if s in self.metadata['symbols']]
+        if not slots:
+            return False
+        selectors = [faiss.IDSelectorRange(*_partition_range(slot)) for slot in slots]
+        selector = selectors[0]
+        for other in selectors[1:]:
+            selector = faiss.IDSelectorOr(selector, other)
+            selectors.append(selector)
+        # FAISS selectors hold raw pointers, so keep every component alive with the combined one
+        selector.referenced_objects = selectors
+        return selector
+
+    def search(self, query: str, k: int = 5, symbols: Optional[List[str]] = None,
+               filings: Optional[List[str]] = None) -> List[Dict]:
+        """Search chunks across the selected symbols and filings in one pass."""
+        if self.index is None or self.index.ntotal == 0:
+            return []
+        symbols = [s.upper() for s in symbols] if symbols else None
+
+        selector = self._selector(symbols, filings)
+        if selector is False:
+            return []
+
+        if self._embeddings is None:
+            self._embeddings = get_embeddings(self.metadata['backend'], self.metadata['model'])
+        query_vector = np.array([self._embeddings.embed_query(query)], dtype=np.float32)
+
+        with self._lock:
+            if selector is None:
+                distances, ids = self.index.search(query_vector, k)
+            else:
+                distances, ids = self.index.search(query_vector, k, params=faiss.SearchParameters(sel=selector))
+
+        results = []
+        for distance, chunk_id in zip(distances[0], ids[0]):
+            if chunk_id < 0:
+                continue
+            chunk = self.metadata['chunks'][str(int(chunk_id))]
+            results.append({**chunk, 'score': float(distance)})
+        return results
+
+
+_store = None
+_store_mtime = None
+_store_lock = threading.Lock()
+
+
+def get_unified_index_dir():
+    base_dir = Path(__file__).resolve().parent.parent
+    return os.path.join(base_dir, "vector_dbs", UNIFIED_INDEX_NAME)
+
+
+def get_filing_store() -> FilingVectorStore:
+    """Return the process-wide unified filing store, reloading it when another worker saved a newer one."""
+    global _store, _store_mtime
+    index_dir = get_unified_index_dir()
+    metadata_path = os.path.join(index_dir, UNIFIED_METADATA_FILE)
+    mtime = os.path.getmtime(metadata_path) if os.path.exists(metadata_path) else None
+    with _store_lock:
+        if _store is None or mtime != _store_mtime:
+            _store = FilingVectorStore.load(index_dir)
+            _store_mtime = mtime
+        return _store
+
+
+@contextmanager
+def store_write_lock(index_dir: str):
+    """Exclusive lock on the unified store across processes, held while it is read, changed and saved."""
+    os.makedirs(index_dir, exist_ok=True)
+    with open(os.path.join(index_dir, UNIFIED_LOCK_FILE), 'w') as lock_file:
+        fcntl.flock(lock_file, fcntl.LOCK_EX)
+        try:
+            yield
+        finally:
+            fcntl.flock(lock_file, fcntl.LOCK_UN)
+
+
+def add_index_to_filing_store(symbol: str, vectorstore, index_dir: str, filing: str = DEFAULT_FILING):
+    """Add a freshly built per-symbol index to the unified store and persist it."""
+    global _store, _store_mtime
+    unified_dir = get_unified_index_dir()
+    with store_write_lock(unified_dir):
+        # Reload under the lock so filings other workers saved in the meantime are kept
+        store = FilingVectorStore.load(unified_dir)
+        store.add_filing(symbol, vectorstore, load_embedding_metadata(index_dir), filing=filing)
+        store.save()
+        with _store_lock:
+            _store = store
+            _store_mtime = os.path.getmtime(os.path.join(unified_dir, UNIFIED_METADATA_FILE))
+    return store
@@ -0,0 +1,213 @@
+import asyncio
+import logging
+import os
+import random
+import threading
+import time
+from concurrent.futures import Future
+import requests
+from dotenv import load_dotenv
+from requests.adapters import HTTPAdapter
+from urllib3.util import Retry
+from .rate_limit import PriorityTokenBucket, RateLimitTimeout
+
+logger = logging.getLogger(__name__)
+
+load_dotenv()
+
+FINNHUB_BASE_URL = "https://finnhub.io/api/v1"
+
+# Rate limit of our Finnhub plan, shared by every view and consumer in the process
+FINNHUB_CALLS_PER_MINUTE = int(os.getenv('FINNHUB_CALLS_PER_MINUTE', 60))
+FINNHUB_BURST = int(os.getenv('FINNHUB_BURST', 10))
+FINNHUB_POOL_SIZE = 20
+FINNHUB_TIMEOUT = 10  # seconds per HTTP attempt
+FINNHUB_QUEUE_TIMEOUT = 30  # seconds a call may wait for a rate-limit token
+FINNHUB_MAX_RETRIES = 3  # Retries of throttled (429) and failed (5xx) responses
+FINNHUB_RETRY_BASE = 1  # seconds; backoff doubles per attempt, with full jitter
+FINNHUB_RETRY_MAX = 20
+RETRY_STATUSES = frozenset([429, 502, 503, 504])
+
+# Priority classes: lower values are served first when calls queue for the rate limit
+PRIORITY_LIVE = 0  # Live quotes pushed to connected clients
+PRIORITY_DEFAULT = 1  # Interactive page data
+PRIORITY_BACKGROUND = 2  # News, sentiment and other slow-moving data
+
+
+def retry_delay(attempt, response):
+    """Full-jitter exponential backoff, but never shorter than the server's Retry-After."""
+    delay = random.uniform(0, min(FINNHUB_RETRY_MAX, FINNHUB_RETRY_BASE * 2 ** attempt))
+    try:
+        delay = max(delay, float(response.headers.get('Retry-After', 0)))
+    except ValueError:
+        pass
+    return min(delay, FINNHUB_RETRY_MAX)
+
+
+class FinnhubError(Exception):
+    """Raised when Finnhub answers with an error status or cannot be reached."""
+
+    def __init__(self, message, status_code=None):
+        super().__init__(message)
+        self.status_code = status_code
+
+
+class FinnhubGateway:
+    """
+    Single access path to the Finnhub REST API.
+
+    All calls share one pooled HTTP session with retries, one rate-limit budget with
+    priority classes, and in-flight coalescing: identical requests issued while one
+    is already running wait for that response instead of calling Finnhub again.
+
+    Method names and signatures mirror finnhub.Client, so it can be used in its place.
+    """
+
+    def __init__(self, api_key=None, calls_per_minute=FINNHUB_CALLS_PER_MINUTE, burst=FINNHUB_BURST):
+        self.api_key = api_key or os.getenv('FINNHUB_API_KEY')
+        self.limiter = PriorityTokenBucket(calls_per_minute, burst)
+
+        self.session = requests.Session()
+        # Only connection failures, which never reach Finnhub, are retried by urllib3;
+        # responses are retried in _request, so every attempt takes a rate-limit token
+        retries = Retry(
+            total=3,
+            connect=3,
+            read=0,
+            status=0,
+            backoff_factor=1,
+            allowed_methods=frozenset(['GET'])
+        )
+        self.session.mount('https://', HTTPAdapter(
+            max_retries=retries,
+            pool_connections=1,
+            pool_maxsize=FINNHUB_POOL_SIZE
+        ))
+
+        self._inflight = {}
+        self._inflight_lock = threading.Lock()
+
+    def _request(self, path, params, priority, timeout):
+        if not self.api_key:
+            raise FinnhubError("Finnhub API key not configured")
+        for attempt in range(FINNHUB_MAX_RETRIES + 1):
+            try:
+                self.limiter.acquire(priority, timeout=FINNHUB_QUEUE_TIMEOUT)
+            except RateLimitTimeout as e:
+                raise FinnhubError("Finnhub rate limit queue timeout", status_code=429) from e
+            try:
+                response = self.session.get(
+                    f"{FINNHUB_BASE_URL}{path}",
+                    params={**params, 'token': self.api_key},
+                    timeout=timeout
+                )
+            except requests.exceptions.RequestException as e:
+                raise FinnhubError(f"Finnhub request to {path} failed: {e}") from e
+            if response.status_code not in RETRY_STATUSES or attempt == FINNHUB_MAX_RETRIES:
+                break
+            delay = retry_delay(attempt, response)
+            logger.warning(f"Finnhub {path} returned {response.status_code}, retrying in {delay:.1f}s")
+            time.sleep(delay)
+
+        if not response.ok:
+            raise FinnhubError(
+                f"Finnhub {path} returned {response.status_code}: {response.text[:200]}",
+                status_code=response.status_code
+            )
+        try:
+            return response.json()
+        except ValueError as e:
+            raise FinnhubError(f"Invalid JSON from Finnhub {path}: {e}") from e
+
+    def get(self, path, params=None, priority=PRIORITY_DEFAULT, timeout=FINNHUB_TIMEOUT):
+        """
+        Call a Finnhub endpoint and return the decoded JSON.
+
+        Args:
+            path (str): Endpoint path, e.g. '/quote'
+            params (dict): Query parameters without the token
+            priority (int): One of PRIORITY_LIVE, PRIORITY_DEFAULT, PRIORITY_BACKGROUND
+            timeout (float): Seconds per HTTP attempt
+
+        Raises:
+            FinnhubError: On error responses, network failures or rate-limit queue timeouts
+        """
+        params = {k: v for k, v in (params or {}).items() if v is not None}
+        key = (path, tuple(sorted(params.items())))
+
+        with self._inflight_lock:
+            future = self._inflight.get(key)
+            owner = future is None
+            if owner:
+                future = Future()
+                self._inflight[key] = future
+
+        if not owner:
+            return future.result()
+
+        try:
+            future.set_result(self._request(path, params, priority, timeout))
+        except BaseException as e:
+            future.set_exception(e)
+        finally:
+            with self._inflight_lock:
+                self._inflight.pop(key, None)
+        return future.result()
+
+    async def aget(self, path, params=None, priority=PRIORITY_DEFAULT, timeout=FINNHUB_TIMEOUT):
+        """Async variant of get() for consumers, run off the event loop."""
+        return await asyncio.to_thread(self.get, path, params, priority, timeout)
+
+    # finnhub.Client compatible helpers
+
+    def quote(self, symbol, priority=PRIORITY_LIVE, timeout=FINNHUB_TIMEOUT):
+        return self.get('/quote', {'symbol': symbol}, priority, timeout=timeout)
+
+    async def aquote(self, symbol, priority=PRIORITY_LIVE, timeout=FINNHUB_TIMEOUT):
+        return await self.aget('/quote', {'symbol': symbol}, priority, timeout=timeout)
+
+    def company_news(self, symbol, _from, to, timeout=FINNHUB_TIMEOUT):
+        return self.get('/company-news', {'symbol': symbol, 'from': _from, 'to': to}, PRIORITY_BACKGROUND, timeout=timeout)
+
+    def stock_social_sentiment(self, symbol, _from=None, to=None, timeout=FINNHUB_TIMEOUT):
+        return self.get('/stock/social-sentiment', {'symbol': symbol, 'from': _from, 'to': to}, PRIORITY_BACKGROUND, timeout=timeout)
+
+    def news_sentiment(self, symbol, timeout=FINNHUB_TIMEOUT):
+        return self.get('/news-sentiment', {'symbol': symbol}, PRIORITY_BACKGROUND, timeout=timeout)
+
+    def company_basic_financials(self, symbol, metric, timeout=FINNHUB_TIMEOUT):
+        return self.get('/stock/metric', {'symbol': symbol, 'metric': metric}, timeout=timeout)
+
+    def company_profile2(self, symbol=None, isin=None, cusip=None, timeout=FINNHUB_TIMEOUT):
+        return self.get('/stock/profile2', {'symbol': symbol, 'isin': isin, 'cusip': cusip}, timeout=timeout)
+
+    def company_peers(self, symbol, grouping=None, timeout=FINNHUB_TIMEOUT):
+        return self.get('/stock/peers', {'symbol': symbol, 'grouping': grouping}, timeout=timeout)
+
+    def stock_candles(self, symbol, resolution, _from, to, timeout=FINNHUB_TIMEOUT):
+        return self.get('/stock/candle', {'symbol': symbol, 'resolution': resolution, 'from': _from, 'to': to}, timeout=timeout)
+
+    def transcripts(self, _id, timeout=FINNHUB_TIMEOUT):
+        return self.get('/stock/transcripts', {'id': _id}, PRIORITY_BACKGROUND, timeout=timeout)
+
+    def market_status(self, exchange, timeout=FINNHUB_TIMEOUT):
+        return self.get('/stock/market-status', {'exchange': exchange}, PRIORITY_LIVE, timeout=timeout)
+
+    def recommendation_trends(self, symbol, timeout=FINNHUB_TIMEOUT):
+        return self.get('/stock/recommendation', {'symbol': symbol}, timeout=timeout)
+
+    def price_target(self, symbol, timeout=FINNHUB_TIMEOUT):
+        return self.get('/stock/price-target', {'symbol': symbol}, timeout=timeout)
+
+    def earnings_calendar(self, _from, to, symbol, timeout=FINNHUB_TIMEOUT):
+        return self.get('/calendar/earnings', {'from': _from, 'to': to, 'symbol': symbol}, timeout=timeout)
+
+    def company_eps_estimates(self, symbol, freq=None, timeout=FINNHUB_TIMEOUT):
+        return self.get('/stock/eps-estimate', {'symbol': symbol, 'freq': freq}, timeout=timeout)
+
+    def company_revenue_estimates(self, symbol, freq=None, timeout=FINNHUB_TIMEOUT):
+        return self.get('/stock/revenue-estimate', {'symbol': symbol, 'freq': freq}, timeout=timeout)
+
+
+# Shared instance used by views, services and consumers
+finnhub_gateway = FinnhubGateway()
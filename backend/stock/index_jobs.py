@@ -0,0 +1,116 @@
+import logging
+import os
+import socket
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+from django.core.cache import cache
+
+logger = logging.getLogger(__name__)
+
+# Job status is kept in the Django cache so every worker sees the same state
+INDEX_JOB_KEY_PREFIX = "index_build_job_"
+INDEX_LOCK_KEY_PREFIX = "index_build_lock_"
+INDEX_JOB_TIMEOUT = 60 * 60 * 24  # Keep finished job status for 24 hours
+INDEX_LOCK_TIMEOUT = 60 * 30  # A build holding the lock longer than this is considered dead
+INDEX_RETRY_COOLDOWN = 60 * 10  # A failed build is not retried until this many seconds after it failed
+MAX_BUILD_WORKERS = 2
+
+# Identifies the lock owner in logs and status responses
+WORKER_ID = f"{socket.gethostname()}:{os.getpid()}"
+
+_executor = ThreadPoolExecutor(max_workers=MAX_BUILD_WORKERS, thread_name_prefix="index-build")
+_inflight = {}
+_inflight_lock = threading.Lock()
+
+
+def _job_key(symbol):
+    return f"{INDEX_JOB_KEY_PREFIX}{symbol}"
+
+
+def _lock_key(symbol):
+    return f"{INDEX_LOCK_KEY_PREFIX}{symbol}"
+
+
+def _set_job_status(symbol, status, **extra):
+    """Store the current status of an index build job."""
+    job = {
+        'symbol': symbol,
+        'status': status,
+        'worker': WORKER_ID,
+        'updated_at': datetime.now().isoformat(),
+        **extra
+    }
+    cache.set(_job_key(symbol), job, INDEX_JOB_TIMEOUT)
+    return job
+
+
+def get_index_job(symbol):
+    """Return the last known build job for a symbol, or None if no build was ever started."""
+    return cache.get(_job_key(symbol.upper()))
+
+
+def is_index_building(symbol):
+    """Check whether a build for the symbol is running in this or any other worker."""
+    symbol = symbol.upper()
+    with _inflight_lock:
+        future = _inflight.get(symbol)
+        if future is not None and not future.done():
+            return True
+    return cache.get(_lock_key(symbol)) is not None
+
+
+def retry_cooldown_remaining(job):
+    """Seconds until a failed build may be retried; 0 for any other job."""
+    if not job or job.get('status') != 'failed' or not job.get('finished_at'):
+        return 0
+    elapsed = (datetime.now() - datetime.fromisoformat(job['finished_at'])).total_seconds()
+    return max(0, int(INDEX_RETRY_COOLDOWN - elapsed))
+
+
+def submit_index_build(symbol, build_fn):
+    """
+    Start a background index build for a symbol unless one is already running, or
+    the last one failed less than INDEX_RETRY_COOLDOWN ago (its failed status is
+    returned instead).
+
+    Builds are single-flight per symbol: concurrent callers in the same process share
+    the running job, and the cache lock (an atomic add, SET NX on Redis) keeps other
+    workers from starting a duplicate build.
+
+    Returns:
+        dict: The current job status
+    """
+    symbol = symbol.upper()
+    with _inflight_lock:
+        future = _inflight.get(symbol)
+        if future is not None and not future.done():
+            logger.info(f"Index build for {symbol} already running in this worker")
+            return get_index_job(symbol) or {'symbol': symbol, 'status': 'building'}
+
+        last_job = get_index_job(symbol)
+        if retry_cooldown_remaining(last_job):
+            return last_job
+
+        if not cache.add(_lock_key(symbol), WORKER_ID, INDEX_LOCK_TIMEOUT):
+            logger.info(f"Index build for {symbol} already running in worker {cache.get(_lock_key(symbol))}")
+            return get_index_job(symbol) or {'symbol': symbol, 'status': 'building'}
+
+        job = _set_job_status(symbol, 'building', started_at=datetime.now().isoformat())
+        _inflight[symbol] = _executor.submit(_run_index_build, symbol, build_fn, job['started_at'])
+        logger.info(f"Started background index build for {symbol}")
+        return job
+
+
+def _run_index_build(symbol, build_fn, started_at):
+    try:
+        build_fn(symbol)
+        _set_job_status(symbol, 'ready', started_at=started_at, finished_at=datetime.now().isoformat())
+        logger.info(f"Background index build for {symbol} finished")
+    except Exception as e:
+        logger.error(f"Background index build for {symbol} failed: {e}", exc_info=True)
+        _set_job_status(symbol, 'failed', started_at=started_at, finished_at=datetime.now().isoformat(), error=str(e))
+    finally:
+        cache.delete(_lock_key(symbol))
+        with _inflight_lock:
+            _inflight.pop(symbol, None)
@@ -0,0 +1,106 @@
+import logging
+import math
+import os
+import faiss
+import numpy as np
+from dotenv import load_dotenv
+
+logger = logging.getLogger(__name__)
+
+load_dotenv()
+
+# Supported FAISS index types for SEC filing indexes
+FLAT_INDEX = "flat"
+HNSW_INDEX = "hnsw"
+IVFPQ_INDEX = "ivfpq"
+SQ8_INDEX = "sq8"
+INDEX_TYPES = [FLAT_INDEX, HNSW_INDEX, IVFPQ_INDEX, SQ8_INDEX]
+
+DEFAULT_INDEX_TYPE = os.getenv('FAISS_INDEX_TYPE', FLAT_INDEX)
+
+# HNSW graph settings
+HNSW_M = 32
+HNSW_EF_CONSTRUCTION = 200
+HNSW_EF_SEARCH = 64
+
+# IVF-PQ settings
+PQ_MAX_SUBQUANTIZERS = 64
+PQ_NBITS = 8
+IVF_NPROBE = 16
+MIN_TRAINING_POINTS_PER_CENTROID = 39  # Below this FAISS warns that k-means is under-trained
+# Every PQ codebook has 2**PQ_NBITS centroids trained on the whole corpus; smaller corpora
+# get under-trained codebooks and poor recall, so they use SQ8 instead
+MIN_IVFPQ_VECTORS = 2 ** PQ_NBITS * MIN_TRAINING_POINTS_PER_CENTROID
+
+
+def _pq_subquantizers(dimension):
+    """Largest subquantizer count up to PQ_MAX_SUBQUANTIZERS that divides the dimension."""
+    for m in range(min(PQ_MAX_SUBQUANTIZERS, dimension), 0, -1):
+        if dimension % m == 0:
+            return m
+    return 1
+
+
+def _ivf_nlist(num_vectors):
+    """Roughly 4 * sqrt(n) lists, capped so every centroid gets enough training points."""
+    nlist = int(4 * math.sqrt(num_vectors))
+    return max(1, min(nlist, num_vectors // MIN_TRAINING_POINTS_PER_CENTROID))
+
+
+def build_index(vectors, index_type=FLAT_INDEX):
+    """
+    Build a FAISS index of the given type over float32 vectors (L2 metric, matching
+    the LangChain default). IVF-PQ falls back to SQ8, the other compressed type, on
+    corpora too small to train its codebooks.
+    """
+    vectors = np.ascontiguousarray(vectors, dtype=np.float32)
+    num_vectors, dimension = vectors.shape
+
+    if index_type == IVFPQ_INDEX and num_vectors < MIN_IVFPQ_VECTORS:
+        logger.warning(f"Only {num_vectors} vectors, too few to train IVF-PQ (needs {MIN_IVFPQ_VECTORS}); using SQ8")
+        index_type = SQ8_INDEX
+
+    if index_type == FLAT_INDEX:
+        index = faiss.IndexFlatL2(dimension)
+    elif index_type == HNSW_INDEX:
+        index = faiss.IndexHNSWFlat(dimension, HNSW_M)
+        index.hnsw.efConstruction = HNSW_EF_CONSTRUCTION
+        index.hnsw.efSearch = HNSW_EF_SEARCH
+    elif index_type == IVFPQ_INDEX:
+        quantizer = faiss.IndexFlatL2(dimension)
+        index = faiss.IndexIVFPQ(quantizer, dimension, _ivf_nlist(num_vectors), _pq_subquantizers(dimension), PQ_NBITS)
+        index.nprobe = IVF_NPROBE
+    elif index_type == SQ8_INDEX:
+        index = faiss.IndexScalarQuantizer(dimension, faiss.ScalarQuantizer.QT_8bit, faiss.METRIC_L2)
+    else:
+        raise ValueError(f"Unknown index type: {index_type}. Choose one of: {', '.join(INDEX_TYPES)}")
+
+    if not index.is_trained:
+        index.train(vectors)
+    index.add(vectors)
+    return index
+
+
+def reconstruct_all(index):
+    """
+    Return every vector stored in an index. Vectors from quantized indexes
+    (IVF-PQ, SQ8) are approximations of the original embeddings.
+    """
+    try:
+        faiss.extract_index_ivf(index).make_direct_map()
+    except RuntimeError:
+        pass  # Not an IVF index
+    return index.reconstruct_n(0, index.ntotal)
+
+
+def apply_index_type(vectorstore, index_type=FLAT_INDEX):
+    """Swap the index of a LangChain FAISS vector store for one of the given type, keeping the docstore."""
+    if index_type == FLAT_INDEX and isinstance(vectorstore.index, faiss.IndexFlat):
+        return vectorstore
+    vectorstore.index = build_index(reconstruct_all(vectorstore.index), index_type)
+    return vectorstore
+
+
+def index_memory_bytes(index):
+    """Serialized size of an index, a close proxy for its memory footprint."""
+    return faiss.serialize_index(index).nbytes
@@ -0,0 +1,124 @@
+import re
+from collections import namedtuple
+
+# Intents of a company question
+INTENT_MARKET_REACTION = 'market_reaction'
+INTENT_REVENUE_GROWTH = 'revenue_growth'
+INTENT_PEER_COMPARISON = 'peer_comparison'
+INTENT_FINANCIAL_METRICS = 'financial_metrics'
+INTENT_OVERVIEW = 'overview'
+
+# Data a market question can be about; all of it comes from the shared market snapshot
+MARKET_US = 'us'
+MARKET_GLOBAL = 'global'
+MARKET_SECTORS = 'sectors'
+MARKET_MOVERS = 'movers'
+MARKET_VOLUME = 'volume'
+MARKET_SENTIMENT = 'sentiment'
+
+MAX_COMPANY_INTENTS = 2
+
+# Term patterns per intent as (regex, weight). Terms match at the start of a word, so
+# 'competitor' also matches 'competitors'; a weight above 1 marks a term that decides
+# the intent on its own, below 1 a term that only supports it.
+COMPANY_TERMS = {
+    INTENT_MARKET_REACTION: [
+        (r'react', 2), (r'announce', 2), (r'news', 2), (r'headline', 2), (r'press release', 2),
+        (r'market(?!\s*cap)', 1), (r'(?:stock|share) price', 1), (r'price (?:action|move|change)', 2),
+        (r'(?:rall|jump|surg|drop|fell|fall|plung|sell-?off)', 1)
+    ],
+    INTENT_REVENUE_GROWTH: [
+        (r'revenue', 2), (r'sales', 2), (r'top[- ]line', 2), (r'grow', 1), (r'trend', 0.5)
+    ],
+    INTENT_PEER_COMPARISON: [
+        (r'compar', 2), (r'competi', 2), (r'peer', 2), (r'rival', 2), (r'vs\b', 2), (r'versus', 2),
+        (r'industry average', 2), (r'relative to', 1)
+    ],
+    INTENT_FINANCIAL_METRICS: [
+        (r'financial', 1), (r'metric', 1.5), (r'ratio', 2), (r'margin', 2), (r'valuation', 2),
+        (r'p/?e\b', 2), (r'debt', 2), (r'leverage', 2), (r'liquidity', 2), (r'profitab', 2),
+        (r'ro[ae]\b', 2), (r'ebitda', 2), (r'eps\b', 2), (r'earnings per share', 2), (r'balance sheet', 2)
+    ]
+}
+
+# Company context components each intent needs (see company_context.COMPONENT_FETCHERS)
+COMPANY_REQUIREMENTS = {
+    INTENT_MARKET_REACTION: ('profile', 'financials', 'news', 'candles'),
+    INTENT_REVENUE_GROWTH: ('profile', 'financials'),
+    INTENT_PEER_COMPARISON: ('profile', 'financials', 'peers'),
+    INTENT_FINANCIAL_METRICS: ('profile', 'financials'),
+    INTENT_OVERVIEW: ('profile', 'financials')
+}
+
+MARKET_TERMS = {
+    MARKET_SECTORS: [
+        (r'sector', 2), (r'industr', 2), (r'tech', 1), (r'health', 1), (r'energy', 1),
+        (r'financials\b', 1), (r'communication', 1)
+    ],
+    MARKET_VOLUME: [(r'volume', 2), (r'most (?:traded|active)', 2), (r'liquidity', 1)],
+    MARKET_GLOBAL: [
+        (r'global', 2), (r'international', 2), (r'world', 2), (r'europe', 2), (r'asia', 2),
+        (r'japan', 2), (r'nikkei', 2), (r'ftse', 2), (r'uk\b', 1)
+    ],
+    MARKET_MOVERS: [
+        (r'mover', 2), (r'gainer', 2), (r'loser', 2), (r'winner', 2),
+        (r'(?:top|best|worst) perform', 1), (r'biggest', 1)
+    ],
+    MARKET_US: [
+        (r's&p', 2), (r'spx\b', 2), (r'dow', 2), (r'nasdaq', 2), (r'index', 2), (r'indices', 2),
+        (r'overall', 1), (r'market (?:today|perform|doing|trend)', 1)
+    ],
+    MARKET_SENTIMENT: [(r'sentiment', 2), (r'bullish', 2), (r'bearish', 2), (r'mood', 2)]
+}
+# Sentiment is cheap and gives every market answer some context
+MARKET_ALWAYS = (MARKET_SENTIMENT,)
+MARKET_DEFAULT = (MARKET_US, MARKET_MOVERS)
+
+MIN_SCORE = 1
+
+CompanyRoute = namedtuple('CompanyRoute', ['intents', 'components'])
+
+
+def compile_terms(terms):
+    """One precompiled pattern per intent; each term is a named group so a single scan finds all of them."""
+    compiled = {}
+    for intent, intent_terms in terms.items():
+        pattern = '|'.join(f'(?P<t{i}>{term})' for i, (term, _) in enumerate(intent_terms))
+        weights = {f't{i}': weight for i, (_, weight) in enumerate(intent_terms)}
+        compiled[intent] = (re.compile(rf'\b(?:{pattern})', re.IGNORECASE), weights)
+    return compiled
+
+
+_company_patterns = compile_terms(COMPANY_TERMS)
+_market_patterns = compile_terms(MARKET_TERMS)
+
+
+def score_intents(message, patterns):
+    """Score of every intent with at least MIN_SCORE, each distinct term counted once, best first."""
+    scores = {}
+    for intent, (pattern, weights) in patterns.items():
+        matched = {match.lastgroup for match in pattern.finditer(message)}
+        score = sum(weights[group] for group in matched)
+        if score >= MIN_SCORE:
+            scores[intent] = score
+    # Ties keep declaration order
+    return sorted(scores, key=lambda intent: -scores[intent])
+
+
+def route_company(message):
+    """
+    Intents of a company question and the context components needed to answer it.
+
+    Returns:
+        CompanyRoute: intents ordered by relevance (at most MAX_COMPANY_INTENTS, the overview
+        when nothing matches) and the set of components to fetch
+    """
+    intents = tuple(score_intents(message, _company_patterns)[:MAX_COMPANY_INTENTS]) or (INTENT_OVERVIEW,)
+    components = {component for intent in intents for component in COMPANY_REQUIREMENTS[intent]}
+    return CompanyRoute(intents, components)
+
+
+def route_market(message):
+    """Parts of the market snapshot a market question is about, ordered by relevance."""
+    parts = [part for part in score_intents(message, _market_patterns) if part not in MARKET_ALWAYS]
+    return tuple(parts or MARKET_DEFAULT) + MARKET_ALWAYS
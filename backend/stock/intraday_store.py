@@ -0,0 +1,295 @@
+import logging
+import threading
+import time
+from datetime import datetime, timezone
+import numpy as np
+import pandas as pd
+import yfinance as yf
+from django.core.cache import cache
+
+logger = logging.getLogger(__name__)
+
+INTRADAY_KEY_PREFIX = "intraday_bars_"
+INTRADAY_STATE_TIMEOUT = 60 * 60 * 24 * 4  # Keeps the last session across a long weekend
+SESSION_GAP = 60 * 60 * 4  # A gap this long between bars starts a new session
+MAX_INCREMENTAL_AGE = 60 * 60 * 24  # Older series are reloaded from scratch instead of caught up
+GROUP_WINDOW = 60 * 15  # Symbols whose last bars are this close are downloaded together
+INITIAL_CAPACITY = 512  # A regular US session has 390 one-minute bars
+FIELDS = ('open', 'high', 'low', 'close', 'volume')
+
+
+def epoch_seconds(index):
+    """Epoch seconds of a (possibly tz-aware) DatetimeIndex, as int64."""
+    if index.tz is not None:
+        index = index.tz_convert(None)
+    return index.values.astype('datetime64[s]').astype(np.int64)
+
+
+class IntradaySeries:
+    """
+    Append-only one-minute bars of the current session for one symbol.
+
+    Bars live in preallocated NumPy arrays that grow by doubling. Session aggregates
+    (first/last close, high, low, VWAP) are updated from the new bars only, so a
+    refresh costs the handful of bars since the previous one.
+    """
+
+    def __init__(self, symbol):
+        self.symbol = symbol
+        self.length = 0
+        self.timestamps = np.empty(INITIAL_CAPACITY, dtype=np.int64)
+        self.bars = {field: np.empty(INITIAL_CAPACITY, dtype=np.float64) for field in FIELDS}
+        self._reset_aggregates()
+
+    def _reset_aggregates(self):
+        self.first = None
+        self.last = None
+        self.high = -np.inf
+        self.low = np.inf
+        self.price_volume = 0.0
+        self.volume = 0.0
+
+    def reset(self):
+        self.length = 0
+        self._reset_aggregates()
+
+    @property
+    def last_timestamp(self):
+        return int(self.timestamps[self.length - 1]) if self.length else None
+
+    def _ensure_capacity(self, extra):
+        needed = self.length + extra
+        capacity = len(self.timestamps)
+        if needed <= capacity:
+            return
+        while capacity < needed:
+            capacity *= 2
+        self.timestamps = np.resize(self.timestamps, capacity)
+        self.bars = {field: np.resize(values, capacity) for field, values in self.bars.items()}
+
+    @staticmethod
+    def _bar_terms(bars):
+        """High and low (close where missing), price * volume and volume of bars, for the aggregates."""
+        close = bars['close']
+        high = np.where(np.isnan(bars['high']), close, bars['high'])
+        low = np.where(np.isnan(bars['low']), close, bars['low'])
+        volume = np.nan_to_num(bars['volume'])
+        return high, low, (high + low + close) / 3 * volume, volume
+
+    def _revise_last(self, bar):
+        """
+        Replace the last stored bar, which was downloaded while its minute was still in
+        progress, and correct the session aggregates for it.
+        """
+        index = self.length - 1
+        old = {field: self.bars[field][index:index + 1].copy() for field in FIELDS}
+        for field in FIELDS:
+            self.bars[field][index] = bar[field]
+        new = {field: self.bars[field][index:index + 1] for field in FIELDS}
+
+        old_high, old_low, old_price_volume, old_volume = (float(v[0]) for v in self._bar_terms(old))
+        new_high, new_low, new_price_volume, new_volume = (float(v[0]) for v in self._bar_terms(new))
+        self.price_volume += new_price_volume - old_price_volume
+        self.volume += new_volume - old_volume
+        self.last = float(bar['close'])
+        if self.length == 1:
+            self.first = self.last
+
+        # High and low only need a full rescan when the revised bar held the extreme and moved away from it
+        if new_high >= self.high:
+            self.high = new_high
+        elif old_high >= self.high:
+            self.high = float(self._bar_terms(self._stored())[0].max())
+        if new_low <= self.low:
+            self.low = new_low
+        elif old_low <= self.low:
+            self.low = float(self._bar_terms(self._stored())[1].min())
+
+    def _stored(self):
+        return {field: values[:self.length] for field, values in self.bars.items()}
+
+    def append(self, timestamps, bars):
+        """
+        Append bars newer than the last stored one. A fresh copy of the last stored bar
+        replaces it, since that bar may have been stored before its minute was over.
+
+        Args:
+            timestamps (np.ndarray): Bar start times in epoch seconds, ascending
+            bars (dict): 'open', 'high', 'low', 'close', 'volume' arrays aligned with timestamps
+
+        Returns:
+            int: Number of bars appended or revised
+        """
+        new = ~np.isnan(bars['close'])
+        revised = 0
+        if self.length:
+            same = np.flatnonzero(new & (timestamps == self.last_timestamp))
+            if len(same):
+                self._revise_last({field: float(bars[field][same[-1]]) for field in FIELDS})
+                revised = 1
+            new &= timestamps > self.last_timestamp
+        if not new.any():
+            return revised
+        timestamps = timestamps[new]
+        bars = {field: np.asarray(bars[field], dtype=np.float64)[new] for field in FIELDS}
+
+        # A long gap means the previous session is over
+        if self.length and timestamps[0] - self.last_timestamp > SESSION_GAP:
+            self.reset()
+
+        count = len(timestamps)
+        self._ensure_capacity(count)
+        end = self.length + count
+        self.timestamps[self.length:end] = timestamps
+        for field in FIELDS:
+            self.bars[field][self.length:end] = bars[field]
+        self.length = end
+
+        # Incremental session aggregates over the new bars only
+        close = bars['close']
+        high, low, price_volume, volume = self._bar_terms(bars)
+        if self.first is None:
+            self.first = float(close[0])
+        self.last = float(close[-1])
+        self.high = max(self.high, float(high.max()))
+        self.low = min(self.low, float(low.min()))
+        self.price_volume += float(price_volume.sum())
+        self.volume += float(volume.sum())
+        return count + revised
+
+    def summary(self):
+        """Session aggregates, or None before the first bar."""
+        if not self.length:
+            return None
+        change = self.last - self.first
+        return {
+            'price': self.last,
+            'change': change,
+            'change_percent': change / self.first * 100 if self.first else None,
+            'high': self.high,
+            'low': self.low,
+            'vwap': self.price_volume / self.volume if self.volume else None,
+            'bars': self.length,
+            'last_timestamp': self.last_timestamp
+        }
+
+    def to_state(self):
+        return {
+            'timestamps': self.timestamps[:self.length].copy(),
+            'bars': {field: values[:self.length].copy() for field, values in self.bars.items()}
+        }
+
+    @classmethod
+    def from_state(cls, symbol, state):
+        series = cls(symbol)
+        series.append(state['timestamps'], state['bars'])
+        return series
+
+
+class IntradayBarStore:
+    """
+    Intraday bars for a fixed universe of symbols, kept in memory and mirrored to the
+    shared cache (Redis in production) so other workers and restarts resume from it.
+
+    Each refresh downloads only new bars. Symbols are grouped by their last stored
+    bar, so markets that closed hours ago (e.g. Tokyo or London during the US session)
+    do not pull the rest of the group back to their close.
+    """
+
+    def __init__(self, symbols):
+        self.symbols = list(symbols)
+        self.series = {}
+        self._lock = threading.Lock()
+
+    def _load(self, symbol):
+        state = cache.get(f"{INTRADAY_KEY_PREFIX}{symbol}")
+        if state is None:
+            return IntradaySeries(symbol)
+        return IntradaySeries.from_state(symbol, state)
+
+    def _save(self, series):
+        cache.set(f"{INTRADAY_KEY_PREFIX}{series.symbol}", series.to_state(), INTRADAY_STATE_TIMEOUT)
+
+    def _download(self, symbols, start):
+        kwargs = {'period': '1d'} if start is None else {
+            'start': datetime.fromtimestamp(start, tz=timezone.utc)
+        }
+        frame = yf.download(
+            symbols,
+            interval='1m',
+            group_by='column',
+            auto_adjust=True,
+            threads=True,
+            progress=False,
+            **kwargs
+        )
+        if not frame.empty and not isinstance(frame.columns, pd.MultiIndex):
+            frame.columns = pd.MultiIndex.from_product([frame.columns, symbols])
+        return frame
+
+    def _download_groups(self):
+        """
+        (start, symbols) download groups. Symbols without recent bars load the whole
+        current session (start None); the others are grouped while their last bars lie
+        within GROUP_WINDOW, and each group starts at its oldest last bar, so bars stored
+        while their minute was in progress are downloaded again and revised.
+        """
+        now = time.time()
+        reload = []
+        pending = []
+        for symbol, series in self.series.items():
+            last = series.last_timestamp
+            if last is None or now - last > MAX_INCREMENTAL_AGE:
+                reload.append(symbol)
+            else:
+                pending.append((last, symbol))
+
+        groups = [(None, reload)] if reload else []
+        group_start = None
+        for last, symbol in sorted(pending):
+            if group_start is None or last - group_start > GROUP_WINDOW:
+                group_start = last
+                groups.append((last, []))
+            groups[-1][1].append(symbol)
+        return groups
+
+    def _append_frame(self, symbols, frame):
+        timestamps = epoch_seconds(frame.index)
+        added = 0
+        for symbol in symbols:
+            if symbol not in frame['Close'].columns:
+                continue
+            series = self.series[symbol]
+            bars = {
+                field: frame[field.capitalize()][symbol].to_numpy(dtype=np.float64)
+                for field in FIELDS
+            }
+            count = series.append(timestamps, bars)
+            if count:
+                self._save(series)
+            added += count
+        return added
+
+    def refresh(self):
+        """Fetch and append new bars for every symbol. Returns the number of bars added."""
+        with self._lock:
+            for symbol in self.symbols:
+                if symbol not in self.series:
+                    self.series[symbol] = self._load(symbol)
+
+            groups = self._download_groups()
+            added = 0
+            for start, symbols in groups:
+                frame = self._download(symbols, start)
+                if not frame.empty:
+                    added += self._append_frame(symbols, frame)
+            logger.info(
+                f"Intraday store appended {added} bars for {len(self.symbols)} symbols in {len(groups)} downloads"
+            )
+            return added
+
+    def summary_frame(self):
+        """Session aggregates of every symbol with bars, indexed by symbol."""
+        with self._lock:
+            rows = {symbol: series.summary() for symbol, series in self.series.items()}
+        return pd.DataFrame.from_dict({s: r for s, r in rows.items() if r}, orient='index')
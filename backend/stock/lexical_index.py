@@ -0,0 +1,150 @@
+import heapq
+import json
+import logging
+import math
+import os
+import re
+import threading
+from collections import Counter, defaultdict
+from typing import Dict, List, Tuple
+
+logger = logging.getLogger(__name__)
+
+# Stored next to index.faiss/index.pkl and built from the same chunks
+LEXICAL_INDEX_FILE = "bm25.json"
+LEXICAL_INDEX_VERSION = 1
+
+BM25_K1 = 1.5
+BM25_B = 0.75
+RRF_K = 60  # Reciprocal-rank fusion constant
+
+# Keeps figures like "10.2", "1,234" and "2024" as single tokens so exact numbers match
+TOKEN_PATTERN = re.compile(r"[a-z0-9]+(?:[.,][0-9]+)*")
+STOPWORDS = frozenset([
+    "a", "an", "and", "are", "as", "at", "be", "by", "for", "from", "has", "have", "in", "is",
+    "it", "its", "of", "on", "or", "that", "the", "this", "to", "was", "were", "what", "which",
+    "with", "how", "does", "do", "any"
+])
+
+
+def tokenize(text: str) -> List[str]:
+    """Lowercase word and number tokens without stopwords."""
+    return [t for t in TOKEN_PATTERN.findall(text.lower()) if t not in STOPWORDS]
+
+
+class BM25Index:
+    """
+    Persistent BM25 inverted index over the chunks of a FAISS docstore.
+
+    Postings hold precomputed BM25 term weights, so a query is a sum over the
+    postings of its terms with no per-document work at search time.
+    """
+
+    def __init__(self, doc_ids: List[str], postings: Dict[str, List[Tuple[int, float]]]):
+        self.doc_ids = doc_ids
+        self.postings = postings
+
+    @classmethod
+    def from_texts(cls, doc_ids: List[str], texts: List[str], k1: float = BM25_K1, b: float = BM25_B):
+        """Build the index from chunk texts keyed by their docstore ids."""
+        term_freqs = [Counter(tokenize(text)) for text in texts]
+        doc_lengths = [sum(tf.values()) for tf in term_freqs]
+        avg_length = (sum(doc_lengths) / len(doc_lengths)) if doc_lengths else 0.0
+        num_docs = len(texts)
+
+        raw_postings = defaultdict(list)
+        for doc, tf in enumerate(term_freqs):
+            for term, freq in tf.items():
+                raw_postings[term].append((doc, freq))
+
+        postings = {}
+        for term, entries in raw_postings.items():
+            idf = math.log(1 + (num_docs - len(entries) + 0.5) / (len(entries) + 0.5))
+            weighted = []
+            for doc, freq in entries:
+                norm = k1 * (1 - b + b * doc_lengths[doc] / avg_length) if avg_length else k1
+                weighted.append((doc, round(idf * freq * (k1 + 1) / (freq + norm), 5)))
+            postings[term] = weighted
+
+        return cls(doc_ids, postings)
+
+    @classmethod
+    def from_vectorstore(cls, vectorstore):
+        """Build the index from the chunks already stored in a LangChain FAISS vector store."""
+        doc_ids = [vectorstore.index_to_docstore_id[i] for i in range(len(vectorstore.index_to_docstore_id))]
+        texts = [vectorstore.docstore.search(doc_id).page_content for doc_id in doc_ids]
+        return cls.from_texts(doc_ids, texts)
+
+    def search(self, query: str, k: int = 10) -> List[Tuple[str, float]]:
+        """Return up to k (docstore id, score) pairs, best first."""
+        scores = defaultdict(float)
+        for term in set(tokenize(query)):
+            for doc, weight in self.postings.get(term, ()):
+                scores[doc] += weight
+        best = heapq.nlargest(k, scores.items(), key=lambda item: item[1])
+        return [(self.doc_ids[doc], score) for doc, score in best]
+
+    def save(self, index_dir: str):
+        with open(os.path.join(index_dir, LEXICAL_INDEX_FILE), 'w') as f:
+            json.dump({
+                'version': LEXICAL_INDEX_VERSION,
+                'doc_ids': self.doc_ids,
+                'postings': self.postings
+            }, f, separators=(',', ':'))
+
+    @classmethod
+    def load(cls, index_dir: str):
+        with open(os.path.join(index_dir, LEXICAL_INDEX_FILE), 'r') as f:
+            data = json.load(f)
+        if data.get('version') != LEXICAL_INDEX_VERSION:
+            raise ValueError(f"Unsupported lexical index version: {data.get('version')}")
+        return cls(data['doc_ids'], {term: [tuple(p) for p in entries] for term, entries in data['postings'].items()})
+
+
+_loaded_indexes = {}
+_loaded_indexes_lock = threading.Lock()
+
+
+def load_lexical_index(index_dir: str, vectorstore=None):
+    """
+    Load the BM25 index stored with a FAISS index.
+    Indexes created before BM25 was added are built once from the FAISS docstore and saved.
+    """
+    path = os.path.join(index_dir, LEXICAL_INDEX_FILE)
+    mtime = os.path.getmtime(path) if os.path.exists(path) else None
+
+    with _loaded_indexes_lock:
+        cached = _loaded_indexes.get(index_dir)
+        if cached and mtime is not None and cached[0] == mtime:
+            return cached[1]
+
+    try:
+        if mtime is not None:
+            lexical_index = BM25Index.load(index_dir)
+        elif vectorstore is not None:
+            logger.info(f"No lexical index found in {index_dir}, building it from the FAISS docstore...")
+            lexical_index = BM25Index.from_vectorstore(vectorstore)
+            lexical_index.save(index_dir)
+            mtime = os.path.getmtime(path)
+        else:
+            return None
+    except Exception as e:
+        logger.error(f"Error loading lexical index from {index_dir}: {e}")
+        return None
+
+    with _loaded_indexes_lock:
+        _loaded_indexes[index_dir] = (mtime, lexical_index)
+    return lexical_index
+
+
+def reciprocal_rank_fusion(ranked_lists: List[List[str]], k: int = None, rrf_k: int = RRF_K) -> List[str]:
+    """
+    Fuse several ranked lists of ids with reciprocal-rank fusion.
+    Each id scores sum(1 / (rrf_k + rank)) over the lists it appears in.
+    """
+    scores = defaultdict(float)
+    for ranked in ranked_lists:
+        for rank, item in enumerate(ranked, start=1):
+            scores[item] += 1.0 / (rrf_k + rank)
+    fused = sorted(scores, key=scores.get, reverse=True)
+    return fused[:k] if k else fused
@@ -0,0 +1,238 @@
+import asyncio
+import importlib.util
+import json
+import logging
+import os
+import random
+import time
+from functools import cached_property
+import httpx
+from dotenv import load_dotenv
+from openai import AsyncOpenAI, OpenAI
+from .rate_limit import PriorityTokenBucket
+
+logger = logging.getLogger(__name__)
+
+load_dotenv()
+
+# Limits of our OpenAI account, shared by every LLM call in the process
+LLM_REQUESTS_PER_MINUTE = int(os.getenv('OPENAI_REQUESTS_PER_MINUTE', 500))
+LLM_REQUEST_BURST = int(os.getenv('OPENAI_REQUEST_BURST', 20))
+LLM_TOKENS_PER_MINUTE = int(os.getenv('OPENAI_TOKENS_PER_MINUTE', 200000))
+LLM_POOL_SIZE = 20
+LLM_TIMEOUT = httpx.Timeout(120, connect=10)  # Long completions and transcriptions take a while
+LLM_QUEUE_TIMEOUT = 60  # seconds a call may wait for rate-limit budget
+LLM_MAX_RETRIES = 4
+LLM_RETRY_BASE = 0.5  # seconds; backoff doubles per attempt, with full jitter
+LLM_RETRY_MAX = 20
+RETRY_STATUSES = frozenset([408, 409, 429, 500, 502, 503, 504])
+DEFAULT_COMPLETION_TOKENS = 1000  # Assumed completion size when a request sets no max_tokens
+
+# Priority classes: lower values are served first when calls queue for the rate limit
+PRIORITY_INTERACTIVE = 0  # Chat answers a user is waiting for
+PRIORITY_DEFAULT = 1  # Page analyses and summaries
+PRIORITY_BACKGROUND = 2  # Index building and other batch work
+
+# Internal header carrying a call's priority to the transport; never sent to OpenAI
+PRIORITY_HEADER = "X-LLM-Priority"
+
+# HTTP/2 multiplexes concurrent calls over a few connections when h2 is installed
+HTTP2 = importlib.util.find_spec('h2') is not None
+
+
+def priority_headers(priority):
+    return {PRIORITY_HEADER: str(priority)}
+
+
+def estimate_tokens(request):
+    """Tokens a request may use (prompt plus completion), for the tokens-per-minute budget."""
+    if not request.headers.get('content-type', '').startswith('application/json'):
+        return 1  # Audio uploads are not metered in tokens
+    try:
+        body = json.loads(request.content)
+    except ValueError:
+        body = {}
+    completion = body.get('max_tokens') or (DEFAULT_COMPLETION_TOKENS if 'messages' in body else 0)
+    return len(request.content) // 4 + completion  # About four bytes of JSON per token
+
+
+def retry_delay(attempt, response=None):
+    """Full-jitter exponential backoff, but never shorter than the server's Retry-After."""
+    delay = random.uniform(0, min(LLM_RETRY_MAX, LLM_RETRY_BASE * 2 ** attempt))
+    if response is not None:
+        try:
+            if 'retry-after-ms' in response.headers:
+                delay = max(delay, float(response.headers['retry-after-ms']) / 1000)
+            elif 'retry-after' in response.headers:
+                delay = max(delay, float(response.headers['retry-after']))
+        except ValueError:
+            pass
+    return min(delay, LLM_RETRY_MAX)
+
+
+def _pop_priority(request):
+    priority = request.headers.get(PRIORITY_HEADER)
+    if priority is not None:
+        del request.headers[PRIORITY_HEADER]
+    return int(priority) if priority is not None else PRIORITY_DEFAULT
+
+
+class RateLimitedTransport(httpx.BaseTransport):
+    """Waits for rate-limit budget before sending, and retries throttled or failed requests."""
+
+    def __init__(self, gateway, transport):
+        self.gateway = gateway
+        self.transport = transport
+
+    def handle_request(self, request):
+        priority = _pop_priority(request)
+        request.read()  # Buffer the body so it can be re-sent
+        self.gateway.acquire(priority, estimate_tokens(request))
+        for attempt in range(LLM_MAX_RETRIES + 1):
+            try:
+                response = self.transport.handle_request(request)
+            except httpx.TransportError as e:
+                if attempt == LLM_MAX_RETRIES:
+                    raise
+                delay = retry_delay(attempt)
+                logger.warning(f"OpenAI request to {request.url.path} failed ({e}), retrying in {delay:.1f}s")
+            else:
+                if response.status_code not in RETRY_STATUSES or attempt == LLM_MAX_RETRIES:
+                    return response
+                delay = retry_delay(attempt, response)
+                response.close()
+                logger.warning(f"OpenAI {request.url.path} returned {response.status_code}, retrying in {delay:.1f}s")
+            time.sleep(delay)
+
+    def close(self):
+        self.transport.close()
+
+
+class AsyncRateLimitedTransport(httpx.AsyncBaseTransport):
+    """Async variant of RateLimitedTransport; waiting for budget happens off the event loop."""
+
+    def __init__(self, gateway, transport):
+        self.gateway = gateway
+        self.transport = transport
+
+    async def handle_async_request(self, request):
+        priority = _pop_priority(request)
+        await request.aread()
+        await asyncio.to_thread(self.gateway.acquire, priority, estimate_tokens(request))
+        for attempt in range(LLM_MAX_RETRIES + 1):
+            try:
+                response = await self.transport.handle_async_request(request)
+            except httpx.TransportError as e:
+                if attempt == LLM_MAX_RETRIES:
+                    raise
+                delay = retry_delay(attempt)
+                logger.warning(f"OpenAI request to {request.url.path} failed ({e}), retrying in {delay:.1f}s")
+            else:
+                if response.status_code not in RETRY_STATUSES or attempt == LLM_MAX_RETRIES:
+                    return response
+                delay = retry_delay(attempt, response)
+                await response.aclose()
+                logger.warning(f"OpenAI {request.url.path} returned {response.status_code}, retrying in {delay:.1f}s")
+            await asyncio.sleep(delay)
+
+    async def aclose(self):
+        await self.transport.aclose()
+
+
+class LLMGateway:
+    """
+    Single access path to the OpenAI API.
+
+    Every client it hands out (OpenAI SDK, async SDK and LangChain models) shares one
+    pooled HTTP connection pool per sync/async side, one requests-per-minute and one
+    tokens-per-minute budget with priority classes, and retries of throttled (429)
+    and failed requests with jittered exponential backoff.
+    """
+
+    def __init__(self, api_key=None, requests_per_minute=LLM_REQUESTS_PER_MINUTE,
+                 request_burst=LLM_REQUEST_BURST, tokens_per_minute=LLM_TOKENS_PER_MINUTE):
+        self.api_key = api_key or os.getenv('OPENAI_API_KEY')
+        self.request_limiter = PriorityTokenBucket(requests_per_minute, request_burst)
+        # The whole minute's token budget may be used at once
+        self.token_limiter = PriorityTokenBucket(tokens_per_minute, tokens_per_minute)
+
+    def acquire(self, priority, tokens):
+        """
+        Wait for budget for one request of about the given number of tokens.
+
+        Raises:
+            RateLimitTimeout: If the budget did not free up within LLM_QUEUE_TIMEOUT
+        """
+        self.request_limiter.acquire(priority, timeout=LLM_QUEUE_TIMEOUT)
+        self.token_limiter.acquire(priority, timeout=LLM_QUEUE_TIMEOUT, cost=tokens)
+
+    @cached_property
+    def http_client(self):
+        limits = httpx.Limits(max_connections=LLM_POOL_SIZE, max_keepalive_connections=LLM_POOL_SIZE)
+        return httpx.Client(
+            transport=RateLimitedTransport(self, httpx.HTTPTransport(http2=HTTP2, limits=limits)),
+            timeout=LLM_TIMEOUT
+        )
+
+    @cached_property
+    def async_http_client(self):
+        limits = httpx.Limits(max_connections=LLM_POOL_SIZE, max_keepalive_connections=LLM_POOL_SIZE)
+        return httpx.AsyncClient(
+            transport=AsyncRateLimitedTransport(self, httpx.AsyncHTTPTransport(http2=HTTP2, limits=limits)),
+            timeout=LLM_TIMEOUT
+        )
+
+    # Retries happen in the transport, so the SDK's own retries are turned off
+
+    @cached_property
+    def client(self):
+        return OpenAI(api_key=self.api_key, http_client=self.http_client, max_retries=0)
+
+    @cached_property
+    def async_client(self):
+        return AsyncOpenAI(api_key=self.api_key, http_client=self.async_http_client, max_retries=0)
+
+    def chat(self, priority=PRIORITY_DEFAULT, **completion):
+        """Create a chat completion (same arguments as client.chat.completions.create)."""
+        return self.client.chat.completions.create(**completion, extra_headers=priority_headers(priority))
+
+    async def achat(self, priority=PRIORITY_DEFAULT, **completion):
+        return await self.async_client.chat.completions.create(**completion, extra_headers=priority_headers(priority))
+
+    async def astream(self, priority=PRIORITY_DEFAULT, **completion):
+        """Async iterator of chat completion chunks."""
+        return await self.async_client.chat.completions.create(
+            **completion, stream=True, extra_headers=priority_headers(priority)
+        )
+
+    def transcribe(self, file, priority=PRIORITY_DEFAULT, **kwargs):
+        """Create an audio transcription (same arguments as client.audio.transcriptions.create)."""
+        return self.client.audio.transcriptions.create(file=file, **kwargs, extra_headers=priority_headers(priority))
+
+    def chat_model(self, priority=PRIORITY_DEFAULT, **kwargs):
+        """LangChain chat model whose calls go through this gateway."""
+        from langchain_openai import ChatOpenAI
+        return ChatOpenAI(
+            api_key=self.api_key,
+            http_client=self.http_client,
+            http_async_client=self.async_http_client,
+            max_retries=0,
+            default_headers=priority_headers(priority),
+            **kwargs
+        )
+
+    def embeddings(self, priority=PRIORITY_BACKGROUND, **kwargs):
+        """LangChain embedding model whose calls go through this gateway."""
+        from langchain_openai import OpenAIEmbeddings
+        return OpenAIEmbeddings(
+            openai_api_key=self.api_key,
+            http_client=self.http_client,
+            http_async_client=self.async_http_client,
+            max_retries=0,
+            default_headers=priority_headers(priority),
+            **kwargs
+        )
+
+
+# Shared gateway used by views, the chat service and the earnings analyzer
+llm_gateway = LLMGateway()
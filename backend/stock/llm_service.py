@@ -1,14 +1,12 @@
 from .config import *
-from langchain.chat_models import ChatOpenAI
-from django.conf import settings
+from .llm_gateway import llm_gateway, PRIORITY_DEFAULT
 
-def llm_call():
-    # Initialize Azure ChatOpenAI
-
-    llm = ChatOpenAI(
+def llm_call(priority=PRIORITY_DEFAULT):
+    # LangChain chat model sharing the gateway's connection pool, rate limits and retries
+    llm = llm_gateway.chat_model(
+    priority=priority,
     model=GPT_MODEL,
-    temperature=0.3,
-    api_key=settings.OPENAI_API_KEY
+    temperature=0.3
     )
     return llm
 
@@ -0,0 +1,27 @@
+import time
+from django.core.management.base import BaseCommand
+from stock.views import refresh_earnings_schedule_snapshot
+
+
+class Command(BaseCommand):
+    help = "Rebuild the precomputed earnings schedule snapshot. Run periodically (e.g. every 5 minutes from cron)."
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--interval',
+            type=int,
+            default=0,
+            help='Keep running and rebuild every INTERVAL seconds instead of once'
+        )
+
+    def handle(self, *args, **options):
+        interval = options['interval']
+        while True:
+            try:
+                snapshot = refresh_earnings_schedule_snapshot()
+                self.stdout.write(self.style.SUCCESS(f"Earnings schedule snapshot rebuilt (ETag {snapshot['etag']})"))
+            except Exception as e:
+                self.stderr.write(f"Earnings schedule snapshot refresh failed: {e}")
+            if not interval:
+                break
+            time.sleep(interval)
@@ -0,0 +1,35 @@
+import time
+from django.core.management.base import BaseCommand
+from stock.market_snapshot import refresh_market_snapshot, is_market_open
+
+
+class Command(BaseCommand):
+    help = ("Rebuild the shared market snapshot (indices, sectors, movers, volume leaders). "
+            "With --interval it keeps running: every INTERVAL seconds while the market is open "
+            "and once after the close.")
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--interval',
+            type=int,
+            default=0,
+            help='Keep running and rebuild every INTERVAL seconds during market hours instead of once'
+        )
+
+    def handle(self, *args, **options):
+        interval = options['interval']
+        refreshed_after_close = False
+        while True:
+            market_open = is_market_open()
+            if market_open or not refreshed_after_close:
+                try:
+                    snapshot = refresh_market_snapshot()
+                    self.stdout.write(self.style.SUCCESS(
+                        f"Market snapshot rebuilt (market {'open' if snapshot['market_open'] else 'closed'})"))
+                    # Closing prices only need to be captured once per session
+                    refreshed_after_close = not market_open
+                except Exception as e:
+                    self.stderr.write(f"Market snapshot refresh failed: {e}")
+            if not interval:
+                break
+            time.sleep(interval)
@@ -0,0 +1,232 @@
+import logging
+import time
+from datetime import datetime
+import numpy as np
+import pandas as pd
+import pytz
+import yfinance as yf
+from .finnhub_gateway import finnhub_gateway
+from .intent_router import (
+    MARKET_GLOBAL, MARKET_MOVERS, MARKET_SECTORS, MARKET_SENTIMENT, MARKET_US, MARKET_VOLUME, route_market
+)
+from .intraday_store import IntradayBarStore
+from .swr_cache import get_or_refresh, refresh_now
+
+logger = logging.getLogger(__name__)
+
+# Market universe shown on the indices panel
+US_INDICES = {
+    '^DJI': 'Dow Jones',
+    '^GSPC': 'S&P 500',
+    '^IXIC': 'NASDAQ'
+}
+GLOBAL_INDICES = {
+    '^FTSE': 'FTSE 100',
+    '^N225': 'Nikkei 225'
+}
+SECTOR_ETFS = {
+    "XLK": "Technology",
+    "XLV": "Healthcare",
+    "XLF": "Financials",
+    "XLE": "Energy",
+    "XLI": "Industrials",
+    "XLC": "Communication"
+}
+# Large S&P 500 constituents used for volume leaders and top movers
+LARGE_CAPS = [
+    "AAPL", "MSFT", "AMZN", "GOOGL", "META", "NVDA", "TSLA", "BRK-B", "UNH", "JNJ",
+    "XOM", "JPM", "V", "PG", "CVX", "HD", "MA", "LLY", "MRK", "ABBV",
+    "PEP", "KO", "BAC", "PFE", "COST", "AVGO", "DIS", "CSCO", "MCD", "WMT",
+    "ACN", "DHR", "NEE", "TXN", "LIN", "VZ", "ADBE", "CMCSA", "NFLX", "INTC"
+]
+TOP_N = 5
+CHAT_TOP_N = 3
+
+# Shared snapshot cache: refreshed every minute while the market is open, and kept
+# much longer outside market hours, when prices do not move
+MARKET_SNAPSHOT_KEY = "market_snapshot"
+MARKET_OPEN_SOFT_TTL = 60
+MARKET_CLOSED_SOFT_TTL = 60 * 60 * 6
+MARKET_SNAPSHOT_HARD_TTL = 60 * 60 * 24 * 3  # Covers a long weekend
+MARKET_SENTIMENT_SYMBOL = "SPY"  # Market proxy for news sentiment
+EASTERN = pytz.timezone('US/Eastern')
+
+# One-minute bars of the indices and sector ETFs, appended to on every refresh
+intraday_store = IntradayBarStore([*US_INDICES, *GLOBAL_INDICES, *SECTOR_ETFS])
+
+
+def download_frame(symbols, period, interval):
+    """
+    Download OHLCV for many symbols in one bulk request.
+
+    Returns a frame with (field, symbol) columns, aligned on one time index.
+    """
+    frame = yf.download(
+        symbols,
+        period=period,
+        interval=interval,
+        group_by='column',
+        auto_adjust=True,
+        threads=True,
+        progress=False
+    )
+    if not isinstance(frame.columns, pd.MultiIndex):
+        # A single symbol comes back with flat columns
+        frame.columns = pd.MultiIndex.from_product([frame.columns, symbols])
+    return frame
+
+
+def day_over_day(frame):
+    """Latest close and volume against the previous session, for every symbol at once."""
+    if len(frame) < 2:
+        return pd.DataFrame(columns=['price', 'change', 'change_percent', 'volume', 'volume_change_percent'], dtype=float)
+    close = frame['Close'].ffill()
+    volume = frame['Volume']
+
+    last_close, prev_close = close.iloc[-1], close.iloc[-2]
+    last_volume, prev_volume = volume.iloc[-1], volume.iloc[-2].replace(0, np.nan)
+    return pd.DataFrame({
+        'price': last_close,
+        'change': last_close - prev_close,
+        'change_percent': (last_close - prev_close) / prev_close * 100,
+        'volume': last_volume,
+        'volume_change_percent': (last_volume - prev_volume) / prev_volume * 100
+    }).dropna(subset=['price', 'change_percent', 'volume'])
+
+
+def format_volume(volume):
+    return f"{volume / 1e9:.1f}B" if volume >= 1e9 else f"{volume / 1e6:.1f}M"
+
+
+def quote_rows(changes, names):
+    """Rows for the index and sector tables, keyed by symbol, in universe order."""
+    rounded = changes.round(2)
+    return {
+        symbol: {
+            'name': names[symbol],
+            'price': float(rounded.at[symbol, 'price']),
+            'change': float(rounded.at[symbol, 'change']),
+            'change_percent': float(rounded.at[symbol, 'change_percent'])
+        }
+        for symbol in names if symbol in rounded.index
+    }
+
+
+def build_market_snapshot():
+    """
+    Build the indices panel data (indices, sectors, movers, volume leaders).
+
+    Indices and sector ETFs come from the intraday bar store, which only downloads
+    the bars added since the previous refresh. The large caps are fetched with one
+    bulk two-day download, and all changes are computed column-wise on the aligned frame.
+    """
+    intraday_store.refresh()
+    index_changes = intraday_store.summary_frame()
+    if index_changes.empty:
+        index_changes = pd.DataFrame(columns=['price', 'change', 'change_percent'], dtype=float)
+    stocks = day_over_day(download_frame(LARGE_CAPS, period='2d', interval='1d'))
+
+    missing = sorted(set(LARGE_CAPS) - set(stocks.index))
+    if missing:
+        logger.warning(f"No two-day history for {', '.join(missing)}")
+
+    leaders = stocks.nlargest(TOP_N, 'volume')
+    volume_leaders = [
+        {
+            'symbol': symbol,
+            'volume': format_volume(row.volume),
+            'volume_change_percent': round(float(row.volume_change_percent), 1)
+            if not np.isnan(row.volume_change_percent) else None,
+            'price': round(float(row.price), 2),
+            'change_percent': round(float(row.change_percent), 2)
+        }
+        for symbol, row in leaders.iterrows()
+    ]
+
+    ranked = stocks[['price', 'change', 'change_percent']].round(2).sort_values('change_percent', ascending=False)
+    ranked.index.name = 'symbol'
+    movers = ranked.reset_index().to_dict('records')
+
+    return {
+        'us': quote_rows(index_changes, US_INDICES),
+        'global': quote_rows(index_changes, GLOBAL_INDICES),
+        'sectors': quote_rows(index_changes, SECTOR_ETFS),
+        'movers': {
+            'gainers': movers[:TOP_N],
+            'losers': movers[-TOP_N:]
+        },
+        'volume_leaders': volume_leaders
+    }
+
+
+def is_market_open(now=None):
+    """Whether US markets are open (9:30 AM to 4:00 PM Eastern, Monday to Friday)."""
+    now = now or datetime.now(EASTERN)
+    market_open = now.replace(hour=9, minute=30, second=0, microsecond=0)
+    market_close = now.replace(hour=16, minute=0, second=0, microsecond=0)
+    return now.weekday() < 5 and market_open <= now <= market_close
+
+
+def fetch_market_sentiment():
+    try:
+        sentiment = finnhub_gateway.news_sentiment(MARKET_SENTIMENT_SYMBOL)
+        return {
+            'bullish_percent': sentiment.get('sentiment', {}).get('bullishPercent', 0),
+            'bearish_percent': sentiment.get('sentiment', {}).get('bearishPercent', 0)
+        }
+    except Exception as e:
+        logger.warning(f"Failed to fetch sentiment data: {e}")
+        return None
+
+
+def fetch_market_snapshot():
+    """Panel data plus market sentiment, stamped with when and in which session it was taken."""
+    snapshot = build_market_snapshot()
+    snapshot['sentiment'] = fetch_market_sentiment()
+    snapshot['market_open'] = is_market_open()
+    snapshot['as_of'] = int(time.time())
+    return snapshot
+
+
+def get_market_snapshot():
+    """
+    Return the shared market snapshot. Cached data is served immediately and refreshed
+    in the background once stale, so callers only wait on yfinance when the cache is
+    cold. Keep it warm with the refresh_market_snapshot command.
+    """
+    soft_ttl = MARKET_OPEN_SOFT_TTL if is_market_open() else MARKET_CLOSED_SOFT_TTL
+    return get_or_refresh(MARKET_SNAPSHOT_KEY, fetch_market_snapshot, soft_ttl, MARKET_SNAPSHOT_HARD_TTL)
+
+
+def refresh_market_snapshot():
+    return refresh_now(MARKET_SNAPSHOT_KEY, fetch_market_snapshot, MARKET_SNAPSHOT_HARD_TTL)
+
+
+def _price_rows(rows):
+    return {row['name']: {'price': row['price'], 'change_percent': row['change_percent']} for row in rows.values()}
+
+
+MARKET_CHAT_PARTS = {
+    MARKET_US: lambda snapshot: _price_rows(snapshot['us']),
+    MARKET_SECTORS: lambda snapshot: _price_rows(snapshot['sectors']),
+    MARKET_GLOBAL: lambda snapshot: _price_rows(snapshot['global']),
+    MARKET_VOLUME: lambda snapshot: {
+        row['symbol']: {'volume': row['volume'], 'volume_change_percent': row['volume_change_percent']}
+        for row in snapshot['volume_leaders']
+    },
+    MARKET_MOVERS: lambda snapshot: {
+        'gainers': snapshot['movers']['gainers'][:CHAT_TOP_N],
+        'losers': snapshot['movers']['losers'][-CHAT_TOP_N:]
+    },
+    MARKET_SENTIMENT: lambda snapshot: snapshot.get('sentiment')
+}
+
+
+def market_chat_data(message, snapshot):
+    """Select the parts of the snapshot a market chat question is about (see intent_router.route_market)."""
+    market_data = {}
+    for part in route_market(message):
+        data = MARKET_CHAT_PARTS[part](snapshot)
+        if data:
+            market_data[part] = data
+    return market_data
@@ -0,0 +1,325 @@
+import logging
+from functools import lru_cache
+from .intent_router import (
+    INTENT_FINANCIAL_METRICS, INTENT_MARKET_REACTION, INTENT_PEER_COMPARISON, INTENT_REVENUE_GROWTH
+)
+
+logger = logging.getLogger(__name__)
+
+CHAT_MODEL = "gpt-3.5-turbo"
+CONTEXT_TOKEN_BUDGET = 700  # Tokens of company or market data per chat prompt
+NEWS_SUMMARY_CHARS = 200
+MISSING = "-"
+
+# Metric tables as (label, annual key, TTM key) rows of Finnhub basic financials
+PROFITABILITY_METRICS = [
+    ('Gross margin %', 'grossMarginAnnual', 'grossMarginTTM'),
+    ('Operating margin %', 'operatingMarginAnnual', 'operatingMarginTTM'),
+    ('Net margin %', 'netMarginAnnual', 'netMarginTTM'),
+    ('ROA %', 'roaAnnual', 'roaTTM'),
+    ('ROE %', 'roeAnnual', 'roeTTM')
+]
+VALUATION_METRICS = [
+    ('P/E', 'peBasicExcl', 'peTTM'),
+    ('Forward P/E', None, 'forwardPE'),
+    ('P/S', 'psAnnual', 'psTTM'),
+    ('P/B', 'pbAnnual', 'pbQuarterly'),
+    ('EV/EBITDA', 'evToEbitdaAnnual', 'evEbitdaTTM')
+]
+BALANCE_SHEET_METRICS = [
+    ('Debt/equity', 'totalDebtToEquityAnnual', 'totalDebtToEquityQuarterly'),
+    ('Debt/assets', 'totalDebtToTotalAssetsAnnual', None),
+    ('Current ratio', 'currentRatioAnnual', 'currentRatioQuarterly'),
+    ('Quick ratio', 'quickRatioAnnual', 'quickRatioQuarterly'),
+    ('Interest coverage', 'interestCoverageAnnual', None),
+    ('Asset turnover', 'assetTurnoverAnnual', 'assetTurnoverTTM'),
+    ('Inventory turnover', 'inventoryTurnoverAnnual', 'inventoryTurnoverTTM')
+]
+# Growth rates as (label, TTM key, 3 year key, 5 year key)
+GROWTH_METRICS = [
+    ('Revenue growth %', 'revenueGrowthTTM', 'revenueGrowth3Y', 'revenueGrowth5Y'),
+    ('EPS growth %', 'epsGrowthTTM', 'epsGrowth3Y', 'epsGrowth5Y')
+]
+OVERVIEW_METRICS = [
+    ('P/E', 'peBasicExcl', 'peTTM'),
+    ('Net margin %', 'netMarginAnnual', 'netMarginTTM'),
+    ('Debt/equity', 'totalDebtToEquityAnnual', 'totalDebtToEquityQuarterly'),
+    ('Current ratio', 'currentRatioAnnual', 'currentRatioQuarterly')
+]
+# Columns of the peer comparison table as (header, metric key)
+PEER_COLUMNS = [
+    ('P/E', 'peBasicExcl'),
+    ('P/S', 'psAnnual'),
+    ('P/B', 'pbAnnual'),
+    ('D/E', 'totalDebtToEquityAnnual'),
+    ('Gross %', 'grossMarginAnnual'),
+    ('Op %', 'operatingMarginAnnual'),
+    ('Net %', 'netMarginAnnual'),
+    ('Rev gr TTM %', 'revenueGrowthTTM'),
+    ('Rev gr 3Y %', 'revenueGrowth3Y')
+]
+
+MARKET_TITLES = {
+    'us': "US indices",
+    'global': "Global indices",
+    'sectors': "Sectors",
+    'volume': "Volume leaders",
+    'sentiment': "Market news sentiment (SPY)"
+}
+
+
+@lru_cache(maxsize=None)
+def _encoding(model):
+    """
+    tiktoken encoding of a model, or None to fall back to an estimate. The result is
+    cached either way, so a failed download is not retried on every count.
+    """
+    try:
+        import tiktoken
+    except ImportError:
+        logger.warning("tiktoken is not installed; prompt token counts are estimated")
+        return None
+    try:
+        try:
+            return tiktoken.encoding_for_model(model)
+        except KeyError:
+            return tiktoken.get_encoding("cl100k_base")
+    except Exception as e:
+        # The encoding file is downloaded on first use and may not be reachable
+        logger.warning(f"Could not load the tiktoken encoding for {model}; prompt token counts are estimated: {e}")
+        return None
+
+
+def preload_encoding(model=CHAT_MODEL):
+    """Load the encoding up front (at startup), so no request waits for its download."""
+    _encoding(model)
+
+
+def count_tokens(text, model=CHAT_MODEL):
+    """Number of tokens the model sees for text, counted locally with tiktoken."""
+    encoding = _encoding(model)
+    if encoding is None:
+        return len(text) // 4 + 1  # Rough estimate for English text
+    return len(encoding.encode(text))
+
+
+def format_value(value):
+    """Short text for a number: two decimals, large values abbreviated, missing values as '-'."""
+    if value is None or value == '':
+        return MISSING
+    if not isinstance(value, (int, float)):
+        return str(value)
+    for divisor, suffix in ((1e12, 'T'), (1e9, 'B'), (1e6, 'M')):
+        if abs(value) >= divisor:
+            return f"{value / divisor:.2f}{suffix}"
+    return f"{value:.2f}".rstrip('0').rstrip('.') if isinstance(value, float) else str(value)
+
+
+def format_table(header, rows):
+    """Pipe-separated table; rows without any value are dropped."""
+    rows = [row for row in rows if any(cell != MISSING for cell in row[1:])]
+    if not rows:
+        return []
+    return [" | ".join(header)] + [" | ".join(row) for row in rows]
+
+
+def section(title, lines):
+    """A titled block of lines, or an empty list if there is nothing to show."""
+    return [f"## {title}"] + lines if lines else []
+
+
+def metric_table(metrics, rows):
+    return format_table(
+        ['Metric', 'Annual', 'TTM'],
+        [[label, format_value(metrics.get(annual) if annual else None),
+          format_value(metrics.get(ttm) if ttm else None)] for label, annual, ttm in rows]
+    )
+
+
+def growth_table(metrics):
+    return format_table(
+        ['Metric', 'TTM', '3Y', '5Y'],
+        [[label] + [format_value(metrics.get(key)) for key in keys] for label, *keys in GROWTH_METRICS]
+    )
+
+
+def latest_series(series, period, name, count):
+    """The most recent count entries of a Finnhub financials series, oldest first."""
+    values = series.get(period, {}).get(name, [])
+    return sorted(values, key=lambda x: x.get('period', ''))[-count:]
+
+
+def market_cap(profile):
+    """Market capitalization in currency units (Finnhub reports it in millions)."""
+    value = profile.get('marketCapitalization')
+    return value * 1e6 if value else None
+
+
+def company_header(profile):
+    fields = [
+        ('Company', f"{profile.get('name', '')} ({profile.get('ticker', '')})"),
+        ('Industry', profile.get('finnhubIndustry')),
+        ('Market cap', f"{format_value(market_cap(profile))} {profile.get('currency', '')}" if market_cap(profile) else None),
+        ('Exchange', profile.get('exchange')),
+        ('Country', profile.get('country'))
+    ]
+    return [" | ".join(f"{label}: {value}" for label, value in fields if value)]
+
+
+def price_lines(stock_data, metrics):
+    closes = (stock_data or {}).get('c') or []
+    if not closes:
+        return []
+    first, last = closes[0], closes[-1]
+    lines = [
+        f"Last close {format_value(last)}; 1M change {format_value((last - first) / first * 100 if first else None)}%; "
+        f"1M high {format_value(max(stock_data['h']) if stock_data.get('h') else None)}; "
+        f"1M low {format_value(min(stock_data['l']) if stock_data.get('l') else None)}"
+    ]
+    if metrics.get('52WeekHigh') or metrics.get('52WeekLow'):
+        lines.append(f"52W high {format_value(metrics.get('52WeekHigh'))}; 52W low {format_value(metrics.get('52WeekLow'))}")
+    return lines
+
+
+def news_lines(news):
+    lines = []
+    for item in news or []:
+        summary = item.get('summary', '')
+        if len(summary) > NEWS_SUMMARY_CHARS:
+            summary = summary[:NEWS_SUMMARY_CHARS].rsplit(' ', 1)[0] + "..."
+        lines.append(f"- {item.get('datetime', '')} {item.get('source', '')}: {item.get('headline', '')}"
+                     + (f" — {summary}" if summary else ""))
+    return lines
+
+
+def revenue_lines(series):
+    quarterly = latest_series(series, 'quarterly', 'revenue', 4)
+    annual = latest_series(series, 'annual', 'revenue', 3)
+    return format_table(
+        ['Period', 'Revenue'],
+        [[q.get('period', ''), format_value(q.get('v'))] for q in quarterly]
+        + [[f"FY {a.get('period', '')}", format_value(a.get('v'))] for a in annual]
+    )
+
+
+def latest_quarter_lines(series):
+    rows = []
+    for label, name in (('Revenue', 'revenue'), ('EBIT', 'ebit'), ('EBITDA', 'ebitda'), ('Net income', 'netIncome')):
+        latest = latest_series(series, 'quarterly', name, 1)
+        rows.append([label, latest[0].get('period', '') if latest else MISSING,
+                     format_value(latest[0].get('v')) if latest else MISSING])
+    return format_table(['Item', 'Period', 'Value'], rows)
+
+
+def peer_lines(symbol, profile, metrics, peers):
+    def row(peer_symbol, peer_profile, peer_metrics):
+        return [peer_symbol, format_value(market_cap(peer_profile))] + [
+            format_value(peer_metrics.get(key)) for _, key in PEER_COLUMNS
+        ]
+
+    rows = [row(symbol, profile, metrics)]
+    for peer_symbol, peer in (peers or {}).items():
+        rows.append(row(peer_symbol, peer['profile'], peer['financials'].get('metric', {})))
+    return format_table(['Symbol', 'Mkt cap'] + [header for header, _ in PEER_COLUMNS], rows)
+
+
+def intent_sections(intent, symbol, company_data):
+    """Context sections for one intent of a company question."""
+    profile = company_data['profile']
+    financials = company_data['financials']
+    metrics = financials.get('metric', {})
+    series = financials.get('series', {})
+
+    sections = []
+    if intent == INTENT_MARKET_REACTION:
+        sections += [
+            section("Price", price_lines(company_data.get('stock_data'), metrics)),
+            section("Valuation", metric_table(metrics, VALUATION_METRICS[:1])),
+            section("Recent news", news_lines(company_data.get('recent_news')))
+        ]
+    elif intent == INTENT_REVENUE_GROWTH:
+        sections += [
+            section("Growth", growth_table(metrics)),
+            section("Revenue", revenue_lines(series)),
+            section("Revenue per share", metric_table(
+                metrics, [('Revenue/share', 'revenuePerShareAnnual', 'revenuePerShareTTM')]))
+        ]
+    elif intent == INTENT_PEER_COMPARISON:
+        sections += [section("Company vs peers", peer_lines(
+            profile.get('ticker') or symbol, profile, metrics, company_data.get('peers')))]
+    elif intent == INTENT_FINANCIAL_METRICS:
+        sections += [
+            section("Profitability", metric_table(metrics, PROFITABILITY_METRICS)),
+            section("Growth", growth_table(metrics)),
+            section("Valuation", metric_table(metrics, VALUATION_METRICS)),
+            section("Balance sheet and efficiency", metric_table(metrics, BALANCE_SHEET_METRICS)),
+            section("Latest quarter", latest_quarter_lines(series))
+        ]
+    else:
+        sections += [
+            section("Key metrics", metric_table(metrics, OVERVIEW_METRICS)),
+            section("Growth", growth_table(metrics)[:2])
+        ]
+    return sections
+
+
+def company_sections(intents, symbol, company_data):
+    """Context sections for a company question, most relevant intent first, without repeats."""
+    sections = [company_header(company_data['profile'])]
+    for intent in intents:
+        sections += [lines for lines in intent_sections(intent, symbol, company_data) if lines not in sections]
+    return sections
+
+
+def market_sections(market_data):
+    """Context sections for a market question from market_snapshot.market_chat_data output."""
+    sections = []
+    for name, data in market_data.items():
+        title = MARKET_TITLES.get(name, name.capitalize())
+        if name == 'movers':
+            for side in ('gainers', 'losers'):
+                rows = data.get(side) or []
+                columns = [key for key in rows[0] if key != 'symbol'] if rows else []
+                sections.append(section(f"Top {side}", format_table(
+                    ['Symbol'] + columns,
+                    [[row.get('symbol', '')] + [format_value(row.get(key)) for key in columns] for row in rows]
+                )))
+        elif isinstance(data, dict) and data and all(isinstance(v, dict) for v in data.values()):
+            columns = list(next(iter(data.values())))
+            sections.append(section(title, format_table(
+                ['Name'] + columns,
+                [[key] + [format_value(row.get(column)) for column in columns] for key, row in data.items()]
+            )))
+        elif isinstance(data, dict):
+            sections.append(section(title, [f"{key}: {format_value(value)}" for key, value in data.items()]))
+        else:
+            sections.append(section(title, [format_value(data)]))
+    return sections
+
+
+def fit_to_budget(sections, budget=CONTEXT_TOKEN_BUDGET, model=CHAT_MODEL):
+    """
+    Join sections into the context text, keeping whole lines in order until the
+    token budget is spent. Earlier sections are the more important ones.
+    """
+    lines = []
+    used = 0
+    for lines_of_section in sections:
+        for line in lines_of_section:
+            tokens = count_tokens(line, model) + 1  # newline
+            if used + tokens > budget:
+                logger.info(f"Prompt context truncated at {used} of {budget} tokens")
+                return "\n".join(lines)
+            lines.append(line)
+            used += tokens
+    return "\n".join(lines)
+
+
+def build_company_context(intents, symbol, company_data, budget=CONTEXT_TOKEN_BUDGET):
+    """Compact text of the company data for the intents of a question, within the token budget."""
+    return fit_to_budget(company_sections(intents, symbol, company_data), budget)
+
+
+def build_market_context(market_data, budget=CONTEXT_TOKEN_BUDGET):
+    """Compact text of the market data selected for a question, within the token budget."""
+    return fit_to_budget(market_sections(market_data), budget) or "No market data available."
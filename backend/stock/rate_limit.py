@@ -0,0 +1,63 @@
+import heapq
+import itertools
+import threading
+import time
+
+DEFAULT_PRIORITY = 1
+DEFAULT_QUEUE_TIMEOUT = 30  # seconds a caller may wait for tokens
+
+
+class RateLimitTimeout(Exception):
+    """Raised when a caller waited longer than its timeout for rate-limit tokens."""
+
+
+class PriorityTokenBucket:
+    """
+    Thread-safe token bucket. When callers queue for tokens, the one with the
+    highest priority (lowest value) is served first, FIFO within a priority.
+
+    A call may cost more than one token (e.g. the prompt size for a tokens-per-minute
+    budget); costs above the bucket capacity are capped to it.
+    """
+
+    def __init__(self, calls_per_minute, burst):
+        self.rate = calls_per_minute / 60.0
+        self.capacity = max(1, burst)
+        self._tokens = float(self.capacity)
+        self._last_refill = time.monotonic()
+        self._waiters = []
+        self._seq = itertools.count()
+        self._cond = threading.Condition()
+
+    def _refill(self):
+        now = time.monotonic()
+        self._tokens = min(self.capacity, self._tokens + (now - self._last_refill) * self.rate)
+        self._last_refill = now
+
+    def acquire(self, priority=DEFAULT_PRIORITY, timeout=DEFAULT_QUEUE_TIMEOUT, cost=1):
+        cost = min(cost, self.capacity)
+        deadline = time.monotonic() + timeout if timeout is not None else None
+        with self._cond:
+            ticket = (priority, next(self._seq))
+            heapq.heappush(self._waiters, ticket)
+            try:
+                while True:
+                    self._refill()
+                    if self._waiters[0] == ticket and self._tokens >= cost:
+                        heapq.heappop(self._waiters)
+                        self._tokens -= cost
+                        self._cond.notify_all()
+                        return
+                    wait = (cost - self._tokens) / self.rate if self._waiters[0] == ticket else None
+                    if deadline is not None:
+                        remaining = deadline - time.monotonic()
+                        if remaining <= 0:
+                            raise RateLimitTimeout("Rate limit queue timeout")
+                        wait = min(wait, remaining) if wait is not None else remaining
+                    self._cond.wait(wait)
+            except BaseException:
+                if ticket in self._waiters:
+                    self._waiters.remove(ticket)
+                    heapq.heapify(self._waiters)
+                    self._cond.notify_all()
+                raise
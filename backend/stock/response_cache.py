@@ -0,0 +1,153 @@
+import functools
+import hashlib
+import json
+import logging
+import os
+import socket
+import time
+from django.core.cache import cache
+from django.http import HttpResponse
+from rest_framework.response import Response
+
+logger = logging.getLogger(__name__)
+
+RESPONSE_CACHE_PREFIX = "endpoint_cache:"
+METRICS_PREFIX = "endpoint_cache_metrics:"
+FILL_LOCK_SUFFIX = ":filling"
+FILL_LOCK_TIMEOUT = 30  # A fill holding the lock longer than this is considered dead
+FILL_WAIT_TIMEOUT = 10  # How long other workers wait for a fill before calling upstream themselves
+FILL_POLL_INTERVAL = 0.1
+
+WORKER_ID = f"{socket.gethostname()}:{os.getpid()}"
+
+# Per-endpoint cache policy: how long a response stays valid and which request
+# parameters make up its key. Path parameters are always part of the key.
+CACHE_POLICIES = {
+    'company_news': {'ttl': 60 * 5, 'params': ['symbol']},
+    'social_sentiment': {'ttl': 60 * 15, 'params': ['symbol']},
+    'news_sentiment': {'ttl': 60 * 15, 'params': ['symbol']},
+    'financial_metrics': {'ttl': 60 * 60 * 6, 'params': []},  # Changes once a quarter
+    'medium_term_impact': {'ttl': 60 * 10, 'params': []},  # Ratings plus peer quotes
+    'long_term_impact': {'ttl': 60 * 60 * 12, 'params': []},  # Consensus estimates
+    'company_comparison': {'ttl': 60, 'params': []},  # Includes live quotes
+}
+
+# Views set this header on responses assembled from incomplete upstream data,
+# which are served but not cached
+PARTIAL_RESPONSE_HEADER = 'X-Partial-Result'
+
+# Parameters holding ticker symbols are case-insensitive
+SYMBOL_PARAMS = {'symbol', 'symbols'}
+
+
+def _normalize(name, value):
+    value = str(value).strip()
+    return value.upper() if name in SYMBOL_PARAMS else value
+
+
+def build_cache_key(endpoint, path_params, query_params):
+    """Key an endpoint response by its endpoint name and normalized parameters."""
+    params = {name: _normalize(name, value) for name, value in {**query_params, **path_params}.items()
+              if value not in (None, '')}
+    digest = hashlib.sha1(json.dumps(params, sort_keys=True).encode()).hexdigest()
+    return f"{RESPONSE_CACHE_PREFIX}{endpoint}:{digest}"
+
+
+def _record(endpoint, outcome):
+    key = f"{METRICS_PREFIX}{endpoint}:{outcome}"
+    cache.add(key, 0, None)
+    try:
+        cache.incr(key)
+    except ValueError:
+        # Evicted between add and incr
+        cache.set(key, 1, None)
+
+
+def get_cache_metrics():
+    """Hit, miss and coalesced counts per cached endpoint, shared by all workers."""
+    metrics = {}
+    for endpoint in CACHE_POLICIES:
+        counts = {outcome: cache.get(f"{METRICS_PREFIX}{endpoint}:{outcome}", 0)
+                  for outcome in ('hit', 'miss', 'coalesced')}
+        lookups = sum(counts.values())
+        counts['hit_rate'] = round((counts['hit'] + counts['coalesced']) / lookups, 3) if lookups else None
+        metrics[endpoint] = counts
+    return metrics
+
+
+def _serialize(response):
+    headers = {name: value for name, value in response.items() if name.lower() != 'content-type'}
+    if isinstance(response, Response):
+        return {'data': response.data, 'headers': headers}
+    return {
+        'content': response.content,
+        'content_type': response['Content-Type'],
+        'headers': headers
+    }
+
+
+def _deserialize(entry):
+    if 'data' in entry:
+        response = Response(entry['data'])
+    else:
+        response = HttpResponse(entry['content'], content_type=entry['content_type'])
+    for name, value in entry['headers'].items():
+        response[name] = value
+    response['X-Cache'] = 'HIT'
+    return response
+
+
+def _wait_for_fill(key):
+    deadline = time.monotonic() + FILL_WAIT_TIMEOUT
+    while time.monotonic() < deadline:
+        time.sleep(FILL_POLL_INTERVAL)
+        entry = cache.get(key)
+        if entry is not None:
+            return entry
+        if cache.get(key + FILL_LOCK_SUFFIX) is None:
+            break  # The fill failed or was not cacheable
+    return None
+
+
+def cache_response(endpoint):
+    """
+    Cache successful responses of a view according to CACHE_POLICIES[endpoint].
+
+    Entries live in the shared Django cache (Redis in production), so all workers
+    reuse them. On a miss, one worker fetches while the others wait for its result,
+    so a burst of identical requests costs a single upstream call. Error responses
+    and partial responses are never cached.
+
+    Use below @api_view so the view receives the parsed request.
+    """
+    policy = CACHE_POLICIES[endpoint]
+
+    def decorator(view):
+        @functools.wraps(view)
+        def wrapper(request, *args, **kwargs):
+            query_params = {name: request.GET.get(name) for name in policy['params']}
+            key = build_cache_key(endpoint, kwargs, query_params)
+
+            entry = cache.get(key)
+            if entry is not None:
+                _record(endpoint, 'hit')
+                return _deserialize(entry)
+
+            # Only one worker fills a key at a time: cache.add is atomic (SET NX on Redis)
+            if not cache.add(key + FILL_LOCK_SUFFIX, WORKER_ID, FILL_LOCK_TIMEOUT):
+                entry = _wait_for_fill(key)
+                if entry is not None:
+                    _record(endpoint, 'coalesced')
+                    return _deserialize(entry)
+
+            _record(endpoint, 'miss')
+            try:
+                response = view(request, *args, **kwargs)
+                if response.status_code == 200 and not response.has_header(PARTIAL_RESPONSE_HEADER):
+                    cache.set(key, _serialize(response), policy['ttl'])
+                response['X-Cache'] = 'MISS'
+                return response
+            finally:
+                cache.delete(key + FILL_LOCK_SUFFIX)
+        return wrapper
+    return decorator
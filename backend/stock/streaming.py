@@ -0,0 +1,63 @@
+import asyncio
+import json
+import logging
+from django.http import StreamingHttpResponse
+from .llm_gateway import llm_gateway, PRIORITY_INTERACTIVE
+
+logger = logging.getLogger(__name__)
+
+
+def sse_event(data, event=None):
+    """Encode one Server-Sent Event."""
+    lines = [f"event: {event}"] if event else []
+    lines.append(f"data: {json.dumps(data)}")
+    return "\n".join(lines) + "\n\n"
+
+
+async def stream_completion(completion, priority=PRIORITY_INTERACTIVE):
+    """Yield the text deltas of an OpenAI chat completion as they arrive."""
+    stream = await llm_gateway.astream(priority, **completion)
+    async for chunk in stream:
+        if chunk.choices and chunk.choices[0].delta.content:
+            yield chunk.choices[0].delta.content
+
+
+async def sse_chat_events(prepare, on_error, on_complete=None):
+    """
+    Server-Sent Events for one streamed chat answer.
+
+    The completion request is built by prepare() in a worker thread (it may read
+    caches or call upstream APIs), then tokens are forwarded as 'data: {"token": ...}'
+    events and the stream ends with a 'done' event. Failures are reported as the
+    same apology text the JSON endpoints return, followed by 'done'.
+
+    Args:
+        prepare (callable): Returns the chat completion kwargs
+        on_error (callable): Maps an exception to the user-facing answer
+        on_complete (callable): Called in a worker thread with the full answer once it streamed without errors
+    """
+    # Send something right away so proxies and the browser open the stream
+    yield ": stream open\n\n"
+    try:
+        completion = await asyncio.to_thread(prepare)
+        tokens = []
+        async for token in stream_completion(completion):
+            tokens.append(token)
+            yield sse_event({'token': token})
+        if on_complete:
+            await asyncio.to_thread(on_complete, ''.join(tokens).strip())
+    except Exception as e:
+        logger.error(f"Error streaming chat response: {str(e)}", exc_info=True)
+        yield sse_event({'error': on_error(e)}, event='error')
+    yield sse_event({}, event='done')
+
+
+def sse_response(events, headers=None):
+    """Streaming HTTP response for an async iterator of SSE strings (streamed when served over ASGI)."""
+    response = StreamingHttpResponse(events, content_type='text/event-stream', headers=headers)
+    response["Cache-Control"] = "no-cache"
+    response["X-Accel-Buffering"] = "no"  # Stop reverse proxies from buffering the stream
+    response["Access-Control-Allow-Origin"] = "https://advisorinsight-production.up.railway.app"
+    response["Access-Control-Allow-Methods"] = "POST, OPTIONS"
+    response["Access-Control-Allow-Headers"] = "Content-Type"
+    return response
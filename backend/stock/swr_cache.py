@@ -0,0 +1,87 @@
+import logging
+import os
+import socket
+import time
+from concurrent.futures import ThreadPoolExecutor
+from django.core.cache import cache
+
+logger = logging.getLogger(__name__)
+
+REFRESH_LOCK_SUFFIX = ":refreshing"
+REFRESH_LOCK_TIMEOUT = 60 * 2  # A refresh holding the lock longer than this is considered dead
+MAX_REFRESH_WORKERS = 4
+
+WORKER_ID = f"{socket.gethostname()}:{os.getpid()}"
+
+_refresh_executor = ThreadPoolExecutor(max_workers=MAX_REFRESH_WORKERS, thread_name_prefix="cache-refresh")
+
+
+def _store(key, data, hard_ttl):
+    cache.set(key, {'data': data, 'fetched_at': time.time()}, hard_ttl)
+
+
+def _load(key):
+    """Cached entry for a key, or None; values not written by this module count as a miss."""
+    entry = cache.get(key)
+    if isinstance(entry, dict) and 'data' in entry and 'fetched_at' in entry:
+        return entry
+    return None
+
+
+def get_stale(key):
+    """Return whatever is cached for a key, however old, or None."""
+    entry = _load(key)
+    return entry['data'] if entry is not None else None
+
+
+def _refresh(key, fetch_fn, hard_ttl):
+    try:
+        _store(key, fetch_fn(), hard_ttl)
+        logger.info(f"Background refresh of {key} finished")
+    except Exception as e:
+        # Keep serving the stale entry until the hard TTL runs out
+        logger.warning(f"Background refresh of {key} failed, keeping stale data: {e}")
+    finally:
+        cache.delete(key + REFRESH_LOCK_SUFFIX)
+
+
+def _schedule_refresh(key, fetch_fn, hard_ttl):
+    # One refresh per key across all workers: cache.add is atomic (SET NX on Redis)
+    if not cache.add(key + REFRESH_LOCK_SUFFIX, WORKER_ID, REFRESH_LOCK_TIMEOUT):
+        return
+    _refresh_executor.submit(_refresh, key, fetch_fn, hard_ttl)
+
+
+def refresh_now(key, fetch_fn, hard_ttl):
+    """Fetch and store fresh data for a key, e.g. from a periodic job."""
+    data = fetch_fn()
+    _store(key, data, hard_ttl)
+    return data
+
+
+def get_or_refresh(key, fetch_fn, soft_ttl, hard_ttl):
+    """
+    Stale-while-revalidate cache lookup.
+
+    Entries younger than soft_ttl are returned as they are. Older entries are still
+    returned immediately while a single background refresh per key replaces them.
+    Entries are dropped after hard_ttl, after which the next caller fetches inline.
+
+    Args:
+        key (str): Cache key
+        fetch_fn (callable): Fetches fresh data; called without arguments
+        soft_ttl (int): Seconds before an entry is refreshed in the background
+        hard_ttl (int): Seconds before an entry is no longer served at all
+
+    Returns:
+        The cached or freshly fetched data
+    """
+    entry = _load(key)
+    if entry is not None:
+        if time.time() - entry['fetched_at'] > soft_ttl:
+            _schedule_refresh(key, fetch_fn, hard_ttl)
+        return entry['data']
+
+    data = fetch_fn()
+    _store(key, data, hard_ttl)
+    return data
@@ -0,0 +1,155 @@
+import json
+import logging
+import os
+from pathlib import Path
+from django.conf import settings
+from django.core.cache import cache
+from .finnhub_gateway import finnhub_gateway
+
+logger = logging.getLogger(__name__)
+
+TRANSCRIPT_KEY_PREFIX = "transcript_"
+QA_KEY_PREFIX = "transcript_qa_"
+TRANSCRIPT_CACHE_TIMEOUT = 60 * 60 * 24  # Transcripts never change once published
+QA_SESSION = 'question_answer'
+QA_FORMAT_VERSION = 1  # Bump when preprocess_transcript changes, so persisted Q&A is rebuilt
+
+
+def transcript_path(symbol, call_id):
+    return Path(settings.MEDIA_ROOT) / symbol / 'transcripts' / f"{call_id}.json"
+
+
+def qa_path(symbol, call_id):
+    return Path(settings.MEDIA_ROOT) / symbol / 'qa' / f"{call_id}.json"
+
+
+def _read_json(path):
+    try:
+        with open(path, 'r') as f:
+            return json.load(f)
+    except FileNotFoundError:
+        return None
+    except (OSError, ValueError) as e:
+        logger.warning(f"Ignoring unreadable file {path}: {e}")
+        return None
+
+
+def _write_json(path, data):
+    try:
+        os.makedirs(path.parent, exist_ok=True)
+        tmp_path = path.with_suffix('.json.tmp')
+        with open(tmp_path, 'w') as f:
+            json.dump(data, f)
+        os.replace(tmp_path, path)
+    except OSError as e:
+        logger.warning(f"Could not write {path}: {e}")
+
+
+def get_transcript(symbol, call_id):
+    """
+    Resolve an earnings call transcript: shared cache first, then the local transcript
+    store (data/<SYM>/transcripts/), and Finnhub only if neither has it. Downloaded
+    transcripts are saved to the local store.
+
+    Returns:
+        dict: Finnhub transcript, or None if Finnhub does not know the call
+
+    Raises:
+        FinnhubError: If the transcript had to be downloaded and Finnhub could not be reached
+    """
+    key = f"{TRANSCRIPT_KEY_PREFIX}{call_id}"
+    transcript = cache.get(key)
+    if transcript is not None:
+        return transcript
+
+    path = transcript_path(symbol, call_id)
+    transcript = _read_json(path)
+    if transcript is None:
+        logger.info(f"Transcript {call_id} not stored locally, fetching from Finnhub")
+        transcript = finnhub_gateway.transcripts(call_id)
+        if not transcript or not transcript.get('transcript'):
+            return None
+        _write_json(path, transcript)
+
+    cache.set(key, transcript, TRANSCRIPT_CACHE_TIMEOUT)
+    return transcript
+
+
+def preprocess_transcript(executives, qa_section):
+    """Process Q&A section of transcript into a structured format."""
+    processed_qa = []
+    current_question = None
+
+    for item in qa_section:
+        name = item['name']
+        is_executive = name in executives
+
+        for speech in item['speech']:
+            if not is_executive:  # This is an analyst asking a question
+                current_question = {
+                    'analyst': name,
+                    'question': speech,
+                    'responses': []
+                }
+                processed_qa.append(current_question)
+            else:  # This is an executive responding
+                if current_question:
+                    current_question['responses'].append({
+                        'executive': name,
+                        'response': speech
+                    })
+
+    return processed_qa
+
+
+def extract_qa(transcript):
+    """Questions and executive answers of a transcript's Q&A session."""
+    executives = [d['name'] for d in transcript.get('participant', []) if d.get('role') == 'executive']
+    qa_section = [
+        {'name': d['name'], 'speech': d['speech']}
+        for d in transcript.get('transcript', [])
+        if d.get('session') == QA_SESSION
+    ]
+    return preprocess_transcript(executives, qa_section)
+
+
+def get_qa(symbol, call_id):
+    """
+    Pre-extracted Q&A of a call, built once from the transcript and persisted next to
+    it (data/<SYM>/qa/) and in the shared cache.
+
+    Returns:
+        list: Output of preprocess_transcript, or None if the transcript is not available
+
+    Raises:
+        FinnhubError: If the transcript had to be downloaded and Finnhub could not be reached
+    """
+    key = f"{QA_KEY_PREFIX}{call_id}"
+    stored = cache.get(key)
+    if stored is not None:
+        return stored['qa']
+    stored = _read_json(qa_path(symbol, call_id))
+    if stored is not None and stored.get('version') == QA_FORMAT_VERSION:
+        cache.set(key, stored, TRANSCRIPT_CACHE_TIMEOUT)
+        return stored['qa']
+
+    transcript = get_transcript(symbol, call_id)
+    if transcript is None:
+        return None
+    stored = {'version': QA_FORMAT_VERSION, 'qa': extract_qa(transcript)}
+    _write_json(qa_path(symbol, call_id), stored)
+    cache.set(key, stored, TRANSCRIPT_CACHE_TIMEOUT)
+    return stored['qa']
+
+
+def format_qa(processed_qa):
+    """
+    Compact text form of the Q&A for prompts: numbered analyst questions, each
+    followed by its executive answers.
+    """
+    lines = []
+    for number, item in enumerate(processed_qa, 1):
+        lines.append(f"Q{number} ({item['analyst']}): {item['question']}")
+        for response in item['responses']:
+            lines.append(f"A ({response['executive']}): {response['response']}")
+    return "\n".join(lines)
@@ -0,0 +1,230 @@
+import hashlib
+import logging
+import re
+from collections import namedtuple
+from concurrent.futures import ThreadPoolExecutor
+from django.core.cache import cache
+from .llm_gateway import llm_gateway, PRIORITY_DEFAULT
+from .prompt_context import count_tokens
+
+logger = logging.getLogger(__name__)
+
+SUMMARY_MODEL = "gpt-3.5-turbo-16k"
+CHUNK_TOKENS = 3000  # Transcript tokens per map call
+REDUCE_INPUT_TOKENS = 8000  # Summary tokens per reduce call
+CHUNK_SUMMARY_TOKENS = 300
+FINAL_SUMMARY_TOKENS = 1000
+SUMMARY_WORKERS = 8
+CHUNK_SUMMARY_KEY_PREFIX = "transcript_chunk_summary_"
+CHUNK_SUMMARY_TIMEOUT = 60 * 60 * 24 * 30  # Summaries of a given text never change
+PROMPT_VERSION = 1  # Bump when the prompts change, so cached summaries are not reused
+
+SESSION_TITLES = {
+    'management_discussion': "Prepared remarks",
+    'question_answer': "Q&A"
+}
+
+MAP_PROMPT = (
+    "You are a financial analyst assistant. Summarize this part ({section}) of an earnings call "
+    "transcript in a few bullet points. Keep concrete figures, guidance, announcements and analyst "
+    "concerns, and attribute statements to speakers where it matters."
+)
+REDUCE_PROMPT = (
+    "You are a financial analyst assistant. Combine these partial summaries of consecutive parts of an "
+    "earnings call into one set of bullet points, merging duplicates and keeping concrete figures."
+)
+DIRECT_PROMPT = (
+    "You are a financial analyst assistant. Summarize the key points from this earnings call transcript, "
+    "focusing on financial performance, future guidance, and important announcements. Be concise but comprehensive."
+)
+FINAL_PROMPT = (
+    "You are a financial analyst assistant. Summarize the key points from this earnings call, focusing on "
+    "financial performance, future guidance, and important announcements. Be concise but comprehensive. "
+    "The input consists of summaries of consecutive parts of the call."
+)
+
+# Summary text, number of transcript chunks, and how many of them the summary is missing
+TranscriptSummary = namedtuple('TranscriptSummary', ['text', 'chunks', 'failed_chunks'])
+
+summary_executor = ThreadPoolExecutor(max_workers=SUMMARY_WORKERS, thread_name_prefix="transcript-summary")
+
+
+def transcript_turns(transcript_data):
+    """(session, 'Speaker: speech') pairs of a Finnhub transcript, in order."""
+    return [
+        (entry.get('session', ''), f"{entry.get('name', '')}: {speech}")
+        for entry in transcript_data.get('transcript', [])
+        for speech in entry.get('speech', [])
+    ]
+
+
+def transcript_text(transcript_data):
+    """Plain text of a transcript, one speaker turn per paragraph."""
+    return "\n\n".join(turn for _, turn in transcript_turns(transcript_data))
+
+
+def split_turn(turn, max_tokens):
+    """Split an overlong speaker turn at sentence boundaries."""
+    pieces = []
+    current = []
+    current_tokens = 0
+    for sentence in re.split(r'(?<=[.!?])\s+', turn):
+        tokens = count_tokens(sentence)
+        if current and current_tokens + tokens > max_tokens:
+            pieces.append(' '.join(current))
+            current, current_tokens = [], 0
+        current.append(sentence)
+        current_tokens += tokens
+    if current:
+        pieces.append(' '.join(current))
+    return pieces
+
+
+def chunk_turns(turns, max_tokens=CHUNK_TOKENS):
+    """
+    Group consecutive speaker turns into chunks of at most max_tokens that never
+    span two sessions (prepared remarks and Q&A are summarized separately).
+
+    Returns:
+        list: (session, text) chunks in transcript order
+    """
+    chunks = []
+    current = []
+    current_tokens = 0
+    current_session = None
+    for session, turn in turns:
+        tokens = count_tokens(turn)
+        if current and (session != current_session or current_tokens + tokens > max_tokens):
+            chunks.append((current_session, "\n\n".join(current)))
+            current, current_tokens = [], 0
+        current_session = session
+        if tokens > max_tokens:
+            for piece in split_turn(turn, max_tokens):
+                chunks.append((session, piece))
+            continue
+        current.append(turn)
+        current_tokens += tokens
+    if current:
+        chunks.append((current_session, "\n\n".join(current)))
+    return chunks
+
+
+def summarize(system_prompt, text, max_tokens):
+    """
+    One summary call, cached by the hash of its prompt and input. Re-summarizing a
+    transcript with a changed or added part only calls the model for that part.
+    """
+    digest = hashlib.sha256(f"{PROMPT_VERSION}\0{system_prompt}\0{max_tokens}\0{text}".encode()).hexdigest()
+    key = f"{CHUNK_SUMMARY_KEY_PREFIX}{digest}"
+    summary = cache.get(key)
+    if summary is not None:
+        return summary
+
+    completion = llm_gateway.chat(
+        PRIORITY_DEFAULT,
+        model=SUMMARY_MODEL,
+        messages=[
+            {"role": "system", "content": system_prompt},
+            {"role": "user", "content": text}
+        ],
+        max_tokens=max_tokens,
+        temperature=0.3
+    )
+    summary = (completion.choices[0].message.content or '').strip() if completion.choices else ''
+    if not summary:
+        raise ValueError("Empty summary received from OpenAI API")
+    cache.set(key, summary, CHUNK_SUMMARY_TIMEOUT)
+    return summary
+
+
+def batch_by_tokens(parts, max_tokens):
+    """
+    Group consecutive (summary, chunks covered) parts into batches of at most max_tokens
+    of summary text (a longer summary forms its own batch).
+    """
+    batches = []
+    current = []
+    current_tokens = 0
+    for part in parts:
+        tokens = count_tokens(part[0])
+        if current and current_tokens + tokens > max_tokens:
+            batches.append(current)
+            current, current_tokens = [], 0
+        current.append(part)
+        current_tokens += tokens
+    if current:
+        batches.append(current)
+    return batches
+
+
+def collect_parts(futures, covered, stage):
+    """
+    (summary, chunks covered) of every summary call that succeeded. Failed calls are
+    logged and left out, so the chunks they covered are missing from the result.
+    """
+    parts = []
+    for index, (future, chunks) in enumerate(zip(futures, covered)):
+        try:
+            parts.append((future.result(), chunks))
+        except Exception as e:
+            logger.warning(f"Could not summarize transcript {stage} {index + 1} of {len(futures)}: {e}")
+    if not parts:
+        raise ValueError("No part of the transcript could be summarized")
+    return parts
+
+
+def summarize_transcript(transcript_data):
+    """
+    Map-reduce summary of an earnings call transcript of any length.
+
+    Chunks (split by session and speaker turn) are summarized concurrently, then the
+    chunk summaries are combined level by level, concurrently within a level, until
+    they fit into one final call. The number of sequential model calls grows only
+    logarithmically with the transcript length.
+
+    A failed chunk or combination call does not fail the summary; the chunks it
+    covered are left out and counted in failed_chunks.
+
+    Returns:
+        TranscriptSummary: Summary text, chunk count and number of chunks missing from it
+
+    Raises:
+        ValueError: If the transcript is empty or no part of it could be summarized
+    """
+    turns = transcript_turns(transcript_data)
+    if not turns:
+        raise ValueError("Empty transcript text")
+    # Short calls fit into a single request
+    if sum(count_tokens(turn) for _, turn in turns) <= REDUCE_INPUT_TOKENS:
+        return TranscriptSummary(
+            summarize(DIRECT_PROMPT, transcript_text(transcript_data), FINAL_SUMMARY_TOKENS), 1, 0
+        )
+
+    chunks = chunk_turns(turns)
+
+    futures = [
+        summary_executor.submit(
+            summarize,
+            MAP_PROMPT.format(section=SESSION_TITLES.get(session, "earnings call")),
+            text,
+            CHUNK_SUMMARY_TOKENS
+        )
+        for session, text in chunks
+    ]
+    parts = collect_parts(futures, [1] * len(chunks), "chunk")
+    logger.info(f"Summarized {len(parts)} of {len(chunks)} transcript chunks")
+
+    batches = batch_by_tokens(parts, REDUCE_INPUT_TOKENS)
+    while len(batches) > 1:
+        futures = [
+            summary_executor.submit(
+                summarize, REDUCE_PROMPT, "\n\n".join(text for text, _ in batch), CHUNK_SUMMARY_TOKENS * 2
+            )
+            for batch in batches
+        ]
+        parts = collect_parts(futures, [sum(covered for _, covered in batch) for batch in batches], "combination")
+        batches = batch_by_tokens(parts, REDUCE_INPUT_TOKENS)
+
+    text = summarize(FINAL_PROMPT, "\n\n".join(text for text, _ in batches[0]), FINAL_SUMMARY_TOKENS)
+    covered = sum(chunks_covered for _, chunks_covered in batches[0])
+    return TranscriptSummary(text, len(chunks), len(chunks) - covered)
@@ -16,11 +16,16 @@ urlpatterns = [
     path('financial-metrics/<str:symbol>/', views.get_financial_metrics, name='financial-metrics'),
     path('earnings-call-sentiment/', views.earnings_call_sentiment, name='earnings-call-sentiment'),
     path('key-highlights/', views.get_key_highlights, name='key-highlights'),
+    path('key-highlights/status/', views.get_index_status, name='key-highlights-status'),
+    path('filings/search/', views.search_filings, name='search-filings'),
     path('chat/', views.chat, name='chat'),
+    path('chat/stream/', views.chat_stream, name='chat-stream'),
     path('suggested-questions/', views.get_suggested_questions, name='suggested-questions'),
     path('indices/', views.get_indices_data, name='get_indices_data'),
     path('chat/market/', views.market_chat, name='market_chat'),
     path('market-chat/', views.market_chat, name='market_chat'),
+    path('market-chat/stream/', views.market_chat_stream, name='market_chat_stream'),
     path('market-chat/suggested-questions/', views.get_market_suggested_questions, name='market_suggested_questions'),
+    path('cache-metrics/', views.get_response_cache_metrics, name='cache-metrics'),
     path('company-comparison/<str:symbols>/', views.get_company_comparison, name='company_comparison'),
 ] 
\ No newline at end of file
@@ -1,34 +1,44 @@
-from django.http import JsonResponse
+from django.http import JsonResponse, HttpResponse
 import json
 import os
 from pathlib import Path
 from django.conf import settings
-import requests
-from requests.adapters import HTTPAdapter
-from urllib3.util import Retry
 from datetime import datetime, timedelta, date
 import logging
-import socket
+import hashlib
 import time
+from concurrent.futures import ThreadPoolExecutor, wait
 from django.core.cache import cache
 from math import isnan
 import redis
 from rest_framework.decorators import api_view
 from rest_framework.response import Response
-from openai import OpenAI
-import finnhub
 from dotenv import load_dotenv
 from langchain.prompts import ChatPromptTemplate
 from .llm_service import llm_call
+from .llm_gateway import llm_gateway, PRIORITY_INTERACTIVE
+from .transcript_summary import summarize_transcript, transcript_text
+from .transcript_store import format_qa, get_qa
 from langchain.schema import BaseOutputParser
 from .earnings_analyzer import EarningsCallAnalyzer
 import glob
 from langchain_community.vectorstores import FAISS
-from langchain_openai import OpenAIEmbeddings
 from langchain_community.document_loaders import PyPDFLoader
 from langchain.text_splitter import RecursiveCharacterTextSplitter
 from .chat_service import ChatService
-import yfinance as yf
+from .index_jobs import submit_index_build, get_index_job, is_index_building, retry_cooldown_remaining
+from .embeddings import get_embeddings, get_index_embeddings, save_embedding_metadata, DEFAULT_EMBEDDING_BACKEND
+from .lexical_index import BM25Index, load_lexical_index, reciprocal_rank_fusion
+from .filing_store import get_filing_store, add_index_to_filing_store
+from .index_types import apply_index_type, DEFAULT_INDEX_TYPE
+from .swr_cache import get_or_refresh, get_stale, refresh_now
+from .finnhub_gateway import finnhub_gateway, FinnhubError
+from .candle_store import candle_store
+from .streaming import sse_chat_events, sse_response
+from .prompt_context import build_market_context
+from .market_snapshot import get_market_snapshot, market_chat_data
+from .comparison import parse_symbols, compare_companies
+from .response_cache import cache_response, get_cache_metrics, PARTIAL_RESPONSE_HEADER
 
 # Set up logging
 logger = logging.getLogger(__name__)
@@ -59,24 +69,29 @@ class QAAnalysisParser(BaseOutputParser):
 
 parser = QAAnalysisParser()
 
-# Use settings.FINNHUB_API_KEY instead of loading directly from environment
-finnhub_client = finnhub.Client(api_key=settings.FINNHUB_API_KEY)
-
-# Create a session with enhanced retry logic
-session = requests.Session()
-retries = Retry(
-    total=5,
-    backoff_factor=1,
-    status_forcelist=[502, 503, 504],
-    allowed_methods=frozenset(['GET', 'POST']),
-    raise_on_status=False,
-    respect_retry_after_header=True
-)
-session.mount('https://', HTTPAdapter(max_retries=retries))
+# All Finnhub calls share one pooled, rate-limited and coalescing gateway
+finnhub_client = finnhub_gateway
 
 # Cache settings
-CACHE_TIMEOUT = 60 * 15  # 15 minutes
-CACHE_KEY_PREFIX = "finnhub_earnings_"
+CACHE_TIMEOUT = 60 * 15  # 15 minutes, then refreshed in the background
+EARNINGS_STALE_TIMEOUT = 60 * 60 * 6  # Stale calendars are served for up to 6 hours
+# Keyed by symbol only: the calendar window moves with the date, but yesterday's calendar is
+# still a valid stale fallback (the old per-window "finnhub_earnings_" keys held bare lists)
+CACHE_KEY_PREFIX = "finnhub_earnings_calendar_"
+SCHEDULE_SNAPSHOT_KEY_PREFIX = "earnings_schedule_snapshot_"
+SCHEDULE_SNAPSHOT_TIMEOUT = 60 * 5  # Snapshot is rebuilt in the background after 5 minutes
+PARTIAL_SUMMARY_TIMEOUT = 60 * 5  # Earnings summaries missing some transcript chunks
+
+# Earnings calendar fan-out: one worker per ticker, bounded well under Finnhub's 30 calls/second limit
+EARNINGS_FETCH_WORKERS = 8
+EARNINGS_SCHEDULE_DEADLINE = 20  # seconds; slower tickers fall back to cached data
+earnings_executor = ThreadPoolExecutor(max_workers=EARNINGS_FETCH_WORKERS, thread_name_prefix="finnhub-earnings")
+
+# Per-request Finnhub fan-out (peer quotes, comparisons); the gateway enforces the rate limit
+FINNHUB_FANOUT_WORKERS = 16
+FINNHUB_CALL_TIMEOUT = 5  # seconds per upstream call
+MEDIUM_TERM_DEADLINE = 8  # seconds for the whole medium-term impact response
+finnhub_executor = ThreadPoolExecutor(max_workers=FINNHUB_FANOUT_WORKERS, thread_name_prefix="finnhub-fanout")
 
 # Company configurations
 COMPANY_NAMES = {
@@ -124,6 +139,9 @@ OVERLAP_SIZE = 200
 OPENAI_MODEL = "gpt-3.5-turbo"
 INDEX_DIR = "vector_dbs"
 PDF_DIR = "data"  # Relative to project root
+INDEX_BUILD_RETRY_AFTER = 15  # Seconds clients should wait before polling a building index
+RETRIEVAL_K = int(os.getenv('RETRIEVAL_K', 3))  # Chunks sent to the LLM per question
+RETRIEVAL_CANDIDATES = 10  # Candidates taken from each of the dense and lexical rankings before fusion
 
 chat_service = ChatService()
 
@@ -340,82 +358,31 @@ def get_company_transcripts(request, symbol):
         response["Access-Control-Allow-Headers"] = "Content-Type"
         return response
 
+def fetch_earnings_upstream(from_date, to_date, symbol):
+    """Fetch earnings calendar from Finnhub through the shared gateway (pooled, rate-limited, with retries)"""
+    try:
+        data = finnhub_client.earnings_calendar(_from=from_date, to=to_date, symbol=symbol)
+        return data.get("earningsCalendar", [])
+    except FinnhubError as e:
+        logger.error(f"All attempts failed for {symbol}: {e}")
+        raise
+
+def earnings_cache_key(symbol):
+    return f"{CACHE_KEY_PREFIX}{symbol}"
+
 def fetch_earnings(from_date, to_date, symbol):
-    """Fetch earnings calendar from Finnhub API using HTTP requests with caching"""
-    cache_key = f"{CACHE_KEY_PREFIX}{symbol}_{from_date}_{to_date}"
-    
-    # Try to get cached data first
-    cached_data = cache.get(cache_key)
-    if cached_data is not None:
-        logger.info(f"Using cached data for {symbol}")
-        return cached_data
-    
-    url = "https://finnhub.io/api/v1/calendar/earnings"
-    params = {
-        "from": from_date,
-        "to": to_date,
-        "symbol": symbol,
-        "token": settings.FINNHUB_API_KEY
-    }
-    
-    max_retries = 3
-    retry_delay = 2  # seconds
-    
-    for attempt in range(max_retries):
-        try:
-            # Try to resolve the hostname first
-            try:
-                socket.gethostbyname('finnhub.io')
-            except socket.gaierror as e:
-                logger.warning(f"DNS resolution failed for finnhub.io: {e}")
-                if attempt < max_retries - 1:
-                    time.sleep(retry_delay * (attempt + 1))
-                    continue
-                # On final attempt, try to use cached data if available
-                if cached_data is not None:
-                    logger.warning(f"Using stale cached data for {symbol} due to DNS error")
-                    return cached_data
-                raise
-            
-            response = session.get(url, params=params, timeout=120)
-            
-            # Handle 502 Bad Gateway specifically
-            if response.status_code == 502:
-                logger.warning(f"Received 502 from Finnhub for {symbol} (attempt {attempt + 1})")
-                if attempt < max_retries - 1:
-                    time.sleep(retry_delay * (attempt + 1))
-                    continue
-                # On final attempt with 502, use cached data if available
-                if cached_data is not None:
-                    logger.warning(f"Using stale cached data for {symbol} due to 502 error")
-                    return cached_data
-                
-            response.raise_for_status()
-            data = response.json().get("earningsCalendar", [])
-            
-            # Cache successful response
-            cache.set(cache_key, data, CACHE_TIMEOUT)
-            return data
-            
-        except requests.exceptions.RequestException as e:
-            logger.warning(f"Request failed for {symbol} (attempt {attempt + 1}/{max_retries}): {e}")
-            if attempt < max_retries - 1:
-                time.sleep(retry_delay * (attempt + 1))
-                continue
-            # On final attempt, try to use cached data
-            if cached_data is not None:
-                logger.warning(f"Using stale cached data for {symbol} due to request error")
-                return cached_data
-            logger.error(f"All attempts failed for {symbol}: {e}")
-            raise
-            
-        except Exception as e:
-            logger.error(f"Unexpected error fetching data for {symbol}: {e}")
-            # Try to use cached data on unexpected errors
-            if cached_data is not None:
-                logger.warning(f"Using stale cached data for {symbol} due to unexpected error")
-                return cached_data
-            raise
+    """
+    Fetch earnings calendar with stale-while-revalidate caching.
+    Cached data is returned immediately; after CACHE_TIMEOUT a single background
+    refresh runs, and stale data keeps being served for EARNINGS_STALE_TIMEOUT
+    if Finnhub is down.
+    """
+    return get_or_refresh(
+        earnings_cache_key(symbol),
+        lambda: fetch_earnings_upstream(from_date, to_date, symbol),
+        soft_ttl=CACHE_TIMEOUT,
+        hard_ttl=EARNINGS_STALE_TIMEOUT
+    )
 
 def format_eps(value):
     """Format EPS value as currency."""
@@ -438,17 +405,25 @@ def get_earnings_schedule():
     all_earnings_data = {}
     failed_tickers = []
     
-    # First, fetch all earnings data for all tickers
-    for ticker in TICKERS:
+    # First, fetch all earnings data for all tickers concurrently, bounded by a global deadline.
+    # Fetches still running at the deadline keep going in the pool and warm the cache.
+    futures = {
+        earnings_executor.submit(fetch_earnings, str(past_date), str(future_date), ticker): ticker
+        for ticker in TICKERS
+    }
+    done, _ = wait(futures, timeout=EARNINGS_SCHEDULE_DEADLINE)
+    
+    for future, ticker in futures.items():
         try:
-            earnings = fetch_earnings(from_date=str(past_date), to_date=str(future_date), symbol=ticker)
+            if future not in done:
+                raise TimeoutError(f"no response within {EARNINGS_SCHEDULE_DEADLINE}s")
+            earnings = future.result()
             all_earnings_data[ticker] = sorted(earnings, key=lambda x: x.get("date", ""))
         except Exception as e:
             logger.error(f"Error fetching data for {ticker}: {e}")
             failed_tickers.append(ticker)
             # Try to get cached data as fallback
-            cache_key = f"{CACHE_KEY_PREFIX}{ticker}_{str(past_date)}_{str(future_date)}"
-            cached_data = cache.get(cache_key)
+            cached_data = get_stale(earnings_cache_key(ticker))
             if cached_data is not None:
                 logger.info(f"Using cached data as fallback for {ticker}")
                 all_earnings_data[ticker] = sorted(cached_data, key=lambda x: x.get("date", ""))
@@ -525,17 +500,50 @@ def get_earnings_schedule():
     
     return earnings_data
 
+def build_earnings_schedule_snapshot():
+    """Build the earnings schedule once as pre-serialized JSON bytes with an ETag."""
+    earnings_data = get_earnings_schedule()
+    # The ETag only depends on the schedule itself, so it changes only when the calendar does
+    etag = '"' + hashlib.sha1(json.dumps(earnings_data, sort_keys=True).encode('utf-8')).hexdigest()[:20] + '"'
+    body = json.dumps({
+        'success': True,
+        'earnings': earnings_data,
+        'timestamp': datetime.now().isoformat()
+    }).encode('utf-8')
+    return {'body': body, 'etag': etag}
+
+def get_earnings_schedule_snapshot():
+    """
+    Return the materialized earnings schedule snapshot.
+    Rebuilt in the background once it is older than SCHEDULE_SNAPSHOT_TIMEOUT, and keyed
+    by date because ongoing calls are always shown as today.
+    """
+    return get_or_refresh(
+        f"{SCHEDULE_SNAPSHOT_KEY_PREFIX}{date.today()}",
+        build_earnings_schedule_snapshot,
+        soft_ttl=SCHEDULE_SNAPSHOT_TIMEOUT,
+        hard_ttl=EARNINGS_STALE_TIMEOUT
+    )
+
+def refresh_earnings_schedule_snapshot():
+    """Rebuild the earnings schedule snapshot now (used by the periodic refresh command)."""
+    return refresh_now(
+        f"{SCHEDULE_SNAPSHOT_KEY_PREFIX}{date.today()}",
+        build_earnings_schedule_snapshot,
+        hard_ttl=EARNINGS_STALE_TIMEOUT
+    )
+
 @api_view(['GET'])
 def get_earnings_schedule_view(request):
     """Django view function to handle earnings schedule requests."""
     try:
-        logger.info("Fetching earnings schedule")
-        earnings_data = get_earnings_schedule()
-        response = JsonResponse({
-            'success': True,
-            'earnings': earnings_data,
-            'timestamp': datetime.now().isoformat()
-        })
+        snapshot = get_earnings_schedule_snapshot()
+        if request.META.get('HTTP_IF_NONE_MATCH') == snapshot['etag']:
+            response = HttpResponse(status=304)
+        else:
+            response = HttpResponse(snapshot['body'], content_type='application/json')
+        response["ETag"] = snapshot['etag']
+        response["Cache-Control"] = "no-cache"
         response["Access-Control-Allow-Origin"] = "https://advisorinsight-production.up.railway.app"
         response["Access-Control-Allow-Methods"] = "GET, OPTIONS"
         response["Access-Control-Allow-Headers"] = "Content-Type"
@@ -562,12 +570,10 @@ def transcribe_audio(request):
         if not os.path.exists(file_path):
             return Response({'success': False, 'error': 'Audio file not found'}, status=404)
 
-        client = OpenAI(api_key=settings.OPENAI_API_KEY)
-        
         # Create transcription using OpenAI's Whisper model
         with open(file_path, "rb") as audio_file:
-            response = client.audio.transcriptions.create(
-                file=audio_file,
+            response = llm_gateway.transcribe(
+                audio_file,
                 model="whisper-1",
                 response_format="json",
                 language="en"
@@ -584,6 +590,7 @@ def transcribe_audio(request):
         }, status=500)
 
 @api_view(['GET'])
+@cache_response('company_news')
 def company_news(request):
     symbol = request.GET.get('symbol')
     if not symbol:
@@ -619,6 +626,7 @@ def company_news(request):
         return JsonResponse({'error': f'Failed to fetch news: {str(e)}'}, status=500)
 
 @api_view(['GET'])
+@cache_response('social_sentiment')
 def stock_social_sentiment(request):
     symbol = request.GET.get('symbol')
     if not symbol:
@@ -704,7 +712,8 @@ def stock_social_sentiment(request):
 @api_view(['GET'])
 def get_market_impact(request, symbol):
     """
-    Get market impact data including stock candles for short-term analysis
+    Get market impact data including stock candles for short-term analysis.
+    Pass layout=columnar to get candlestick_data as {"t": [...], "o": [...], ...}.
     """
     try:
         if not settings.FINNHUB_API_KEY:
@@ -724,15 +733,9 @@ def get_market_impact(request, symbol):
         logger.info(f"Fetching stock candle data for {symbol} from {from_time} to {to_time}")
         logger.info(f"Using Finnhub API key: {settings.FINNHUB_API_KEY[:5]}...")
 
-        # Get stock candle data from Finnhub with hourly resolution
+        # Hourly candles from the local candle store, which only fetches missing ranges
         try:
-            candle_data = finnhub_client.stock_candles(
-                symbol=symbol,
-                resolution='60',  # 1-hour resolution
-                _from=from_time,
-                to=to_time
-            )
-            logger.info(f"Raw Finnhub response for {symbol}: {candle_data}")
+            candles = candle_store.get_candles(symbol, '60', from_time, to_time)
         except Exception as api_error:
             logger.error(f"Finnhub API error for {symbol}: {str(api_error)}")
             response = JsonResponse({
@@ -743,13 +746,8 @@ def get_market_impact(request, symbol):
             response["Access-Control-Allow-Headers"] = "Content-Type"
             return response
 
-        if candle_data.get('s') != 'ok' or not candle_data.get('h'):
-            error_msg = 'No data available'
-            if candle_data.get('s') == 'no_data':
-                error_msg = f'No data available for {symbol}. This could be because the market is closed or the symbol is invalid.'
-            elif 'error' in candle_data:
-                error_msg = candle_data['error']
-            
+        if not len(candles):
+            error_msg = f'No data available for {symbol}. This could be because the market is closed or the symbol is invalid.'
             logger.error(f"Failed to fetch stock candle data for {symbol}: {error_msg}")
             response = JsonResponse({
                 'error': error_msg
@@ -760,22 +758,18 @@ def get_market_impact(request, symbol):
             return response
 
         # Calculate metrics
-        high_price = max(candle_data['h'])
-        low_price = min(candle_data['l'])
-        total_volume = sum(candle_data['v'])
-        spread_percent = ((high_price - low_price) / low_price) * 100
-
-        # Format candlestick data
-        candlestick_data = []
-        for i in range(len(candle_data['t'])):
-            candlestick_data.append({
-                'time': datetime.fromtimestamp(candle_data['t'][i]).strftime('%H:%M'),
-                'open': round(candle_data['o'][i], 2),
-                'high': round(candle_data['h'][i], 2),
-                'low': round(candle_data['l'][i], 2),
-                'close': round(candle_data['c'][i], 2),
-                'volume': candle_data['v'][i]
-            })
+        stats = candles.stats()
+        high_price = stats['high']
+        low_price = stats['low']
+        total_volume = stats['volume']
+        spread_percent = stats['spread_percent'] or 0
+
+        # Format candlestick data: rows by default, or compact columns with ?layout=columnar
+        # (not ?format=, which DRF reserves for choosing the renderer)
+        if request.GET.get('layout') == 'columnar':
+            candlestick_data = candles.to_columns()
+        else:
+            candlestick_data = candles.to_rows()
 
         # Format response
         response_data = {
@@ -821,24 +815,19 @@ def test_market_impact(request):
         to_time = int(datetime.now().timestamp())
         from_time = to_time - (24 * 60 * 60)  # 24 hours ago
 
-        # Get stock candle data from Finnhub
-        candle_data = finnhub_client.stock_candles(
-            symbol=symbol,
-            resolution='1',  # 1-minute resolution
-            _from=from_time,
-            to=to_time
-        )
+        # One-minute candles from the local candle store
+        stats = candle_store.get_candles(symbol, '1', from_time, to_time).stats()
 
-        if candle_data['s'] != 'ok':
+        if not stats:
             return Response({
                 'error': 'Failed to fetch stock candle data'
             }, status=400)
 
         # Calculate metrics
-        high_price = max(candle_data['h'])
-        low_price = min(candle_data['l'])
-        total_volume = sum(candle_data['v'])
-        spread_percent = ((high_price - low_price) / low_price) * 100
+        high_price = stats['high']
+        low_price = stats['low']
+        total_volume = stats['volume']
+        spread_percent = stats['spread_percent'] or 0
 
         # Format response
         response_data = {
@@ -867,7 +856,7 @@ def test_market_impact(request):
 
 @api_view(['GET'])
 def get_earnings_call_summary(request, symbol, call_id):
-    """Generate a summary of an earnings call using GPT-3.5-turbo-16k"""
+    """Generate a summary of an earnings call (map-reduce over transcript chunks, see transcript_summary)"""
     try:
         # Validate that the call_id matches the symbol
         if not call_id.startswith(symbol + "_"):
@@ -904,11 +893,7 @@ def get_earnings_call_summary(request, symbol, call_id):
                     transcript_data = json.load(f)
                 
                 # Extract text from transcript
-                summary_text = "OpenAI API key is not configured. Here's the raw transcript:\n\n"
-                for entry in transcript_data.get('transcript', []):
-                    speaker = entry.get('name', '')
-                    for speech in entry.get('speech', []):
-                        summary_text += f"{speaker}: {speech}\n\n"
+                summary_text = "OpenAI API key is not configured. Here's the raw transcript:\n\n" + transcript_text(transcript_data)
                 
                 response = JsonResponse({
                     'success': True,
@@ -929,6 +914,18 @@ def get_earnings_call_summary(request, symbol, call_id):
                 response["Access-Control-Allow-Headers"] = "Content-Type"
                 return response
         
+        cache_key = f"earnings_summary_{symbol}_{call_id}"
+        summary = cache.get(cache_key)
+        if summary:
+            response = JsonResponse({
+                'success': True,
+                'summary': summary
+            })
+            response["Access-Control-Allow-Origin"] = "https://advisorinsight-production.up.railway.app"
+            response["Access-Control-Allow-Methods"] = "GET, OPTIONS"
+            response["Access-Control-Allow-Headers"] = "Content-Type"
+            return response
+        
         # Get the transcript file path
         transcript_dir = Path(settings.MEDIA_ROOT) / symbol / 'transcripts'
         transcript_file = transcript_dir / f"{call_id}.json"
@@ -963,13 +960,9 @@ def get_earnings_call_summary(request, symbol, call_id):
         
         # Extract the relevant parts of the transcript
         try:
-            transcript_text = ""
-            for entry in transcript_data.get('transcript', []):
-                speaker = entry.get('name', '')
-                for speech in entry.get('speech', []):
-                    transcript_text += f"{speaker}: {speech}\n\n"
+            full_text = transcript_text(transcript_data)
             
-            if not transcript_text.strip():
+            if not full_text.strip():
                 logger.error("Empty transcript text generated")
                 response = JsonResponse({
                     'success': False,
@@ -991,52 +984,21 @@ def get_earnings_call_summary(request, symbol, call_id):
             response["Access-Control-Allow-Headers"] = "Content-Type"
             return response
         
-        # Generate summary using GPT-3.5-turbo-16k
+        # Map-reduce summary: chunks by session and speaker turn, summarized concurrently
         try:
-            # Initialize OpenAI client
-            client = OpenAI(api_key=api_key)
-            
-            logger.info("Making request to OpenAI API...")
-            completion = client.chat.completions.create(
-                model="gpt-3.5-turbo-16k",
-                messages=[
-                    {"role": "system", "content": "You are a financial analyst assistant. Summarize the key points from this earnings call transcript, focusing on financial performance, future guidance, and important announcements. Be concise but comprehensive."},
-                    {"role": "user", "content": transcript_text}
-                ],
-                max_tokens=1000,
-                temperature=0.3
-            )
-            
-            if not completion or not completion.choices:
-                logger.error("Empty response from OpenAI API")
-                # Return raw transcript as fallback
-                response = JsonResponse({
-                    'success': True,
-                    'summary': transcript_text[:2000] + "..." if len(transcript_text) > 2000 else transcript_text
-                })
-                response["Access-Control-Allow-Origin"] = "https://advisorinsight-production.up.railway.app"
-                response["Access-Control-Allow-Methods"] = "GET, OPTIONS"
-                response["Access-Control-Allow-Headers"] = "Content-Type"
-                return response
-            
-            summary = completion.choices[0].message.content
-            if not summary:
-                logger.error("Empty summary received from OpenAI API")
-                # Return raw transcript as fallback
-                response = JsonResponse({
-                    'success': True,
-                    'summary': transcript_text[:2000] + "..." if len(transcript_text) > 2000 else transcript_text
-                })
-                response["Access-Control-Allow-Origin"] = "https://advisorinsight-production.up.railway.app"
-                response["Access-Control-Allow-Methods"] = "GET, OPTIONS"
-                response["Access-Control-Allow-Headers"] = "Content-Type"
-                return response
+            logger.info("Summarizing transcript with OpenAI API...")
+            result = summarize_transcript(transcript_data)
+            summary = result.text
             
             logger.info(f"Successfully generated summary of length: {len(summary)}")
             
-            # Cache the summary
-            cache_key = f"earnings_summary_{symbol}_{call_id}"
-            cache.set(cache_key, summary, 60 * 60 * 24)  # Cache for 24 hours
+            # Cache the summary; one with missing chunks is kept only briefly so it is retried soon
+            # (the chunk summaries that did succeed are cached and not requested again)
+            if result.failed_chunks:
+                logger.warning(f"Summary of {call_id} is missing {result.failed_chunks} of {result.chunks} chunks")
+                cache.set(cache_key, summary, PARTIAL_SUMMARY_TIMEOUT)
+            else:
+                cache.set(cache_key, summary, 60 * 60 * 24)  # Cache for 24 hours
             
             response = JsonResponse({
                 'success': True,
@@ -1052,7 +1014,7 @@ def get_earnings_call_summary(request, symbol, call_id):
             # Return raw transcript as fallback
             response = JsonResponse({
                 'success': True,
-                'summary': transcript_text[:2000] + "..." if len(transcript_text) > 2000 else transcript_text
+                'summary': full_text[:2000] + "..." if len(full_text) > 2000 else full_text
             })
             response["Access-Control-Allow-Origin"] = "https://advisorinsight-production.up.railway.app"
             response["Access-Control-Allow-Methods"] = "GET, OPTIONS"
@@ -1071,53 +1033,74 @@ def get_earnings_call_summary(request, symbol, call_id):
         return response
 
 @api_view(['GET'])
+@cache_response('medium_term_impact')
 def get_medium_term_impact(request, symbol):
     """Get medium-term market impact data including analyst ratings and sector comparison."""
     try:
-        # Get analyst ratings
-        params = {"symbol": symbol, "token": settings.FINNHUB_API_KEY}
-        recommendation_url = "https://finnhub.io/api/v1/stock/recommendation"
-        price_target_url = "https://finnhub.io/api/v1/stock/price-target"
-        
-        # Fetch analyst recommendations
-        rec_response = session.get(recommendation_url, params=params)
-        if not rec_response.ok:
+        # Recommendations, price target, peers and beta are independent, so fetch them together.
+        # Anything not back by the deadline is left out and the response is marked partial.
+        deadline = time.monotonic() + MEDIUM_TERM_DEADLINE
+        missing = []
+        upstream = {
+            'ratings': finnhub_executor.submit(finnhub_client.recommendation_trends, symbol, timeout=FINNHUB_CALL_TIMEOUT),
+            'price_target': finnhub_executor.submit(finnhub_client.price_target, symbol, timeout=FINNHUB_CALL_TIMEOUT),
+            'peers': finnhub_executor.submit(finnhub_client.company_peers, symbol, timeout=FINNHUB_CALL_TIMEOUT),
+            'metrics': finnhub_executor.submit(finnhub_client.company_basic_financials, symbol, 'all', timeout=FINNHUB_CALL_TIMEOUT)
+        }
+        wait(upstream.values(), timeout=max(0, deadline - time.monotonic()))
+        
+        def upstream_result(name):
+            future = upstream[name]
+            if not future.done():
+                logger.warning(f"Timed out fetching {name} for {symbol}")
+                missing.append(name)
+                return None
+            try:
+                return future.result()
+            except FinnhubError as e:
+                logger.warning(f"Failed to fetch {name} for {symbol}: {e}")
+                missing.append(name)
+                return None
+        
+        ratings_data = upstream_result('ratings')
+        if 'ratings' in missing:
             return Response({'error': 'Failed to fetch analyst recommendations'}, status=400)
         
-        ratings_data = rec_response.json()
         if not ratings_data:
             return Response({'error': 'No analyst ratings available'}, status=404)
             
         latest_ratings = ratings_data[0]  # Most recent ratings
         
-        # Fetch price target
-        pt_response = session.get(price_target_url, params=params)
-        if not pt_response.ok:
-            return Response({'error': 'Failed to fetch price target'}, status=400)
-            
-        price_target_data = pt_response.json()
+        price_target_data = upstream_result('price_target') or {}
+        peers = upstream_result('peers') or []
+        metrics = upstream_result('metrics')
+        beta = metrics.get('metric', {}).get('beta', None) if metrics else None
         
-        # Get sector comparison data
-        peers_url = "https://finnhub.io/api/v1/stock/peers"
-        peers_response = session.get(peers_url, params=params)
-        if not peers_response.ok:
-            return Response({'error': 'Failed to fetch peer companies'}, status=400)
-            
-        peers = peers_response.json()
+        # Get performance data for peers in parallel, within what is left of the deadline
+        peer_futures = {
+            finnhub_executor.submit(finnhub_client.quote, peer, timeout=FINNHUB_CALL_TIMEOUT): peer
+            for peer in peers
+        }
+        done, _ = wait(peer_futures, timeout=max(0, deadline - time.monotonic()))
         
-        # Get performance data for peers
         peer_performance = {}
-        for peer in peers:
-            quote_params = {"symbol": peer, "token": settings.FINNHUB_API_KEY}
-            quote_response = session.get("https://finnhub.io/api/v1/quote", params=quote_params)
-            if quote_response.ok:
-                quote_data = quote_response.json()
-                # Get percentage change and current price
-                peer_performance[peer] = {
-                    'change_percent': quote_data.get('dp', 0),  # dp is percentage change
-                    'current_price': quote_data.get('c', 0),  # c is current price
-                    'change': quote_data.get('d', 0)  # d is price change
-                }
+        for future, peer in peer_futures.items():
+            if future not in done:
+                logger.warning(f"Timed out fetching quote for peer {peer}")
+                missing.append(f"quote:{peer}")
+                continue
+            try:
+                quote_data = future.result()
+            except FinnhubError as e:
+                logger.warning(f"Failed to fetch quote for peer {peer}: {e}")
+                missing.append(f"quote:{peer}")
+                continue
+            # Get percentage change and current price
+            peer_performance[peer] = {
+                'change_percent': quote_data.get('dp', 0),  # dp is percentage change
+                'current_price': quote_data.get('c', 0),  # c is current price
+                'change': quote_data.get('d', 0)  # d is price change
+            }
                 
         # Calculate sector metrics
         valid_performances = [p['change_percent'] for p in peer_performance.values() if p['change_percent'] is not None]
@@ -1135,11 +1118,6 @@ def get_medium_term_impact(request, symbol):
         )
         sector_rank = next((i + 1 for i, (peer, _) in enumerate(sorted_peers) if peer == symbol), len(sorted_peers))
         
-        # Get beta value
-        metric_params = {"symbol": symbol, "metric": "all", "token": settings.FINNHUB_API_KEY}
-        metric_response = session.get("https://finnhub.io/api/v1/stock/metric", params=metric_params)
-        beta = metric_response.json().get('metric', {}).get('beta', None) if metric_response.ok else None
-        
         response_data = {
             'analyst_ratings': {
                 'buy': latest_ratings.get('buy', 0),
@@ -1158,40 +1136,38 @@ def get_medium_term_impact(request, symbol):
                 'total_peers': len(peers),
                 'beta': beta,
                 'peer_performance': peer_performance
-            }
+            },
+            'partial': bool(missing),
+            'missing': missing
         }
         
-        return Response(response_data)
+        response = Response(response_data)
+        if missing:
+            response[PARTIAL_RESPONSE_HEADER] = "true"
+        return response
         
     except Exception as e:
         logger.error(f"Error in get_medium_term_impact: {str(e)}")
         return Response({'error': str(e)}, status=500)
 
 @api_view(['GET'])
+@cache_response('long_term_impact')
 def get_long_term_impact(request, symbol):
     """Get long-term market impact data including EPS and revenue estimates."""
     try:
         # Get EPS estimates
-        eps_url = "https://finnhub.io/api/v1/stock/eps-estimate"
-        params = {
-            "symbol": symbol,
-            "freq": "quarterly",
-            "token": settings.FINNHUB_API_KEY
-        }
-        
-        eps_response = session.get(eps_url, params=params)
-        if not eps_response.ok:
+        try:
+            eps_data = finnhub_client.company_eps_estimates(symbol, freq="quarterly")
+        except FinnhubError as e:
+            logger.warning(f"Failed to fetch EPS estimates for {symbol}: {e}")
             return Response({'error': 'Failed to fetch EPS estimates'}, status=400)
-            
-        eps_data = eps_response.json()
         
         # Get revenue estimates
-        revenue_url = "https://finnhub.io/api/v1/stock/revenue-estimate"
-        revenue_response = session.get(revenue_url, params=params)
-        if not revenue_response.ok:
+        try:
+            revenue_data = finnhub_client.company_revenue_estimates(symbol, freq="quarterly")
+        except FinnhubError as e:
+            logger.warning(f"Failed to fetch revenue estimates for {symbol}: {e}")
             return Response({'error': 'Failed to fetch revenue estimates'}, status=400)
-            
-        revenue_data = revenue_response.json()
         
         # Process the data
         if "data" not in eps_data or "data" not in revenue_data:
@@ -1241,6 +1217,7 @@ def get_long_term_impact(request, symbol):
         return Response({'error': str(e)}, status=500)
 
 @api_view(['GET'])
+@cache_response('news_sentiment')
 def news_sentiment(request):
     symbol = request.GET.get('symbol')
     if not symbol:
@@ -1277,68 +1254,21 @@ def news_sentiment(request):
         logger.error(f"Error fetching news sentiment for {symbol}: {str(e)}", exc_info=True)
         return JsonResponse({'error': f'Failed to fetch news sentiment: {str(e)}'}, status=500)
 
-def preprocess_transcript(executives, qa_section):
-    """Process Q&A section of transcript into a structured format."""
-    processed_qa = []
-    current_question = None
-    
-    for item in qa_section:
-        name = item['name']
-        is_executive = name in executives
-        
-        for speech in item['speech']:
-            if not is_executive:  # This is an analyst asking a question
-                current_question = {
-                    'analyst': name,
-                    'question': speech,
-                    'responses': []
-                }
-                processed_qa.append(current_question)
-            else:  # This is an executive responding
-                if current_question:
-                    current_question['responses'].append({
-                        'executive': name,
-                        'response': speech
-                    })
-    
-    return processed_qa
-
 @api_view(['GET'])
 def qa_analysis(request, symbol, call_id):
     """Analyze Q&A section of an earnings call transcript"""
     try:
-        if not settings.FINNHUB_API_KEY:
-            logger.error("FINNHUB_API_KEY not found in settings")
-            return JsonResponse({'error': 'Finnhub API key not configured'}, status=500)
+        if not call_id.startswith(symbol + "_"):
+            return JsonResponse({'error': f'Invalid transcript ID format for {symbol}'}, status=400)
 
-        # Get transcript from Finnhub
-        transcript = finnhub_client.transcripts(call_id)
-        if not transcript:
+        # Pre-extracted Q&A, built once per call from the local transcript store
+        # (Finnhub is only asked for transcripts we do not have yet)
+        processed_transcript = get_qa(symbol, call_id)
+        if processed_transcript is None:
             return JsonResponse({'error': 'Transcript not found'}, status=404)
-
-        # Get executives list
-        executives = [d['name'] for d in transcript.get('participant', []) if d.get('role') == 'executive']
-        
-        # Get Q&A section
-        qa_section = [
-            {'name': d['name'], 'speech': d['speech']} 
-            for d in transcript.get('transcript', []) 
-            if d.get('session') == 'question_answer'
-        ]
-
-        if not qa_section:
-            logger.warning(f"No Q&A section found in transcript {call_id}")
-            return JsonResponse({
-                'response_quality': 0,
-                'questions_addressed': 0,
-                'follow_up_questions': 0
-            })
-
-        # Process transcript
-        processed_transcript = preprocess_transcript(executives, qa_section)
         
         if not processed_transcript:
-            logger.warning(f"No processed Q&A data for transcript {call_id}")
+            logger.warning(f"No Q&A data in transcript {call_id}")
             return JsonResponse({
                 'response_quality': 0,
                 'questions_addressed': 0,
@@ -1349,7 +1279,7 @@ def qa_analysis(request, symbol, call_id):
         prompt = ChatPromptTemplate.from_template(
             """
             You are an AI assistant evaluating a transcript from an earnings call Q&A session.
-            The transcript is structured as a sequence of questions and answers.
+            The transcript is structured as numbered analyst questions (Q), each followed by the executives' answers (A).
             
             Transcript:
             {processed_transcript}
@@ -1379,7 +1309,7 @@ def qa_analysis(request, symbol, call_id):
         # Process the transcript
         try:
             analysis = chain.invoke({
-                "processed_transcript": json.dumps(processed_transcript, indent=2)
+                "processed_transcript": format_qa(processed_transcript)
             })
             
             # Ensure the values are in the correct range
@@ -1474,6 +1404,7 @@ def calculate_cash_flow_qoq(current_cf, previous_cf):
     return "N/A"
 
 @api_view(['GET'])
+@cache_response('financial_metrics')
 def get_financial_metrics(request, symbol):
     """Fetch financial metrics for a given company symbol."""
     try:
@@ -1633,9 +1564,16 @@ def find_pdf_file(symbol):
     else:
         raise FileNotFoundError(f"File not found for symbol: {symbol}. Make sure file exists.")
 
-def create_faiss_index(symbol):
+def get_index_dir(symbol):
+    """Directory holding the FAISS index and its metadata for a symbol."""
+    base_dir = Path(__file__).resolve().parent.parent
+    return os.path.join(base_dir, INDEX_DIR, f"{symbol}_faiss.index")
+
+def create_faiss_index(symbol, backend=None, index_type=None):
     """Creates a FAISS index for a given stock symbol's financial filing PDF."""
     try:
+        backend = backend or DEFAULT_EMBEDDING_BACKEND
+        index_type = index_type or DEFAULT_INDEX_TYPE
         pdf_path = find_pdf_file(symbol)
         loader = PyPDFLoader(pdf_path)
         documents = loader.load()
@@ -1643,13 +1581,26 @@ def create_faiss_index(symbol):
         text_splitter = RecursiveCharacterTextSplitter(chunk_size=CHUNK_SIZE, chunk_overlap=OVERLAP_SIZE)
         chunks = text_splitter.split_documents(documents)
 
-        logger.info(f"Creating FAISS index for {symbol}...")
-        embeddings = OpenAIEmbeddings(openai_api_key=settings.OPENAI_API_KEY)
+        logger.info(f"Creating {index_type} FAISS index for {symbol} with {backend} embeddings...")
+        embeddings = get_embeddings(backend)
         vectorstore = FAISS.from_documents(chunks, embeddings)
 
-        base_dir = Path(__file__).resolve().parent.parent
-        index_file = os.path.join(base_dir, INDEX_DIR, f"{symbol}_faiss.index")
-        os.makedirs(os.path.join(base_dir, INDEX_DIR), exist_ok=True)
+        index_file = get_index_dir(symbol)
+        os.makedirs(index_file, exist_ok=True)
+        save_embedding_metadata(index_file, backend, index_type=index_type)
+
+        # Build the lexical index from the same chunks for hybrid retrieval
+        BM25Index.from_vectorstore(vectorstore).save(index_file)
+
+        # Make the filing searchable across symbols without rebuilding the others.
+        # Done before quantization so the unified store gets the exact vectors.
+        try:
+            add_index_to_filing_store(symbol.upper(), vectorstore, index_file)
+        except Exception as store_error:
+            logger.error(f"Error adding {symbol} to the unified filing store: {store_error}")
+
+        # Written last: index.faiss existing means the build is complete
+        apply_index_type(vectorstore, index_type)
         vectorstore.save_local(index_file)
 
         return vectorstore
@@ -1659,24 +1610,47 @@ def create_faiss_index(symbol):
 
 def load_faiss_index(symbol):
     """Loads an existing FAISS index if available."""
-    base_dir = Path(__file__).resolve().parent.parent
-    index_dir = os.path.join(base_dir, INDEX_DIR, f"{symbol}_faiss.index")
+    index_dir = get_index_dir(symbol)
 
     if os.path.exists(os.path.join(index_dir, "index.faiss")) and os.path.exists(os.path.join(index_dir, "index.pkl")):
         logger.info(f"Loading FAISS index for {symbol} from {index_dir}...")
         return FAISS.load_local(
             index_dir,
-            OpenAIEmbeddings(openai_api_key=settings.OPENAI_API_KEY),
+            get_index_embeddings(index_dir),
             allow_dangerous_deserialization=True
         )
 
     logger.warning(f"FAISS index for {symbol} not found at {index_dir}.")
     return None
 
-def search_faiss(index, query):
-    """Retrieves relevant document chunks from FAISS index."""
-    retriever_chain = index.as_retriever()
-    return retriever_chain.invoke(query)
+def search_faiss(index, query, lexical_index=None, k=RETRIEVAL_K):
+    """
+    Retrieves relevant document chunks from FAISS index.
+    With a lexical index, dense and BM25 rankings are fused with reciprocal-rank fusion
+    so exact matches on figures and terms are not lost to pure vector similarity.
+    """
+    dense_docs = index.similarity_search(query, k=RETRIEVAL_CANDIDATES if lexical_index else k)
+    if lexical_index is None:
+        return dense_docs
+
+    lexical_docs = [
+        index.docstore.search(doc_id)
+        for doc_id, _ in lexical_index.search(query, k=RETRIEVAL_CANDIDATES)
+    ]
+
+    docs_by_content = {}
+    for doc in dense_docs + lexical_docs:
+        docs_by_content.setdefault(doc.page_content, doc)
+
+    fused = reciprocal_rank_fusion(
+        [[doc.page_content for doc in dense_docs], [doc.page_content for doc in lexical_docs]],
+        k=k
+    )
+    return [docs_by_content[content] for content in fused]
+
+def format_context(documents):
+    """Join retrieved chunks into plain text for the prompt."""
+    return "\n\n".join(doc.page_content for doc in documents)
 
 def generate_response(context, question):
     """Generates response using GPT model."""
@@ -1712,17 +1686,42 @@ def get_key_highlights(request):
     try:
         logger.info(f"Fetching key highlights for symbol: {symbol}")
         
-        # Load or create FAISS index
-        index = load_faiss_index(symbol)
+        # Load the FAISS index, or build it in the background and ask the client to retry
+        index = load_faiss_index(symbol) if not is_index_building(symbol) else None
         if index is None:
-            logger.info(f"No FAISS index found for {symbol}, creating new index...")
-            index = create_faiss_index(symbol)
+            find_pdf_file(symbol)  # Fail fast with 404 when there is nothing to index
+            logger.info(f"No FAISS index found for {symbol}, building index in the background...")
+            job = submit_index_build(symbol, create_faiss_index)
+            if job.get('status') == 'failed':
+                # The last build failed recently; report it instead of retrying on every poll
+                response = JsonResponse({
+                    'responses': [],
+                    'status': 'failed',
+                    'error': f"Building the index for {symbol} failed: {job.get('error', 'unknown error')}"
+                }, status=503)
+                response["Retry-After"] = str(retry_cooldown_remaining(job))
+                response["Access-Control-Allow-Origin"] = "https://advisorinsight-production.up.railway.app"
+                response["Access-Control-Allow-Methods"] = "GET, OPTIONS"
+                response["Access-Control-Allow-Headers"] = "Content-Type"
+                return response
+            response = JsonResponse({
+                'responses': [],
+                'status': job.get('status', 'building'),
+                'message': f'Key highlights for {symbol} are being prepared. Please retry shortly.'
+            }, status=202)
+            response["Retry-After"] = str(INDEX_BUILD_RETRY_AFTER)
+            response["Access-Control-Allow-Origin"] = "https://advisorinsight-production.up.railway.app"
+            response["Access-Control-Allow-Methods"] = "GET, OPTIONS"
+            response["Access-Control-Allow-Headers"] = "Content-Type"
+            return response
+
+        lexical_index = load_lexical_index(get_index_dir(symbol), index)
 
         # Get responses for each question
         responses = []
         for question in QUESTIONS:
             try:
-                context = search_faiss(index, question)
+                context = format_context(search_faiss(index, question, lexical_index))
                 answer = generate_response(context, question)
                 if answer and not answer.startswith('I cannot answer'):
                     responses.append(answer)
@@ -1758,24 +1757,89 @@ def get_key_highlights(request):
             'error': f'Failed to fetch key highlights: {str(e)}'
         }, status=500)
 
+@api_view(['GET'])
+def search_filings(request):
+    """Search SEC filing chunks across several companies in one query."""
+    query = request.GET.get('q')
+    if not query:
+        return JsonResponse({'error': 'Query is required'}, status=400)
+
+    try:
+        symbols = [s.strip().upper() for s in request.GET.get('symbols', '').split(',') if s.strip()]
+        filings = [f.strip() for f in request.GET.get('filings', '').split(',') if f.strip()]
+        k = max(1, min(int(request.GET.get('k', 5)), 50))
+
+        store = get_filing_store()
+        results = store.search(query, k=k, symbols=symbols or None, filings=filings or None)
+
+        response = JsonResponse({
+            'query': query,
+            'symbols': symbols or store.symbols,
+            'results': results
+        })
+        response["Access-Control-Allow-Origin"] = "https://advisorinsight-production.up.railway.app"
+        response["Access-Control-Allow-Methods"] = "GET, OPTIONS"
+        response["Access-Control-Allow-Headers"] = "Content-Type"
+        return response
+    except ValueError as e:
+        return JsonResponse({'error': str(e)}, status=400)
+    except Exception as e:
+        logger.error(f"Error searching filings for '{query}': {str(e)}", exc_info=True)
+        return JsonResponse({'error': f'Failed to search filings: {str(e)}'}, status=500)
+
+@api_view(['GET'])
+def get_index_status(request):
+    """Get the status of the SEC filing index build for a symbol."""
+    symbol = request.GET.get('symbol')
+    if not symbol:
+        return JsonResponse({'error': 'Symbol is required'}, status=400)
+
+    try:
+        symbol = symbol.upper()
+        job = get_index_job(symbol) or {'symbol': symbol}
+        if is_index_building(symbol):
+            job['status'] = 'building'
+        elif os.path.exists(os.path.join(get_index_dir(symbol), "index.faiss")):
+            job['status'] = 'ready'
+        elif 'status' not in job:
+            job['status'] = 'missing'
+
+        response = JsonResponse(job)
+        if job['status'] == 'building':
+            response["Retry-After"] = str(INDEX_BUILD_RETRY_AFTER)
+        response["Access-Control-Allow-Origin"] = "https://advisorinsight-production.up.railway.app"
+        response["Access-Control-Allow-Methods"] = "GET, OPTIONS"
+        response["Access-Control-Allow-Headers"] = "Content-Type"
+        return response
+    except Exception as e:
+        logger.error(f"Error fetching index status for {symbol}: {str(e)}", exc_info=True)
+        return JsonResponse({'error': f'Failed to fetch index status: {str(e)}'}, status=500)
+
+@api_view(['GET'])
+def get_response_cache_metrics(request):
+    """Hit rates of the cached Finnhub-backed endpoints."""
+    return Response(get_cache_metrics())
+
 @api_view(['POST'])
 def chat(request):
     """
-    Endpoint for handling both market and company-specific chat messages
+    Endpoint for handling both market and company-specific chat messages.
+    Pass back the returned session_id to continue the conversation.
     """
     try:
         message = request.data.get('message')
         symbol = request.data.get('symbol')  # None for market queries, symbol for company queries
+        session_id = request.data.get('session_id')
         
         if not message:
             logger.warning("Chat request received without message")
             return Response({'error': 'Message is required'}, status=400)
             
         logger.info(f"Processing chat request for {'market' if not symbol else symbol}")
-        response = chat_service.generate_response(message, symbol)
+        response, session_id = chat_service.generate_session_response(message, symbol, session_id)
         
         # Add CORS headers
-        response_data = {'response': response}
+        response_data = {'response': response, 'session_id': session_id}
         response = Response(response_data)
         response["Access-Control-Allow-Origin"] = "https://advisorinsight-production.up.railway.app"
         response["Access-Control-Allow-Methods"] = "POST, OPTIONS"
@@ -1789,6 +1853,28 @@ def chat(request):
             'detail': str(e) if settings.DEBUG else None
         }, status=500)
 
+@api_view(['POST'])
+def chat_stream(request):
+    """
+    Streaming variant of chat: the answer is sent as Server-Sent Events, one
+    'data: {"token": ...}' event per token, ending with a 'done' event. The chat
+    session id is returned in the X-Chat-Session header.
+    """
+    message = request.data.get('message')
+    symbol = request.data.get('symbol')  # None for market queries, symbol for company queries
+    session_id = request.data.get('session_id')
+    
+    if not message:
+        logger.warning("Chat stream request received without message")
+        return Response({'error': 'Message is required'}, status=400)
+    
+    logger.info(f"Streaming chat response for {'market' if not symbol else symbol}")
+    session_id, events = chat_service.stream_response(message, symbol, session_id)
+    return sse_response(events, headers={
+        'X-Chat-Session': session_id,
+        'Access-Control-Expose-Headers': 'X-Chat-Session'
+    })
+
 @api_view(['GET'])
 def get_suggested_questions(request):
     """
@@ -1805,147 +1891,38 @@ def get_suggested_questions(request):
 @api_view(['GET'])
 def get_indices_data(request):
     try:
-        # US indices
-        us_indices = ['^DJI', '^GSPC', '^IXIC']  # Dow Jones, S&P 500, NASDAQ
-        # Global indices
-        global_indices = ['^FTSE', '^N225']  # FTSE 100, Nikkei 225
-        # Sector ETFs
-        sectors = {
-            "XLK": "Technology",
-            "XLV": "Healthcare", 
-            "XLF": "Financials",
-            "XLE": "Energy",
-            "XLI": "Industrials",
-            "XLC": "Communication"
-        }
-        
-        # Top 100 S&P 500 tickers for volume and movers
-        tickers = [
-            "AAPL", "MSFT", "AMZN", "GOOGL", "META", "NVDA", "TSLA", "BRK-B", "UNH", "JNJ",
-            "XOM", "JPM", "V", "PG", "CVX", "HD", "MA", "LLY", "MRK", "ABBV",
-            "PEP", "KO", "BAC", "PFE", "COST", "AVGO", "DIS", "CSCO", "MCD", "WMT",
-            "ACN", "DHR", "NEE", "TXN", "LIN", "VZ", "ADBE", "CMCSA", "NFLX", "INTC"
-        ]
-        
-        indices_data = {
-            'us': {},
-            'global': {},
-            'sectors': {},
-            'movers': {
-                'gainers': [],
-                'losers': []
-            },
-            'volume_leaders': []
-        }
-        
-        # Fetch US indices data...
-        for symbol in us_indices:
-            ticker = yf.Ticker(symbol)
-            data = ticker.history(period='1d', interval='1m')
-            if not data.empty:
-                latest_price = data['Close'].iloc[-1]
-                previous_close = data['Close'].iloc[0]
-                change = latest_price - previous_close
-                change_percent = (change / previous_close) * 100
-                
-                indices_data['us'][symbol] = {
-                    'name': 'Dow Jones' if symbol == '^DJI' else 'S&P 500' if symbol == '^GSPC' else 'NASDAQ',
-                    'price': round(latest_price, 2),
-                    'change': round(change, 2),
-                    'change_percent': round(change_percent, 2)
-                }
-        
-        # Fetch global indices data...
-        for symbol in global_indices:
-            ticker = yf.Ticker(symbol)
-            data = ticker.history(period='1d', interval='1m')
-            if not data.empty:
-                latest_price = data['Close'].iloc[-1]
-                previous_close = data['Close'].iloc[0]
-                change = latest_price - previous_close
-                change_percent = (change / previous_close) * 100
-                
-                indices_data['global'][symbol] = {
-                    'name': 'FTSE 100' if symbol == '^FTSE' else 'Nikkei 225',
-                    'price': round(latest_price, 2),
-                    'change': round(change, 2),
-                    'change_percent': round(change_percent, 2)
-                }
+        return Response(get_market_snapshot())
+    except Exception as e:
+        return Response({'error': str(e)}, status=500)
 
-        # Fetch sector performance data...
-        for symbol, name in sectors.items():
-            ticker = yf.Ticker(symbol)
-            data = ticker.history(period='1d', interval='1m')
-            if not data.empty:
-                latest_price = data['Close'].iloc[-1]
-                previous_close = data['Close'].iloc[0]
-                change = latest_price - previous_close
-                change_percent = (change / previous_close) * 100
-                
-                indices_data['sectors'][symbol] = {
-                    'name': name,
-                    'price': round(latest_price, 2),
-                    'change': round(change, 2),
-                    'change_percent': round(change_percent, 2)
-                }
+def build_market_chat_completion(message):
+    """OpenAI chat completion request answering a market question from the market snapshot."""
+    # Relevant slice of the shared market snapshot (kept warm in the background)
+    market_data = market_chat_data(message, get_market_snapshot())
+    
+    # Create a prompt with the market data
+    prompt = f"""You are a market insights assistant with access to real-time financial data. Answer the following question using the provided real-time market data:
 
-        # Fetch volume leaders and top movers data
-        volume_data = []
-        performance = []
-        
-        for ticker in tickers:
-            try:
-                stock = yf.Ticker(ticker)
-                data = stock.history(period='2d')
-                if len(data) > 1:
-                    # Volume data
-                    latest_volume = data['Volume'].iloc[-1]
-                    previous_volume = data['Volume'].iloc[-2]
-                    volume_change_pct = ((latest_volume - previous_volume) / previous_volume) * 100
-                    
-                    # Price data for movers
-                    latest_price = data['Close'].iloc[-1]
-                    previous_close = data['Close'].iloc[-2]
-                    price_change = latest_price - previous_close
-                    price_change_percent = (price_change / previous_close) * 100
-                    
-                    # Format volume
-                    formatted_volume = f"{latest_volume / 1e9:.1f}B" if latest_volume >= 1e9 else f"{latest_volume / 1e6:.1f}M"
-                    
-                    volume_data.append({
-                        'symbol': ticker,
-                        'volume': formatted_volume,
-                        'volume_raw': latest_volume,  # For sorting
-                        'volume_change_percent': round(volume_change_pct, 1),
-                        'price': round(latest_price, 2),
-                        'change_percent': round(price_change_percent, 2)
-                    })
-                    
-                    performance.append({
-                        'symbol': ticker,
-                        'price': round(latest_price, 2),
-                        'change': round(price_change, 2),
-                        'change_percent': round(price_change_percent, 2)
-                    })
-            except Exception as e:
-                logger.error(f"Error processing {ticker}: {e}")
-                continue
+Question: {message}
 
-        # Sort and get top 5 volume leaders
-        volume_data.sort(key=lambda x: x['volume_raw'], reverse=True)
-        indices_data['volume_leaders'] = [
-            {k: v for k, v in item.items() if k != 'volume_raw'}  # Remove volume_raw from response
-            for item in volume_data[:5]
-        ]
-        
-        # Sort and get top movers
-        performance.sort(key=lambda x: x['change_percent'], reverse=True)
-        indices_data['movers']['gainers'] = performance[:5]
-        indices_data['movers']['losers'] = performance[-5:]
-        
-        return Response(indices_data)
-    except Exception as e:
-        return Response({'error': str(e)}, status=500)
+Real-time Market Data:
+{build_market_context(market_data)}
+
+Please provide a concise and informative response focusing on the key insights from the data.
+If the data doesn't contain information relevant to the question, provide a general market analysis based on the available data.
+Use specific numbers and percentages when available, and format currency values appropriately.
+Keep your response focused on the market data and avoid making predictions or giving financial advice.
+"""
+
+    return dict(
+        model="gpt-3.5-turbo",
+        messages=[
+            {"role": "system", "content": "You are a knowledgeable market analyst providing real-time market insights."},
+            {"role": "user", "content": prompt}
+        ],
+        temperature=0.3,
+        max_tokens=150
+    )
 
 @api_view(['POST'])
 def market_chat(request):
@@ -1958,125 +1935,8 @@ def market_chat(request):
         if not message:
             return Response({'error': 'Message is required'}, status=400)
             
-        # Initialize OpenAI client
-        client = OpenAI(api_key=settings.OPENAI_API_KEY)
-        
-        # Get real-time market data based on the question
-        market_data = {}
-        message_lower = message.lower()
-        
-        # Fetch relevant data based on the question type
-        if any(keyword in message_lower for keyword in ['sector', 'sectors']):
-            # Fetch sector performance data using yfinance
-            sectors = {
-                "XLK": "Technology",
-                "XLV": "Healthcare", 
-                "XLF": "Financials",
-                "XLE": "Energy",
-                "XLI": "Industrials",
-                "XLC": "Communication"
-            }
-            sector_data = {}
-            for symbol, name in sectors.items():
-                ticker = yf.Ticker(symbol)
-                data = ticker.history(period='1d')
-                if not data.empty:
-                    latest_price = data['Close'].iloc[-1]
-                    previous_close = data['Close'].iloc[0]
-                    change_percent = ((latest_price - previous_close) / previous_close) * 100
-                    sector_data[name] = {
-                        'price': round(latest_price, 2),
-                        'change_percent': round(change_percent, 2)
-                    }
-            market_data['sectors'] = sector_data
-            
-        elif any(keyword in message_lower for keyword in ['volume', 'trading volume']):
-            # Fetch volume data for major stocks using yfinance
-            tickers = ["AAPL", "MSFT", "GOOGL", "AMZN", "META"]
-            volume_data = {}
-            for symbol in tickers:
-                ticker = yf.Ticker(symbol)
-                data = ticker.history(period='1d')
-                if not data.empty:
-                    volume = data['Volume'].iloc[-1]
-                    volume_data[symbol] = {
-                        'volume': f"{volume/1e6:.1f}M" if volume < 1e9 else f"{volume/1e9:.1f}B"
-                    }
-            market_data['volume'] = volume_data
-            
-        elif any(keyword in message_lower for keyword in ['global', 'international']):
-            # Fetch global indices data using yfinance
-            indices = {'^FTSE': 'FTSE 100', '^N225': 'Nikkei 225'}
-            global_data = {}
-            for symbol, name in indices.items():
-                ticker = yf.Ticker(symbol)
-                data = ticker.history(period='1d')
-                if not data.empty:
-                    latest_price = data['Close'].iloc[-1]
-                    previous_close = data['Close'].iloc[0]
-                    change_percent = ((latest_price - previous_close) / previous_close) * 100
-                    global_data[name] = {
-                        'price': round(latest_price, 2),
-                        'change_percent': round(change_percent, 2)
-                    }
-            market_data['global'] = global_data
-            
-        elif any(keyword in message_lower for keyword in ['movers', 'gainers', 'losers']):
-            # Fetch top movers data using yfinance
-            tickers = ["AAPL", "MSFT", "GOOGL", "AMZN", "META", "NVDA", "TSLA"]
-            performance_data = []
-            for symbol in tickers:
-                ticker = yf.Ticker(symbol)
-                data = ticker.history(period='1d')
-                if not data.empty:
-                    latest_price = data['Close'].iloc[-1]
-                    previous_close = data['Close'].iloc[0]
-                    change_percent = ((latest_price - previous_close) / previous_close) * 100
-                    performance_data.append({
-                        'symbol': symbol,
-                        'price': round(latest_price, 2),
-                        'change_percent': round(change_percent, 2)
-                    })
-            performance_data.sort(key=lambda x: x['change_percent'], reverse=True)
-            market_data['movers'] = {
-                'gainers': performance_data[:3],
-                'losers': performance_data[-3:]
-            }
-            
-        # Get sentiment data from Finnhub
-        try:
-            sentiment = finnhub_client.news_sentiment("SPY")  # Use SPY as market proxy
-            market_data['sentiment'] = {
-                'bullish_percent': sentiment.get('sentiment', {}).get('bullishPercent', 0),
-                'bearish_percent': sentiment.get('sentiment', {}).get('bearishPercent', 0)
-            }
-        except Exception as e:
-            logger.warning(f"Failed to fetch sentiment data: {e}")
-        
-        # Create a prompt with the market data
-        prompt = f"""You are a market insights assistant with access to real-time financial data. Answer the following question using the provided real-time market data:
-
-Question: {message}
-
-Real-time Market Data:
-{json.dumps(market_data, indent=2)}
-
-Please provide a concise and informative response focusing on the key insights from the data.
-If the data doesn't contain information relevant to the question, provide a general market analysis based on the available data.
-Use specific numbers and percentages when available, and format currency values appropriately.
-Keep your response focused on the market data and avoid making predictions or giving financial advice.
-"""
-
         # Generate response using GPT
-        response = client.chat.completions.create(
-            model="gpt-3.5-turbo",
-            messages=[
-                {"role": "system", "content": "You are a knowledgeable market analyst providing real-time market insights."},
-                {"role": "user", "content": prompt}
-            ],
-            temperature=0.3,
-            max_tokens=150
-        )
+        response = llm_gateway.chat(PRIORITY_INTERACTIVE, **build_market_chat_completion(message))
         
         return Response({
             'response': response.choices[0].message.content.strip()
@@ -2089,6 +1949,18 @@ Keep your response focused on the market data and avoid making predictions or gi
             'detail': str(e) if settings.DEBUG else None
         }, status=500)
 
+@api_view(['POST'])
+def market_chat_stream(request):
+    """Streaming variant of market_chat, sent as Server-Sent Events (see chat_stream)."""
+    message = request.data.get('message')
+    if not message:
+        return Response({'error': 'Message is required'}, status=400)
+    
+    return sse_response(sse_chat_events(
+        lambda: build_market_chat_completion(message),
+        lambda e: 'An error occurred while processing your request.'
+    ))
+
 @api_view(['GET'])
 def get_market_suggested_questions(request):
     """Get suggested questions for market insights"""
@@ -2105,53 +1977,18 @@ def get_market_suggested_questions(request):
     return Response({'questions': questions})
 
 @api_view(['GET'])
+@cache_response('company_comparison')
 def get_company_comparison(request, symbols):
     """Fetch comparison data for multiple companies."""
     try:
-        # Split the symbols string into a list
-        symbol_list = symbols.split(',')
-        
-        # Limit to maximum 5 companies for performance
-        symbol_list = symbol_list[:5]
-        
-        comparison_data = {}
-        
-        for symbol in symbol_list:
-            try:
-                # Get basic financials from Finnhub
-                basic_financials = finnhub_client.company_basic_financials(symbol, 'all')
-                company_profile = finnhub_client.company_profile2(symbol=symbol)
-                
-                # Get real-time quote
-                quote = finnhub_client.quote(symbol)
-                
-                # Get metrics
-                metrics = basic_financials.get('metric', {})
-                
-                # Format the data
-                comparison_data[symbol] = {
-                    'symbol': symbol,
-                    'companyName': company_profile.get('name', symbol),
-                    'price': quote.get('c', 0),  # Current price
-                    'change': quote.get('d', 0),  # Price change
-                    'changePercent': quote.get('dp', 0),  # Percent change
-                    'marketCap': company_profile.get('marketCapitalization', 0),
-                    'peRatio': metrics.get('peBasicExcl', 0),
-                    'revenue': metrics.get('revenuePerShareAnnual', 0) * (company_profile.get('shareOutstanding', 0) or 0),
-                    'revenueGrowth': metrics.get('revenueGrowthTTM', 0),
-                    'employees': company_profile.get('employeeTotal', 0),
-                    'profitMargin': metrics.get('netMarginTTM', 0),
-                    'dividendYield': metrics.get('dividendYieldIndicatedAnnual', 0)
-                }
-                
-            except Exception as e:
-                logger.error(f"Error fetching data for {symbol}: {str(e)}")
-                comparison_data[symbol] = {
-                    'symbol': symbol,
-                    'error': f"Failed to fetch data for {symbol}"
-                }
+        symbol_list = parse_symbols(symbols)
+        comparison_data, incomplete = compare_companies(symbol_list)
         
-        return JsonResponse(comparison_data)
+        response = JsonResponse(comparison_data)
+        if incomplete:
+            # Not cached, so pending rows are filled in by the next request
+            response[PARTIAL_RESPONSE_HEADER] = "true"
+        return response
         
     except Exception as e:
         logger.error(f"Error in company comparison: {str(e)}")
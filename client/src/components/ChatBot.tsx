@@ -97,15 +97,22 @@ export const ChatBot: React.FC<ChatBotProps> = ({ symbol }) => {
     }
 
     try {
-      const response = await chatService.sendMessage(currentInput, symbol);
-      
       const botMessage: ChatMessage = {
-        text: response,
+        text: '',
         isUser: false,
         timestamp: new Date()
       };
-
-      setMessages(prev => [...prev, botMessage]);
+      let streamed = '';
+      await chatService.streamMessage(currentInput, symbol, token => {
+        if (!streamed) {
+          // First token: show the answer and stop the loading indicator
+          setMessages(prev => [...prev, botMessage]);
+          setIsLoading(false);
+        }
+        streamed += token;
+        const text = streamed;
+        setMessages(prev => [...prev.slice(0, -1), { ...botMessage, text }]);
+      });
     } catch (error) {
       console.error('Error sending message:', error);
       const errorMessage: ChatMessage = {
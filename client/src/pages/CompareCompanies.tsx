@@ -18,6 +18,8 @@ import {
 } from 'lucide-react';
 import axios from 'axios';
 
+const MAX_COMPARISON_COMPANIES = 25;
+
 interface CompanyMetrics {
   symbol: string;
   companyName: string;
@@ -57,7 +59,7 @@ const CompareCompanies: React.FC = () => {
       const response = await axios.get(`/api/stock/company-comparison/${symbols.join(',')}/`);
       const data = response.data;
       
-      const updatedCompanies = Object.entries(data).map(([symbol, companyData]: [string, any]) => ({
+      const toMetrics = (symbol: string, companyData: any): CompanyMetrics => ({
         symbol,
         companyName: companyData.companyName,
         price: companyData.price,
@@ -70,9 +72,13 @@ const CompareCompanies: React.FC = () => {
         employees: companyData.employees,
         profitMargin: companyData.profitMargin,
         dividendYield: companyData.dividendYield
-      }));
+      });
       
-      setCompanies(updatedCompanies);
+      // Rows that are still loading (or failed) keep their last values until the next refresh
+      setCompanies(previous => Object.entries(data).map(([symbol, companyData]: [string, any]) => {
+        const last = previous.find(company => company.symbol === symbol);
+        return companyData.error && last ? last : toMetrics(symbol, companyData);
+      }));
     } catch (err) {
       console.error('Error fetching company data:', err);
       setError('Failed to load company data');
@@ -129,8 +135,8 @@ const CompareCompanies: React.FC = () => {
   }, [searchQuery]);
 
   const handleAddCompany = (symbol: string) => {
-    if (companies.length >= 5) {
-      setError('Maximum of 5 companies can be compared');
+    if (companies.length >= MAX_COMPARISON_COMPANIES) {
+      setError(`Maximum of ${MAX_COMPARISON_COMPANIES} companies can be compared`);
       return;
     }
     
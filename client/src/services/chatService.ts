@@ -6,13 +6,18 @@ export interface ChatMessage {
   timestamp: Date;
 }
 
+// Server-side chat session per symbol, so follow-up questions reuse the conversation
+const sessions: Record<string, string> = {};
+
 export const chatService = {
   async sendMessage(message: string, symbol: string): Promise<string> {
     try {
       const response = await axios.post('/api/stock/chat/', {
         message,
-        symbol
+        symbol,
+        session_id: sessions[symbol]
       });
+      sessions[symbol] = response.data.session_id;
       return response.data.response;
     } catch (error) {
       console.error('Error sending message:', error);
@@ -20,6 +25,43 @@ export const chatService = {
     }
   },
 
+  // Streams the answer over Server-Sent Events, calling onToken for each piece of text.
+  // Resolves with the full answer once the stream is done.
+  async streamMessage(message: string, symbol: string, onToken: (token: string) => void): Promise<string> {
+    const response = await fetch('/api/stock/chat/stream/', {
+      method: 'POST',
+      headers: { 'Content-Type': 'application/json' },
+      body: JSON.stringify({ message, symbol, session_id: sessions[symbol] })
+    });
+    if (!response.ok || !response.body) {
+      throw new Error(`Chat stream failed with status ${response.status}`);
+    }
+    sessions[symbol] = response.headers.get('X-Chat-Session') || sessions[symbol];
+
+    const reader = response.body.getReader();
+    const decoder = new TextDecoder();
+    let buffer = '';
+    let text = '';
+    while (true) {
+      const { done, value } = await reader.read();
+      if (done) break;
+      buffer += decoder.decode(value, { stream: true });
+      const events = buffer.split('\n\n');
+      buffer = events.pop() || '';
+      for (const event of events) {
+        const data = event.split('\n').find(line => line.startsWith('data: '));
+        if (!data) continue;
+        const payload = JSON.parse(data.slice(6));
+        const token = payload.token ?? payload.error;
+        if (token) {
+          text += token;
+          onToken(token);
+        }
+      }
+    }
+    return text;
+  },
+
   async getSuggestedQuestions(symbol: string): Promise<string[]> {
     try {
       const response = await axios.get(`/api/stock/suggested-questions/?symbol=${symbol}`);
@@ -3,25 +3,41 @@ import { API_BASE_URL } from '../config';
 export interface KeyHighlightsResponse {
   responses: string[];
   message: string;
+  status?: 'building' | 'ready' | 'failed';
 }
 
 export interface KeyHighlightsError {
   error: string;
 }
 
+// The backend answers 202 while the SEC filing index is built in the background
+const MAX_BUILD_POLLS = 20;
+const DEFAULT_RETRY_AFTER_SECONDS = 15;
+
+const wait = (ms: number) => new Promise(resolve => setTimeout(resolve, ms));
+
 export const fetchKeyHighlights = async (symbol: string): Promise<KeyHighlightsResponse> => {
   try {
-    const response = await fetch(`${API_BASE_URL}/stock/key-highlights/?symbol=${symbol}`);
-    const data = await response.json();
-    
-    if (!response.ok) {
-      const error = data as KeyHighlightsError;
-      throw new Error(error.error || 'Failed to fetch key highlights');
+    for (let attempt = 0; attempt < MAX_BUILD_POLLS; attempt++) {
+      const response = await fetch(`${API_BASE_URL}/stock/key-highlights/?symbol=${symbol}`);
+      const data = await response.json();
+
+      if (!response.ok) {
+        const error = data as KeyHighlightsError;
+        throw new Error(error.error || 'Failed to fetch key highlights');
+      }
+
+      if (response.status !== 202) {
+        return data as KeyHighlightsResponse;
+      }
+
+      const retryAfter = Number(response.headers.get('Retry-After')) || DEFAULT_RETRY_AFTER_SECONDS;
+      await wait(retryAfter * 1000);
     }
 
-    return data as KeyHighlightsResponse;
+    throw new Error('Key highlights are still being prepared. Please try again later.');
   } catch (error) {
     console.error('Error fetching key highlights:', error);
     throw error;
   }
-}; 
\ No newline at end of file
+};